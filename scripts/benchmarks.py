@@ -0,0 +1,343 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import timeit
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+from loguru import logger
+
+
+def _ensure_src_on_sys_path() -> None:
+    project_root = Path(__file__).resolve().parents[1]
+    src_path = project_root / "src"
+    if str(src_path) not in sys.path:
+        sys.path.insert(0, str(src_path))
+
+
+_ensure_src_on_sys_path()
+
+import pydantic  # noqa: E402
+from beanie import PydanticObjectId  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.schemas import ChannelResponse  # noqa: E402
+from app.schemas.dialogue import HistoryMessage  # noqa: E402
+from app.services.channel_service import CHANNEL_FIELDS, _to_response_dict  # noqa: E402
+from core.database.models import Channel, DialogueMessage, MessageRole  # noqa: E402
+from core.database.models.channel import ChannelSettings  # noqa: E402
+from predict import ResponseCache, select_context  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().with_name("benchmarks_baseline.json")
+MESSAGE_SIZES = (10, 1_000, 10_000, 100_000)
+CHANNEL_SIZES = (10_000,)
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    name: str
+    sizes: tuple[int, ...]
+    # Готовит данные размера size и возвращает измеряемую функцию
+    setup: Callable[[int], Callable[[], object]]
+
+
+BENCHMARKS: list[Benchmark] = []
+
+
+def benchmark(name: str, sizes: tuple[int, ...]):
+    def decorator(setup: Callable[[int], Callable[[], object]]):
+        BENCHMARKS.append(Benchmark(name, sizes, setup))
+        return setup
+
+    return decorator
+
+
+def _message_documents(size: int) -> list[dict]:
+    """Сообщения в том виде, в каком их возвращает Mongo"""
+
+    roles = [MessageRole.USER, MessageRole.ASSISTANT]
+    return [
+        {
+            "_id": PydanticObjectId(),
+            "dialogue_id": PydanticObjectId(),
+            "chat_id": "chat",
+            "seq": seq,
+            "role": roles[seq % 2].value,
+            "text": f"Message number {seq} with some realistic length of text",
+            "message_id": f"message-{seq}",
+        }
+        for seq in range(1, size + 1)
+    ]
+
+
+def _messages(size: int) -> list[DialogueMessage]:
+    return [DialogueMessage.model_validate(doc) for doc in _message_documents(size)]
+
+
+def _channel_documents(size: int) -> list[dict]:
+    return [
+        {
+            "_id": PydanticObjectId(),
+            "name": f"Channel {i}",
+            "chat_bot_id": PydanticObjectId(),
+            "settings": {
+                "url": f"https://example.com/webhook/{i}",
+                "token": f"token-{i}",
+            },
+            "is_active": True,
+        }
+        for i in range(size)
+    ]
+
+
+def _channels(size: int) -> list[Channel]:
+    # model_construct: документам Beanie для валидации нужна инициализированная БД
+    return [
+        Channel.model_construct(
+            id=doc["_id"],
+            name=doc["name"],
+            chat_bot_id=doc["chat_bot_id"],
+            settings=ChannelSettings(**doc["settings"]),
+            is_active=doc["is_active"],
+        )
+        for doc in _channel_documents(size)
+    ]
+
+
+@benchmark("dialogue_message.validate", MESSAGE_SIZES)
+def bench_dialogue_message_validate(size: int) -> Callable[[], object]:
+    """Чтение контекста/истории: .project(DialogueMessage) валидирует каждый документ"""
+
+    documents = _message_documents(size)
+    return lambda: [DialogueMessage.model_validate(doc) for doc in documents]
+
+
+@benchmark("dialogue_message.validate_list", MESSAGE_SIZES)
+def bench_dialogue_message_validate_list(size: int) -> Callable[[], object]:
+    """Та же валидация одним вызовом TypeAdapter для сравнения"""
+
+    documents = _message_documents(size)
+    adapter = TypeAdapter(list[DialogueMessage])
+    return lambda: adapter.validate_python(documents)
+
+
+@benchmark("history_message.validate", MESSAGE_SIZES)
+def bench_history_message_validate(size: int) -> Callable[[], object]:
+    documents = _message_documents(size)
+    return lambda: [HistoryMessage.model_validate(doc) for doc in documents]
+
+
+@benchmark("dialogue_message.model_dump", MESSAGE_SIZES)
+def bench_dialogue_message_model_dump(size: int) -> Callable[[], object]:
+    """Исходящие сообщения: payload outbox строится через model_dump"""
+
+    messages = _messages(size)
+    return lambda: [message.model_dump() for message in messages]
+
+
+@benchmark("outbound_payload.json", MESSAGE_SIZES)
+def bench_outbound_payload_json(size: int) -> Callable[[], object]:
+    """Кодирование payload в тело POST в канал"""
+
+    payloads = [message.model_dump() for message in _messages(size)]
+    return lambda: [json.dumps(payload).encode() for payload in payloads]
+
+
+@benchmark("channel_response.from_model", CHANNEL_SIZES)
+def bench_channel_response_from_model(size: int) -> Callable[[], object]:
+    """Ответы API каналов: from_model заново валидирует HttpUrl"""
+
+    channels = _channels(size)
+    return lambda: [ChannelResponse.from_model(channel) for channel in channels]
+
+
+@benchmark("channel_response.model_construct", CHANNEL_SIZES)
+def bench_channel_response_model_construct(size: int) -> Callable[[], object]:
+    """Те же ответы без повторной валидации, для сравнения"""
+
+    channels = _channels(size)
+    return lambda: [
+        ChannelResponse.model_construct(
+            id=str(channel.id),
+            name=channel.name,
+            chat_bot_id=str(channel.chat_bot_id),
+            url=channel.settings.url,
+            is_active=channel.is_active,
+            token=channel.settings.token,
+        )
+        for channel in channels
+    ]
+
+
+@benchmark("channel_listing.to_response_dict", CHANNEL_SIZES)
+def bench_channel_listing(size: int) -> Callable[[], object]:
+    """Список каналов: сырые документы Mongo превращаются в словари ответа"""
+
+    documents = _channel_documents(size)
+    fields = list(CHANNEL_FIELDS)
+    return lambda: [_to_response_dict(document, fields) for document in documents]
+
+
+@benchmark("context.select", MESSAGE_SIZES)
+def bench_select_context(size: int) -> Callable[[], object]:
+    messages = _messages(size)
+    return lambda: select_context([], messages, max_chars=size * 20)
+
+
+@benchmark("response_cache.make_key", MESSAGE_SIZES)
+def bench_response_cache_key(size: int) -> Callable[[], object]:
+    messages = _messages(size)
+    return lambda: ResponseCache.make_key("chat_bot", messages)
+
+
+def measure(func: Callable[[], object], repeat: int, min_time: float) -> list[float]:
+    """Время одного вызова func в нескольких повторах (секунды)"""
+
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    while elapsed < min_time:
+        number *= 2
+        elapsed = timer.timeit(number)
+    return [total / number for total in timer.repeat(repeat=repeat, number=number)]
+
+
+def run(args: argparse.Namespace) -> dict:
+    results: dict[str, dict] = {}
+    for bench in BENCHMARKS:
+        if args.filter and args.filter not in bench.name:
+            continue
+        for size in bench.sizes:
+            if size > args.max_size:
+                continue
+            key = f"{bench.name}[{size}]"
+            timings = measure(bench.setup(size), args.repeat, args.min_time)
+            results[key] = {
+                "size": size,
+                "min_s": min(timings),
+                "median_s": statistics.median(timings),
+                "per_item_us": round(statistics.median(timings) / size * 1e6, 4),
+            }
+            logger.info(f"{key}: {statistics.median(timings) * 1000:.3f} ms")
+
+    return {
+        "meta": {
+            "created_at": datetime.now(UTC).isoformat(),
+            "python": platform.python_version(),
+            "pydantic": pydantic.VERSION,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Сравнить с базовыми результатами, вернуть список регрессий.
+    Сравнивается лучшее время из повторов: оно меньше всего зависит от шума
+    """
+
+    for key in ("python", "pydantic", "machine"):
+        if report["meta"][key] != baseline["meta"].get(key):
+            logger.warning(f"Baseline {key} differs: {baseline['meta'].get(key)} vs {report['meta'][key]}")
+
+    regressions = []
+    for key, result in report["results"].items():
+        base = baseline["results"].get(key)
+        if base is None:
+            logger.info(f"{key}: no baseline")
+            continue
+
+        ratio = result["min_s"] / base["min_s"]
+        change = f"{(ratio - 1) * 100:+.1f}%"
+        if ratio > 1 + threshold:
+            regressions.append(key)
+            logger.error(f"{key}: REGRESSION {change}")
+        elif ratio < 1 - threshold:
+            logger.success(f"{key}: improved {change}")
+        else:
+            logger.info(f"{key}: {change}")
+    return regressions
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmarks of validation and serialization hot paths",
+    )
+    parser.add_argument(
+        "--filter",
+        type=str,
+        help="Run only benchmarks whose name contains this substring",
+    )
+    parser.add_argument(
+        "--max-size",
+        type=int,
+        default=max(MESSAGE_SIZES),
+        help="Skip cases larger than this (default: 100000)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of timed repeats per case (default: 5)",
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.2,
+        help="Minimum duration of one repeat in seconds (default: 0.2)",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Write results as JSON to this file",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=DEFAULT_BASELINE,
+        help=f"Baseline to compare against (default: {DEFAULT_BASELINE.name})",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Relative slowdown reported as a regression (default: 0.2)",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store results as the new baseline instead of comparing",
+    )
+    return parser
+
+
+def main() -> None:
+    parser = build_arg_parser()
+    args = parser.parse_args()
+    report = run(args)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        logger.success(f"Baseline saved to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        logger.warning(f"Baseline {args.baseline} not found, nothing to compare")
+        return
+
+    regressions = compare(report, json.loads(args.baseline.read_text()), args.threshold)
+    if regressions:
+        logger.error(f"{len(regressions)} regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
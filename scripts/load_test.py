@@ -0,0 +1,377 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import secrets
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+import uvicorn
+from loguru import logger
+
+
+def _ensure_src_on_sys_path() -> None:
+    project_root = Path(__file__).resolve().parents[1]
+    src_path = project_root / "src"
+    if str(src_path) not in sys.path:
+        sys.path.insert(0, str(src_path))
+
+
+_ensure_src_on_sys_path()
+
+from core.database.models import Channel, ChatBot  # noqa: E402
+from core.database.models.channel import ChannelSettings  # noqa: E402
+from core.database.registry import initialize_database  # noqa: E402
+
+SRC_PATH = Path(__file__).resolve().parents[1] / "src"
+
+
+class ChannelReceiver:
+    """
+    Заглушка каналов: ASGI-приложение, принимающее исходящие сообщения.
+
+    URL канала — /channels/<номер>. Ответ в канал не ссылается на вопрос,
+    но ответы одного чата приходят по порядку, поэтому ответ достаётся
+    самому старому ожидающему сообщению канала. Ожидания хранятся по
+    message_id: опоздавший ответ после таймаута закрывает своё ожидание,
+    а не следующее.
+    """
+
+    def __init__(self) -> None:
+        self.received = 0
+        self._waiters: dict[int, dict[str, asyncio.Future[float]]] = {}
+
+    def expect(self, channel_index: int, message_id: str) -> asyncio.Future[float]:
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(channel_index, {})[message_id] = future
+        return future
+
+    def discard(self, channel_index: int, message_id: str) -> None:
+        """Сообщение не принято, ответа на него не будет"""
+
+        self._waiters.get(channel_index, {}).pop(message_id, None)
+
+    async def __call__(self, scope: dict, receive, send) -> None:
+        if scope["type"] != "http":
+            return
+
+        received_at = time.perf_counter()
+        while (await receive()).get("more_body"):
+            pass
+
+        self.received += 1
+        try:
+            channel_index = int(scope["path"].rsplit("/", 1)[-1])
+        except ValueError:
+            channel_index = -1
+        waiters = self._waiters.get(channel_index)
+        if waiters:
+            future = waiters.pop(next(iter(waiters)))
+            if not future.done():
+                future.set_result(received_at)
+
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+
+@dataclass
+class LoadStats:
+    webhook_latencies: list[float] = field(default_factory=list)
+    delivery_latencies: list[float] = field(default_factory=list)
+    statuses: dict[int, int] = field(default_factory=dict)
+    lost_replies: int = 0
+
+
+async def seed(chatbots: int, channels: int, receiver_url: str) -> tuple[list[ChatBot], list[Channel]]:
+    bots = [ChatBot(name=f"load-bot-{i + 1}", secret_token=secrets.token_urlsafe(24)) for i in range(chatbots)]
+    result = await ChatBot.insert_many(bots)
+    for bot, bot_id in zip(bots, result.inserted_ids, strict=True):
+        bot.id = bot_id
+
+    created = [
+        Channel(
+            name=f"load-channel-{i}",
+            chat_bot_id=bots[i % len(bots)].id,
+            settings=ChannelSettings(
+                url=f"{receiver_url}/channels/{i}",
+                token=f"load-{uuid.uuid4().hex}",
+            ),
+        )
+        for i in range(channels)
+    ]
+    result = await Channel.insert_many(created)
+    for channel, channel_id in zip(created, result.inserted_ids, strict=True):
+        channel.id = channel_id
+    return bots, created
+
+
+async def cleanup(bots: list[ChatBot]) -> None:
+    bot_ids = [bot.id for bot in bots]
+    await Channel.find({"chat_bot_id": {"$in": bot_ids}}).delete()
+    await ChatBot.find({"_id": {"$in": bot_ids}}).delete()
+
+
+async def virtual_user(
+    client: httpx.AsyncClient,
+    receiver: ChannelReceiver,
+    channel_index: int,
+    channel: Channel,
+    token: str,
+    args: argparse.Namespace,
+    deadline: float,
+    stats: LoadStats,
+) -> None:
+    """Пишет в свой канал и после сообщения клиента ждёт ответа в заглушке"""
+
+    while time.perf_counter() < deadline:
+        is_employee = random.random() < args.employee_ratio
+        payload = {
+            "message_id": uuid.uuid4().hex,
+            "chat_id": str(channel.id),
+            "text": "Hello from load test",
+            "message_sender": "employee" if is_employee else "customer",
+        }
+        reply = None if is_employee else receiver.expect(channel_index, payload["message_id"])
+
+        started = time.perf_counter()
+        try:
+            response = await client.post(
+                "/api/webhook/new_message",
+                json=payload,
+                headers={"x-chatbot_auth_token": f"Bearer {token}"},
+            )
+            status_code = response.status_code
+        except httpx.HTTPError:
+            status_code = 0
+        stats.webhook_latencies.append(time.perf_counter() - started)
+        stats.statuses[status_code] = stats.statuses.get(status_code, 0) + 1
+
+        if reply is None:
+            continue
+        if status_code != 202 or response.json()["job_id"] is None:
+            receiver.discard(channel_index, payload["message_id"])
+            continue
+        try:
+            received_at = await asyncio.wait_for(reply, timeout=args.reply_timeout)
+            stats.delivery_latencies.append(received_at - started)
+        except TimeoutError:
+            stats.lost_replies += 1
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    if len(values) < 2:
+        return {}
+    cuts = statistics.quantiles(values, n=100)
+    return {
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+        "max_ms": round(max(values) * 1000, 2),
+    }
+
+
+def start_server(args: argparse.Namespace) -> subprocess.Popen:
+    """Приложение в отдельном процессе с быстрым mock LLM"""
+
+    env = {
+        **os.environ,
+        "LLM__MOCK_MIN_DELAY": str(args.llm_delay),
+        "LLM__MOCK_MAX_DELAY": str(args.llm_delay),
+        "LOGGING__ACCESS_LOG_SAMPLE_RATE": "0",
+        # Меряем пропускную способность, а не лимиты запросов
+        "RATE_LIMIT__ENABLED": "false",
+    }
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.app:app",
+            "--port",
+            str(args.server_port),
+            "--no-access-log",
+        ],
+        cwd=SRC_PATH,
+        env=env,
+    )
+
+
+async def wait_for_server(base_url: str, timeout: float = 30) -> None:
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while True:
+            try:
+                await client.get("/api/system/llm")
+                return
+            except httpx.TransportError:
+                if time.perf_counter() > deadline:
+                    raise
+                await asyncio.sleep(0.2)
+
+
+async def async_main(args: argparse.Namespace) -> dict:
+    await initialize_database()
+
+    receiver = ChannelReceiver()
+    receiver_server = uvicorn.Server(
+        uvicorn.Config(
+            receiver,
+            host="127.0.0.1",
+            port=args.receiver_port,
+            log_level="warning",
+            access_log=False,
+        )
+    )
+    receiver_task = asyncio.create_task(receiver_server.serve())
+    server = None
+    bots: list[ChatBot] = []
+
+    try:
+        bots, channels = await seed(args.chatbots, args.concurrency, f"http://127.0.0.1:{args.receiver_port}")
+        tokens = {bot.id: bot.secret_token for bot in bots}
+
+        server = start_server(args) if args.start_server else None
+        base_url = f"http://127.0.0.1:{args.server_port}" if server is not None else args.url
+        await wait_for_server(base_url)
+        stats = LoadStats()
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.reply_timeout) as client:
+            logger.info(f"Running {args.concurrency} virtual users for {args.duration}s against {base_url}")
+            started = time.perf_counter()
+            deadline = started + args.duration
+            await asyncio.gather(
+                *(
+                    virtual_user(
+                        client,
+                        receiver,
+                        index,
+                        channel,
+                        tokens[channel.chat_bot_id],
+                        args,
+                        deadline,
+                        stats,
+                    )
+                    for index, channel in enumerate(channels)
+                )
+            )
+            elapsed = time.perf_counter() - started
+    finally:
+        if bots and not args.keep:
+            await cleanup(bots)
+        if server is not None:
+            server.terminate()
+            server.wait()
+        receiver_server.should_exit = True
+        await receiver_task
+
+    return {
+        "duration_s": round(elapsed, 2),
+        "requests": len(stats.webhook_latencies),
+        "requests_per_s": round(len(stats.webhook_latencies) / elapsed, 1),
+        "statuses": stats.statuses,
+        "webhook_latency": percentiles(stats.webhook_latencies),
+        "delivered": len(stats.delivery_latencies),
+        "lost_replies": stats.lost_replies,
+        "delivery_latency": percentiles(stats.delivery_latencies),
+        "receiver_requests": receiver.received,
+    }
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Load test: seed chatbots and channels, drive /api/webhook/new_message "
+            "and measure webhook and end-to-end delivery latency"
+        ),
+    )
+    parser.add_argument(
+        "--url",
+        type=str,
+        default="http://127.0.0.1:8000",
+        help="Base URL of a running app (default: http://127.0.0.1:8000)",
+    )
+    parser.add_argument(
+        "--start-server",
+        action="store_true",
+        help="Start the app in a subprocess with a fast mock LLM instead of using --url",
+    )
+    parser.add_argument(
+        "--server-port",
+        type=int,
+        default=8100,
+        help="Port for --start-server (default: 8100)",
+    )
+    parser.add_argument(
+        "--llm-delay",
+        type=float,
+        default=0.0,
+        help="Mock LLM delay in seconds for --start-server (default: 0)",
+    )
+    parser.add_argument(
+        "--receiver-port",
+        type=int,
+        default=8200,
+        help="Port of the stub channel receiver (default: 8200)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=50,
+        help="Number of virtual users, one channel each (default: 50)",
+    )
+    parser.add_argument(
+        "--chatbots",
+        type=int,
+        default=2,
+        help="Number of chatbots the channels are spread over (default: 2)",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=30,
+        help="Test duration in seconds (default: 30)",
+    )
+    parser.add_argument(
+        "--employee-ratio",
+        type=float,
+        default=0.2,
+        help="Share of employee messages that get no reply (default: 0.2)",
+    )
+    parser.add_argument(
+        "--reply-timeout",
+        type=float,
+        default=30,
+        help="Seconds to wait for a reply at the stub receiver (default: 30)",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Write the report as JSON to this file",
+    )
+    parser.add_argument(
+        "--keep",
+        action="store_true",
+        help="Keep seeded chatbots and channels after the run",
+    )
+    return parser
+
+
+def main() -> None:
+    parser = build_arg_parser()
+    args = parser.parse_args()
+    report = asyncio.run(async_main(args))
+
+    logger.info(f"Load test report:\n{json.dumps(report, indent=2)}")
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
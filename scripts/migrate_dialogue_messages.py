@@ -0,0 +1,145 @@
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from loguru import logger
+
+
+def _ensure_src_on_sys_path() -> None:
+    project_root = Path(__file__).resolve().parents[1]
+    src_path = project_root / "src"
+    if str(src_path) not in sys.path:
+        sys.path.insert(0, str(src_path))
+
+
+_ensure_src_on_sys_path()
+
+from core.database.models import Dialogue, Message  # noqa: E402
+from core.database.registry import initialize_database  # noqa: E402
+
+
+async def merge_duplicate_dialogues() -> tuple[int, int]:
+    """
+    Слить диалоги одного чата (гонка find-then-insert) в самый ранний,
+    иначе уникальный индекс Dialogue.chat_id не построится.
+    Возвращает (слито диалогов, чатов, требующих ручного разбора)
+    """
+
+    collection = Dialogue.get_pymongo_collection()
+    groups = await collection.aggregate(
+        [
+            {"$group": {"_id": "$chat_id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+        ],
+        allowDiskUse=True,
+    ).to_list(None)
+
+    merged = 0
+    unresolved = 0
+    for group in groups:
+        keeper, *duplicates = await collection.find({"_id": {"$in": group["ids"]}}).sort("_id", 1).to_list(None)
+        raws = [keeper, *duplicates]
+        # Уже перенесённые сообщения или разные боты: автоматически не сливаем
+        if any("message_list" not in raw or raw["chat_bot_id"] != keeper["chat_bot_id"] for raw in raws):
+            logger.error(f"Chat '{group['_id']}' has {len(raws)} dialogues that need a manual merge: {group['ids']}")
+            unresolved += 1
+            continue
+
+        message_list = [item for raw in raws for item in raw["message_list"]]
+        await collection.update_one({"_id": keeper["_id"]}, {"$set": {"message_list": message_list}})
+        await collection.delete_many({"_id": {"$in": [raw["_id"] for raw in duplicates]}})
+        logger.warning(f"Merged {len(duplicates)} duplicate dialogues of chat '{group['_id']}'")
+        merged += len(duplicates)
+    return merged, unresolved
+
+
+async def migrate_dialogue(raw: dict) -> tuple[int, int]:
+    """
+    Перенести встроенный message_list одного диалога в коллекцию Message.
+    Повторы message_id (ретраи мессенджеров) отбрасываются: (chat_id,
+    message_id) в Message уникален. Возвращает (перенесено, отброшено)
+    """
+
+    items = []
+    message_ids: set[str] = set()
+    for item in raw.get("message_list") or []:
+        if item["message_id"] not in message_ids:
+            message_ids.add(item["message_id"])
+            items.append(item)
+
+    messages = [
+        Message(
+            dialogue_id=raw["_id"],
+            chat_id=raw["chat_id"],
+            seq=seq,
+            role=item["role"],
+            text=item["text"],
+            message_id=item["message_id"],
+        )
+        for seq, item in enumerate(items, start=1)
+    ]
+    # Повторный запуск после сбоя не должен дублировать сообщения
+    await Message.find(Message.dialogue_id == raw["_id"]).delete()
+    if messages:
+        await Message.insert_many(messages)
+
+    await Dialogue.find_one({"_id": raw["_id"]}).update(
+        {"$set": {"last_seq": len(messages)}, "$unset": {"message_list": ""}}
+    )
+    return len(messages), len(raw.get("message_list") or []) - len(messages)
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    # Уникальные индексы строятся после очистки дубликатов
+    await initialize_database(create_indexes=False)
+
+    merged, unresolved = await merge_duplicate_dialogues()
+    if unresolved:
+        logger.error(f"{unresolved} chats still have duplicate dialogues, merge them and run the migration again")
+        sys.exit(1)
+
+    collection = Dialogue.get_pymongo_collection()
+    cursor = collection.find(
+        {"message_list": {"$exists": True}},
+        batch_size=args.batch_size,
+    )
+
+    dialogues = 0
+    messages = 0
+    skipped = 0
+    async for raw in cursor:
+        migrated, duplicates = await migrate_dialogue(raw)
+        messages += migrated
+        skipped += duplicates
+        dialogues += 1
+
+    logger.success(
+        f"Migrated {messages} messages from {dialogues} dialogues, "
+        f"skipped {skipped} duplicate messages, merged {merged} duplicate dialogues"
+    )
+
+    await initialize_database()
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Move embedded Dialogue.message_list into the Message collection",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100,
+        help="Cursor batch size when reading dialogues (default: 100)",
+    )
+    return parser
+
+
+def main() -> None:
+    parser = build_arg_parser()
+    args = parser.parse_args()
+    asyncio.run(async_main(args))
+
+
+if __name__ == "__main__":
+    main()
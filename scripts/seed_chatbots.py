@@ -21,7 +21,7 @@ def _ensure_src_on_sys_path() -> None:
 _ensure_src_on_sys_path()
 
 
-async def create_chatbots(names: List[str]) -> List[ChatBot]:
+async def create_chatbots(names: List[str], response_cache: bool = False) -> List[ChatBot]:
     created: List[ChatBot] = []
     for name in names:
         existing = await ChatBot.find_one(ChatBot.name == name)
@@ -32,6 +32,7 @@ async def create_chatbots(names: List[str]) -> List[ChatBot]:
         bot = ChatBot(
             name=name,
             secret_token=secrets.token_urlsafe(24),
+            response_cache=response_cache,
         )
         await bot.insert()
         created.append(bot)
@@ -57,9 +58,9 @@ async def async_main(args: argparse.Namespace) -> None:
     else:
         count = max(1, args.count)
         prefix = args.prefix or "test-bot"
-        names = [f"{prefix}-{i+1}" for i in range(count)]
+        names = [f"{prefix}-{i + 1}" for i in range(count)]
 
-    bots = await create_chatbots(names)
+    bots = await create_chatbots(names, response_cache=args.response_cache)
 
     logger.debug("Created/Found chatbots:")
     for b in bots:
@@ -87,6 +88,11 @@ def build_arg_parser() -> argparse.ArgumentParser:
         type=str,
         help="Comma-separated list of chatbot names to create (overrides --count/--prefix)",
     )
+    parser.add_argument(
+        "--response-cache",
+        action="store_true",
+        help="Enable LLM response caching for created chatbots",
+    )
     parser.add_argument(
         "--clear",
         action="store_true",
@@ -1,27 +1,51 @@
-from collections.abc import AsyncGenerator
-from contextlib import asynccontextmanager
-
-from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
-
-from app.routers import router as main_router
-from core.database import initialize_database
-
-
-@asynccontextmanager
-async def lifespan(app: FastAPI) -> AsyncGenerator[None]:
-    await initialize_database()
-    yield
-
-
-app = FastAPI(
-    lifespan=lifespan,
-)
-
-
-@app.get("/", include_in_schema=False)
-def index_to_docs_redirect() -> RedirectResponse:
-    return RedirectResponse(url="docs")
-
-
-app.include_router(main_router)
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.responses import RedirectResponse
+from loguru import logger
+
+from app.middleware import MetricsMiddleware, TracingMiddleware
+from app.responses import FastJSONResponse
+from app.routers import router as main_router
+from app.services.http_client import channel_http_client
+from app.services.job_pipeline import reply_pipeline
+from app.services.outbox_worker import outbox_worker
+from core import settings
+from core.database import initialize_database
+from core.logs import configure_logger
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator[None]:
+    # Воркеры uvicorn (reload и workers > 1) — отдельные процессы,
+    # настройка логов из main() до них не доходит
+    configure_logger()
+    await initialize_database()
+    await channel_http_client.start()
+    await outbox_worker.start()
+    await reply_pipeline.start()
+    yield
+    await reply_pipeline.stop()
+    await outbox_worker.stop()
+    await channel_http_client.stop()
+    # Дописать записи, ждущие в очереди при LOGGING__ENQUEUE
+    await logger.complete()
+
+
+app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
+if settings.tracing.enabled:
+    app.add_middleware(TracingMiddleware)
+if settings.metrics.enabled:
+    app.add_middleware(MetricsMiddleware)
+
+
+@app.get("/", include_in_schema=False)
+def index_to_docs_redirect() -> RedirectResponse:
+    return RedirectResponse(url="docs")
+
+
+app.include_router(main_router)
@@ -0,0 +1,91 @@
+import secrets
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.metrics import (
+    http_request_duration,
+    http_requests,
+    http_requests_in_progress,
+)
+from core import settings
+from core.tracing import tracer
+
+DEBUG_TRACE_HEADER = b"x-debug-trace"
+
+
+class MetricsMiddleware:
+    """
+    Счётчик запросов и гистограмма длительности по шаблону маршрута
+    (/api/channels/{channel_id}, а не конкретный путь, чтобы число рядов
+    метрик не росло с числом объектов). Запросы без маршрута — "unmatched".
+
+    Чистый ASGI middleware: не буферизует тело ответа, поэтому не мешает
+    потоковым ответам. Для потоковых ответов длительность — до конца потока.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        http_requests_in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_progress.dec()
+            # Роутер записывает найденный маршрут в scope
+            route = scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            http_request_duration.observe(time.perf_counter() - started, method, route_path)
+            http_requests.inc(method, route_path, str(status_code))
+
+
+class TracingMiddleware:
+    """
+    Трейс каждого запроса: спаны вызовов сервисов и команд Mongo.
+
+    Запрос с заголовком X-Debug-Trace, равным TRACING__DEBUG_TOKEN, трейсится
+    и профилируется всегда. Ответ на запрос, попавший в выборку, содержит
+    заголовок X-Trace-Id, трейс доступен в GET /api/system/traces/{trace_id}.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        force = False
+        if settings.tracing.debug_token:
+            debug_token = dict(scope["headers"]).get(DEBUG_TRACE_HEADER, b"")
+            force = secrets.compare_digest(debug_token, settings.tracing.debug_token.encode())
+
+        with tracer.trace(f"{scope['method']} {scope['path']}", force) as trace:
+            if trace is None or not trace.sampled:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-trace-id", trace.id.encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
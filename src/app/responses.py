@@ -0,0 +1,39 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+
+from core.serialization import dumps
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse с кодированием через orjson (если установлен), ответ по умолчанию"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class ValidatedJSONResponse(Response):
+    """
+    Ответ из уже провалидированных pydantic-моделей (или списков моделей).
+
+    FastAPI перед отдачей превращает модель в словарь и валидирует его по
+    response_model ещё раз. Эндпоинт, вернувший этот ответ, пропускает
+    повторную валидацию: модели сериализуются pydantic-core за один проход.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: dict[str, str] | None = None,
+        background: BackgroundTask | None = None,
+    ) -> None:
+        super().__init__(content, status_code, headers, self.media_type, background)
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
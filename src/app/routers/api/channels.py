@@ -1,21 +1,33 @@
-from typing import List
+from typing import Annotated, List
 
 from bson.errors import InvalidId
-from fastapi import APIRouter, HTTPException, Response, status
-
-from app.schemas.channel import ChannelCreate, ChannelResponse, ChannelUpdate
+from fastapi import APIRouter, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+
+from app.responses import FastJSONResponse, ValidatedJSONResponse
+from app.schemas.channel import (
+    ChannelBulkCreate,
+    ChannelBulkDelete,
+    ChannelBulkResult,
+    ChannelBulkUpdate,
+    ChannelCreate,
+    ChannelResponse,
+    ChannelUpdate,
+)
+from app.schemas.dialogue import DialogueHistoryPage
 from app.services.channel_service import ChannelService
-from app.services.chat_service import ChatService
+from app.services.dialogue_service import DialogueService
+from core import settings
 
 router = APIRouter(prefix="/channels", tags=["channels"])
 
 
 @router.post("/", response_model=ChannelResponse)
-async def create_channel(channel_data: ChannelCreate) -> ChannelResponse:
+async def create_channel(channel_data: ChannelCreate) -> ValidatedJSONResponse:
     """Создать канал"""
 
     try:
-        return await ChannelService.create_channel(channel_data)
+        channel = await ChannelService.create_channel(channel_data)
     except (InvalidId, TypeError) as e:
         raise HTTPException(status_code=422, detail=str(e))
     except KeyError as e:
@@ -23,26 +35,96 @@ async def create_channel(channel_data: ChannelCreate) -> ChannelResponse:
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    return ValidatedJSONResponse(channel)
+
 
-@router.get("/", response_model=List[ChannelResponse])
+@router.get(
+    "/",
+    response_model=None,
+    responses={status.HTTP_200_OK: {"model": List[ChannelResponse]}},
+)
 async def get_channels(
-    chat_bot_id: str | None = None, active: bool | None = None
-) -> List[ChannelResponse]:
-    """Получить список каналов по id чат бота и/или флагу активности"""
+    chat_bot_id: str | None = None,
+    active: bool | None = None,
+    limit: Annotated[
+        int | None,
+        Query(ge=1, le=settings.channels.max_page_size, description="Без limit и cursor возвращаются все каналы"),
+    ] = None,
+    cursor: str | None = None,
+    fields: Annotated[str | None, Query(description="Поля ответа через запятую, например id,name")] = None,
+) -> FastJSONResponse:
+    """
+    Получить страницу каналов по id чат бота и/или флагу активности.
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor
+    """
     try:
-        channels = await ChannelService.get_channels_by_chatbot(chat_bot_id, active)
-    except (InvalidId, TypeError) as e:
+        channels, next_cursor = await ChannelService.get_channels_by_chatbot(
+            chat_bot_id,
+            active,
+            limit=limit,
+            cursor=cursor,
+            fields=[field.strip() for field in fields.split(",")] if fields else None,
+        )
+    except (InvalidId, TypeError, ValueError) as e:
         raise HTTPException(status_code=422, detail=str(e))
     except KeyError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    return [ChannelResponse.from_model(channel) for channel in channels]
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return FastJSONResponse(channels, headers=headers)
+
+
+def _check_bulk_size(size: int) -> None:
+    if size > settings.channels.max_bulk_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Bulk size exceeds {settings.channels.max_bulk_size} channels",
+        )
+
+
+@router.post("/bulk", response_model=list[ChannelBulkResult])
+async def bulk_create_channels(data: ChannelBulkCreate) -> ValidatedJSONResponse:
+    """Создать пачку каналов, результат по каждому каналу в порядке запроса"""
+
+    _check_bulk_size(len(data.channels))
+    try:
+        results = await ChannelService.bulk_create_channels(data)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return ValidatedJSONResponse(results)
+
+
+@router.put("/bulk", response_model=list[ChannelBulkResult])
+async def bulk_update_channels(data: ChannelBulkUpdate) -> ValidatedJSONResponse:
+    """Обновить пачку каналов, результат по каждому каналу в порядке запроса"""
+
+    _check_bulk_size(len(data.channels))
+    try:
+        results = await ChannelService.bulk_update_channels(data)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return ValidatedJSONResponse(results)
+
+
+@router.post("/bulk/delete", response_model=list[ChannelBulkResult])
+async def bulk_delete_channels(data: ChannelBulkDelete) -> ValidatedJSONResponse:
+    """Удалить пачку каналов, результат по каждому каналу в порядке запроса"""
+
+    _check_bulk_size(len(data.ids))
+    try:
+        results = await ChannelService.bulk_delete_channels(data)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return ValidatedJSONResponse(results)
 
 
 @router.get("/{channel_id}", response_model=ChannelResponse)
-async def get_channel(channel_id: str) -> ChannelResponse:
+async def get_channel(channel_id: str) -> ValidatedJSONResponse:
     """Получить канал по его id"""
 
     try:
@@ -54,13 +136,11 @@ async def get_channel(channel_id: str) -> ChannelResponse:
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    return ChannelResponse.from_model(channel)
+    return ValidatedJSONResponse(ChannelResponse.from_model(channel))
 
 
 @router.put("/{channel_id}", response_model=ChannelResponse)
-async def update_channel(
-    channel_id: str, update_data: ChannelUpdate
-) -> ChannelResponse:
+async def update_channel(channel_id: str, update_data: ChannelUpdate) -> ValidatedJSONResponse:
     """Обновить информацию о канале"""
 
     try:
@@ -72,7 +152,7 @@ async def update_channel(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    return channel
+    return ValidatedJSONResponse(channel)
 
 
 @router.delete("/{channel_id}")
@@ -87,16 +167,28 @@ async def delete_channel(channel_id: str) -> Response:
         raise HTTPException(status_code=400, detail=str(e))
 
     if not success:
-        raise HTTPException(
-            status_code=404, detail=f"Channel with id: '{channel_id}' not found"
-        )
+        raise HTTPException(status_code=404, detail=f"Channel with id: '{channel_id}' not found")
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
-@router.get("/{channel_id}/dialogue", response_model=List[dict])
-async def get_channel_dialogue(channel_id: str) -> List[dict]:
-    """Получить диалог из канала"""
+@router.get("/{channel_id}/dialogue", response_model=DialogueHistoryPage)
+async def get_channel_dialogue(
+    channel_id: str,
+    before: Annotated[int | None, Query(ge=1)] = None,
+    after: Annotated[int | None, Query(ge=0)] = None,
+    limit: Annotated[int, Query(ge=1, le=settings.dialogue.history_max_page_size)] = 100,
+    stream: bool = False,
+) -> ValidatedJSONResponse | StreamingResponse:
+    """
+    Получить историю диалога канала постранично по курсору seq.
+    С stream=true вся история после курсора after отдаётся в NDJSON
+    """
+
+    if before is not None and after is not None:
+        raise HTTPException(status_code=422, detail="Only one of 'before' and 'after' is allowed")
+    if stream and before is not None:
+        raise HTTPException(status_code=422, detail="Streaming supports only the 'after' cursor")
 
     try:
         channel = await ChannelService.get_channel(channel_id)
@@ -107,5 +199,14 @@ async def get_channel_dialogue(channel_id: str) -> List[dict]:
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    messages = await ChatService.get_dialogue_history(str(channel.chat_bot_id))
-    return [{"role": msg.role, "text": msg.text} for msg in messages]
+    if stream:
+        messages = DialogueService.iter_history(str(channel.id), after=after or 0)
+        return StreamingResponse(
+            (message.model_dump_json() + "\n" async for message in messages),
+            media_type="application/x-ndjson",
+        )
+
+    messages, next_cursor = await DialogueService.get_history_page(
+        str(channel.id), limit=limit, before=before, after=after
+    )
+    return ValidatedJSONResponse(DialogueHistoryPage(messages=messages, next_cursor=next_cursor))
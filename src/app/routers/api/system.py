@@ -0,0 +1,56 @@
+from typing import Any
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.services.chat_service import seen_messages
+from app.services.lookup_cache import LookupCache
+from core.tracing import tracer
+from predict import llm_scheduler, response_cache
+
+router = APIRouter(prefix="/system", tags=["system"])
+
+
+@router.get("/cache")
+async def get_cache_stats() -> dict[str, dict[str, int | float]]:
+    """Получить счётчики попаданий/промахов/вытеснений in-memory кэшей"""
+
+    return {
+        **LookupCache.stats(),
+        "seen_messages": seen_messages.stats(),
+        "llm_responses": response_cache.stats(),
+    }
+
+
+@router.get("/llm")
+async def get_llm_stats() -> dict[str, dict]:
+    """Получить состояние очереди к LLM: глубина, ожидание и отказы по чат-ботам"""
+
+    return llm_scheduler.stats()
+
+
+@router.get("/traces")
+async def get_traces() -> list[dict[str, Any]]:
+    """Последние сохранённые трейсы: выбранные, медленные и с X-Debug-Trace"""
+
+    return [trace.summary() for trace in tracer.recent()]
+
+
+@router.get("/traces/{trace_id}")
+async def get_trace(trace_id: str) -> dict[str, Any]:
+    """Спаны трейса: вызовы сервисов и команды Mongo с временем от начала"""
+
+    trace = tracer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"Trace '{trace_id}' not found")
+    return trace.to_dict()
+
+
+@router.get("/traces/{trace_id}/profile", response_class=PlainTextResponse)
+async def get_trace_profile(trace_id: str) -> str:
+    """Профиль трейса в свёрнутом формате (flamegraph.pl, speedscope)"""
+
+    trace = tracer.get(trace_id)
+    if trace is None or trace.profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile of trace '{trace_id}' not found")
+    return trace.folded_profile()
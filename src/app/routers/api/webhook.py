@@ -1,9 +1,29 @@
+import asyncio
+import json
 import uuid
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
 
-from app.schemas.message import MessageWebhook
+from app.schemas.job import JobResponse
+from app.schemas.message import MessageBatchResult, MessageWebhook
 from app.services.chat_service import ChatService
+from app.services.job_pipeline import Job, reply_pipeline
+from app.services.rate_limiter import RateLimitExceeded, RateLimitService
+from app.services.reply_stream import ReplyStream
+from core import settings
+from predict import LLMQueueFull
 
 router = APIRouter(prefix="/webhook", tags=["webhook"])
 
@@ -23,20 +43,153 @@ def require_header(header_name: str):
     return dependency
 
 
-@router.post("/new_message")
-async def new_message(
-    message_data: MessageWebhook,
-    chatbot_auth_token: str = Depends(require_header("x-chatbot_auth_token")),
-) -> dict[str, str]:
-    """Отправить новое сообщение в канал и получить сообщение от LLM, если отправитель не сотрудник"""
-    if not message_data.message_id:
-        message_data.message_id = str(uuid.uuid4())
+ChatBotToken = Annotated[str, Depends(require_header("x-chatbot_auth_token"))]
+
+
+@contextmanager
+def _webhook_errors() -> Iterator[None]:
+    """
+    Ошибки приёма сообщения в HTTP-ответы: лимиты и переполнение очередей —
+    429 / 503 с Retry-After, неизвестный или неверный токен — 401
+    """
+
     try:
-        await ChatService.process_webhook_message(chatbot_auth_token, message_data)
-        return {"status": "Message processed successfully"}
-    except ValueError as e:
-        raise HTTPException(status_code=401, detail=str(e))
-    except KeyError as e:
+        yield
+    except RateLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers=e.result.headers)
+    except LLMQueueFull as e:
+        # 429 при переполнении очереди бота, 503 — общей очереди к LLM
+        raise HTTPException(
+            status_code=429 if e.per_chatbot else 503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except asyncio.QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except (ValueError, KeyError) as e:
         raise HTTPException(status_code=401, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/new_message", status_code=status.HTTP_202_ACCEPTED)
+async def new_message(
+    message_data: MessageWebhook,
+    response: Response,
+    chatbot_auth_token: ChatBotToken,
+) -> dict[str, str | None]:
+    """
+    Принять новое сообщение из канала. Ответ LLM генерируется и отправляется
+    в канал в фоне, если отправитель не сотрудник
+    """
+    if not message_data.message_id:
+        message_data.message_id = str(uuid.uuid4())
+    with _webhook_errors():
+        async with RateLimitService.charge_webhook(chatbot_auth_token, [message_data.chat_id]) as rate_limit:
+            job = await ChatService.process_webhook_message(chatbot_auth_token, message_data)
+            # Повтор уже принятого сообщения лимит не расходует
+            if job is None and message_data.message_sender == "customer":
+                await RateLimitService.refund(rate_limit, [message_data.chat_id])
+
+    if rate_limit:
+        response.headers.update(rate_limit.result.headers)
+    return {
+        "status": "Message accepted",
+        "job_id": job.id if job else None,
+    }
+
+
+def _sse(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _reply_events(job: Job | None, stream: ReplyStream) -> AsyncIterator[str]:
+    if job is None:
+        yield _sse("done", {"message_id": None})
+        return
+
+    yield _sse("job", {"job_id": job.id})
+    async for chunk in stream:
+        yield _sse("chunk", {"text": chunk})
+
+    if stream.message is None:
+        detail = job.error or "Reply generation failed"
+        yield _sse("error", {"detail": detail, "job_id": job.id})
+    else:
+        yield _sse("done", stream.message.model_dump())
+
+
+@router.post("/new_message/stream")
+async def new_message_stream(
+    message_data: MessageWebhook,
+    chatbot_auth_token: ChatBotToken,
+) -> StreamingResponse:
+    """
+    Принять новое сообщение и отдать ответ LLM потоком Server-Sent Events
+    по мере генерации. Полный ответ сохраняется и отправляется в канал,
+    даже если клиент отключился раньше
+    """
+    if not message_data.message_id:
+        message_data.message_id = str(uuid.uuid4())
+    stream = ReplyStream()
+    with _webhook_errors():
+        async with RateLimitService.charge_webhook(chatbot_auth_token, [message_data.chat_id]) as rate_limit:
+            job = await ChatService.process_webhook_message(chatbot_auth_token, message_data, stream=stream)
+            if job is None and message_data.message_sender == "customer":
+                await RateLimitService.refund(rate_limit, [message_data.chat_id])
+
+    return StreamingResponse(
+        _reply_events(job, stream),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            **(rate_limit.result.headers if rate_limit else {}),
+        },
+    )
+
+
+@router.post("/new_messages", status_code=status.HTTP_202_ACCEPTED)
+async def new_messages(
+    messages_data: list[MessageWebhook],
+    response: Response,
+    chatbot_auth_token: ChatBotToken,
+) -> dict[str, list[MessageBatchResult]]:
+    """
+    Принять пачку сообщений из каналов. Результат возвращается по каждому
+    сообщению, ошибка в одном сообщении не отменяет остальные
+    """
+    if len(messages_data) > settings.webhook.max_batch_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch size exceeds {settings.webhook.max_batch_size} messages",
+        )
+
+    for message_data in messages_data:
+        if not message_data.message_id:
+            message_data.message_id = str(uuid.uuid4())
+    with _webhook_errors():
+        async with RateLimitService.charge_webhook(
+            chatbot_auth_token, [message_data.chat_id for message_data in messages_data]
+        ) as rate_limit:
+            results = await ChatService.process_webhook_batch(chatbot_auth_token, messages_data)
+            # Дубликаты и сообщения с ошибкой лимит не расходуют
+            await RateLimitService.refund(
+                rate_limit,
+                [result.chat_id for result in results if result.status != "accepted"],
+            )
+
+    if rate_limit:
+        response.headers.update(rate_limit.result.headers)
+    return {"results": results}
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str) -> JobResponse:
+    """Получить статус фоновой задачи обработки сообщения"""
+
+    job = reply_pipeline.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job with id: '{job_id}' not found")
+
+    return JobResponse.from_job(job)
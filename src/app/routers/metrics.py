@@ -0,0 +1,80 @@
+from collections.abc import Callable
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.services.job_pipeline import reply_pipeline
+from app.services.outbox_worker import outbox_worker
+from core.metrics import Counter, Gauge, metrics
+from predict import llm_scheduler
+
+router = APIRouter(tags=["system"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _in_flight() -> dict[tuple[str, ...], float]:
+    pipeline = reply_pipeline.stats()
+    llm = llm_scheduler.stats()["total"]
+    return {
+        ("reply_pipeline", "queued"): pipeline["queued"] + pipeline["delayed"],
+        ("reply_pipeline", "running"): pipeline["running"],
+        ("llm", "queued"): llm["queue_depth"],
+        ("llm", "running"): llm["running"],
+        ("outbox", "running"): outbox_worker.active_channels,
+    }
+
+
+# Состояние очередей читается только при запросе /metrics
+metrics.register(
+    Gauge(
+        "in_flight_tasks",
+        "Number of background tasks by component and state",
+        ("component", "state"),
+        collect=_in_flight,
+    )
+)
+
+
+def _llm_chatbots(key: str) -> Callable[[], dict[tuple[str, ...], float]]:
+    def collect() -> dict[tuple[str, ...], float]:
+        return {(chat_bot_id,): stats[key] for chat_bot_id, stats in llm_scheduler.stats()["chatbots"].items()}
+
+    return collect
+
+
+# Очереди к LLM по ботам: счётчики хранит планировщик, здесь только чтение
+for metric in (
+    Gauge(
+        "llm_queue_depth",
+        "Number of LLM calls waiting for a slot by chatbot",
+        ("chat_bot_id",),
+        collect=_llm_chatbots("queue_depth"),
+    ),
+    Counter(
+        "llm_calls_total",
+        "Number of LLM calls started by chatbot",
+        ("chat_bot_id",),
+        collect=_llm_chatbots("served"),
+    ),
+    Counter(
+        "llm_rejected_total",
+        "Number of messages rejected because the LLM queue was full, by chatbot",
+        ("chat_bot_id",),
+        collect=_llm_chatbots("rejected"),
+    ),
+    Counter(
+        "llm_queue_wait_seconds_total",
+        "Total time LLM calls waited for a slot by chatbot",
+        ("chat_bot_id",),
+        collect=_llm_chatbots("wait_seconds_total"),
+    ),
+):
+    metrics.register(metric)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """Метрики в текстовом формате Prometheus"""
+
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
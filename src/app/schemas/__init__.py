@@ -1,10 +1,30 @@
-from app.schemas.channel import ChannelCreate, ChannelResponse, ChannelUpdate
-from app.schemas.message import MessageWebhook
+from app.schemas.channel import (
+    ChannelBulkCreate,
+    ChannelBulkDelete,
+    ChannelBulkResult,
+    ChannelBulkUpdate,
+    ChannelBulkUpdateItem,
+    ChannelCreate,
+    ChannelResponse,
+    ChannelUpdate,
+)
+from app.schemas.dialogue import DialogueHistoryPage, HistoryMessage
+from app.schemas.job import JobResponse
+from app.schemas.message import MessageBatchResult, MessageWebhook
 
 __all__ = [
+    "ChannelBulkCreate",
+    "ChannelBulkDelete",
+    "ChannelBulkResult",
+    "ChannelBulkUpdate",
+    "ChannelBulkUpdateItem",
     "ChannelCreate",
     "ChannelResponse",
     "ChannelUpdate",
+    "DialogueHistoryPage",
+    "HistoryMessage",
+    "JobResponse",
+    "MessageBatchResult",
     "MessageWebhook",
     "",
 ]
@@ -1,4 +1,5 @@
 import uuid
+from typing import Literal
 
 from pydantic import BaseModel, HttpUrl
 
@@ -14,7 +15,6 @@ class ChannelCreate(BaseModel):
 
     @property
     def settings(self) -> ChannelSettings:
-
         token = str(uuid.uuid4())
 
         return ChannelSettings(url=self.url, token=token)
@@ -45,3 +45,30 @@ class ChannelResponse(BaseModel):
             is_active=channel.is_active,
             token=channel.settings.token,
         )
+
+
+class ChannelBulkCreate(BaseModel):
+    channels: list[ChannelCreate]
+    # ordered: при первой ошибке оставшиеся операции не выполняются
+    ordered: bool = False
+
+
+class ChannelBulkUpdateItem(ChannelUpdate):
+    id: str
+
+
+class ChannelBulkUpdate(BaseModel):
+    channels: list[ChannelBulkUpdateItem]
+    ordered: bool = False
+
+
+class ChannelBulkDelete(BaseModel):
+    ids: list[str]
+    ordered: bool = False
+
+
+class ChannelBulkResult(BaseModel):
+    id: str | None
+    status: Literal["created", "updated", "deleted", "error"]
+    detail: str | None = None
+    channel: ChannelResponse | None = None
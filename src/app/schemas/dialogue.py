@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+
+from core.database.models import MessageRole
+
+
+class HistoryMessage(BaseModel):
+    seq: int
+    message_id: str
+    role: MessageRole
+    text: str
+
+
+class DialogueHistoryPage(BaseModel):
+    messages: list[HistoryMessage]
+    # Значение для before/after следующей страницы, None — страниц больше нет
+    next_cursor: int | None
@@ -8,3 +8,11 @@ class MessageWebhook(BaseModel):
     chat_id: str
     text: str
     message_sender: Literal["customer", "employee"]
+
+
+class MessageBatchResult(BaseModel):
+    message_id: str | None
+    chat_id: str
+    status: Literal["accepted", "duplicate", "error"]
+    job_id: str | None = None
+    detail: str | None = None
@@ -1,7 +1,9 @@
 from app.services.channel_service import ChannelService
 from app.services.chat_service import ChatService
+from app.services.dialogue_service import DialogueService
 
 __all__ = [
     "ChannelService",
     "ChatService",
+    "DialogueService",
 ]
@@ -1,14 +1,119 @@
+import base64
+import json
+from typing import Any
+
+import pymongo
+from beanie import Document, PydanticObjectId
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError
 
-from app.schemas.channel import ChannelCreate, ChannelResponse, ChannelUpdate
+from app.schemas.channel import (
+    ChannelBulkCreate,
+    ChannelBulkDelete,
+    ChannelBulkResult,
+    ChannelBulkUpdate,
+    ChannelCreate,
+    ChannelResponse,
+    ChannelUpdate,
+)
+from app.services.lookup_cache import LookupCache
+from core import settings
 from core.database.models import Channel, ChatBot
+from core.tracing import trace_service
+
+# Поле ответа ChannelResponse -> путь в документе Channel
+CHANNEL_FIELDS = {
+    "id": "_id",
+    "name": "name",
+    "chat_bot_id": "chat_bot_id",
+    "url": "settings.url",
+    "is_active": "is_active",
+    "token": "settings.token",
+}
+
+
+def _encode_cursor(name: str, last_id: ObjectId) -> str:
+    raw = json.dumps([name, str(last_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[str, ObjectId]:
+    try:
+        name, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return name, ObjectId(last_id)
+    except (ValueError, TypeError, InvalidId) as e:
+        raise ValueError(f"Invalid cursor: '{cursor}'") from e
+
+
+def _to_response_dict(document: dict[str, Any], fields: list[str]) -> dict[str, Any]:
+    result = {}
+    for field in fields:
+        value = document
+        for key in CHANNEL_FIELDS[field].split("."):
+            value = value.get(key) if isinstance(value, dict) else None
+        result[field] = str(value) if isinstance(value, ObjectId) else value
+    return result
+
+
+NOT_APPLIED = "Not applied: previous operation failed"
+
+
+def _parse_object_id(value: str) -> ObjectId | None:
+    return ObjectId(value) if ObjectId.is_valid(value) else None
+
+
+async def _existing_ids(model: type[Document], ids: list[ObjectId]) -> set[ObjectId]:
+    """Какие из ids есть в коллекции модели, одним запросом $in"""
 
+    if not ids:
+        return set()
+    documents = await model.get_pymongo_collection().find({"_id": {"$in": list(set(ids))}}, {"_id": True}).to_list()
+    return {document["_id"] for document in documents}
 
+
+def _stopped(results: list[ChannelBulkResult], ordered: bool) -> bool:
+    # В ordered-режиме после первой ошибки ошибочны и все следующие элементы,
+    # поэтому достаточно посмотреть на предыдущий
+    return ordered and len(results) > 1 and results[-2].status == "error"
+
+
+def _fail(result: ChannelBulkResult, detail: str) -> None:
+    result.status = "error"
+    result.detail = detail
+    result.channel = None
+
+
+def _apply_write_errors(
+    results: list[ChannelBulkResult],
+    positions: list[int],
+    error: BulkWriteError,
+    ordered: bool,
+) -> None:
+    """
+    Перенести ошибки bulk-операции на результаты по элементам.
+    positions[i] — номер элемента запроса для i-й операции
+    """
+
+    write_errors = error.details["writeErrors"]
+    if not write_errors:
+        raise error
+
+    for write_error in write_errors:
+        _fail(results[positions[write_error["index"]]], write_error["errmsg"])
+    if ordered:
+        # Ordered bulk останавливается на первой ошибке
+        for position in positions[write_errors[0]["index"] + 1 :]:
+            _fail(results[position], NOT_APPLIED)
+
+
+@trace_service
 class ChannelService:
     @staticmethod
     async def create_channel(channel_data: ChannelCreate) -> ChannelResponse:
         chat_bot_id = ObjectId(channel_data.chat_bot_id)
-        chat_bot = await ChatBot.get(chat_bot_id)
+        chat_bot = await LookupCache.get_chatbot(chat_bot_id)
         if not chat_bot:
             raise KeyError(f"ChatBot with id: '{chat_bot_id}' not found")
 
@@ -24,7 +129,7 @@ class ChannelService:
     @staticmethod
     async def get_channel(channel_id: str) -> Channel | None:
         channel_id = ObjectId(channel_id)
-        channel = await Channel.get(channel_id)
+        channel = await LookupCache.get_channel(channel_id)
         if not channel:
             raise KeyError(f"Channel with id: '{channel_id}' not found")
         return channel
@@ -33,9 +138,17 @@ class ChannelService:
     async def get_channels_by_chatbot(
         chat_bot_id: str | None = None,
         active: bool | None = None,
-    ) -> list[Channel]:
+        limit: int | None = None,
+        cursor: str | None = None,
+        fields: list[str] | None = None,
+    ) -> tuple[list[dict[str, Any]], str | None]:
         """
-        Возвращает каналы отфильтрованные по chat_bot_id и/или флагу активности.
+        Возвращает страницу каналов, отфильтрованных по chat_bot_id и/или
+        флагу активности, и курсор следующей страницы (None — страниц больше нет).
+
+        Каналы отсортированы по (name, _id), страница выбирается по курсору
+        (keyset), а не через skip. Документы читаются из Mongo с проекцией
+        только запрошенных полей и отдаются словарями без валидации моделей.
 
         - chat_bot_id:
           - None: возвращает все каналы
@@ -45,12 +158,24 @@ class ChannelService:
           - True  -> только активные каналы
           - False -> только неактивные каналы
           - None  -> все каналы
+        - limit, cursor:
+          - оба None -> все каналы одним списком, как до пагинации
+          - только cursor -> страница CHANNELS__DEFAULT_PAGE_SIZE каналов
+        - cursor, fields: некорректные значения рейзят ValueError
         """
+        if limit is None and cursor:
+            limit = settings.channels.default_page_size
+
+        fields = fields or list(CHANNEL_FIELDS)
+        unknown_fields = set(fields) - CHANNEL_FIELDS.keys()
+        if unknown_fields:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown_fields))}")
+
         query: dict = {}
 
         if chat_bot_id:
             chat_bot_id = ObjectId(chat_bot_id)
-            if not await ChatBot.get(chat_bot_id):
+            if not await LookupCache.get_chatbot(chat_bot_id):
                 raise KeyError(f"ChatBot with id: '{chat_bot_id}' not found")
             query["chat_bot_id"] = chat_bot_id
 
@@ -59,19 +184,40 @@ class ChannelService:
         elif active is False:
             query["is_active"] = False
 
-        return await Channel.find(query).sort("name").to_list()
+        if cursor:
+            name, last_id = _decode_cursor(cursor)
+            query["$or"] = [
+                {"name": {"$gt": name}},
+                {"name": name, "_id": {"$gt": last_id}},
+            ]
 
-    @staticmethod
-    async def update_channel(
-        channel_id: str, update_data: ChannelUpdate
-    ) -> ChannelResponse | None:
+        projection = {CHANNEL_FIELDS[field]: True for field in fields}
+        projection["name"] = True
+        find = (
+            Channel.get_pymongo_collection()
+            .find(query, projection)
+            .sort([("name", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)])
+        )
+        if limit is not None:
+            find = find.limit(limit + 1)
+        documents = await find.to_list()
+
+        next_cursor = None
+        if limit is not None and len(documents) > limit:
+            documents = documents[:limit]
+            next_cursor = _encode_cursor(documents[-1]["name"], documents[-1]["_id"])
 
+        channels = [_to_response_dict(document, fields) for document in documents]
+        return channels, next_cursor
+
+    @staticmethod
+    async def update_channel(channel_id: str, update_data: ChannelUpdate) -> ChannelResponse | None:
         channel_id = ObjectId(channel_id)
         channel = await Channel.get(channel_id)
         if not channel:
             raise KeyError(f"Channel with id: '{channel_id}' not found")
 
-        update_dict = update_data.model_dump(exclude_unset=True)
+        update_dict = update_data.model_dump(exclude_unset=True, exclude_none=True)
 
         if "url" in update_dict or "token" in update_dict:
             if update_dict.get("url"):
@@ -86,6 +232,7 @@ class ChannelService:
             setattr(channel, field, value)
 
         await channel.save()
+        LookupCache.invalidate_channel(channel_id)
         return ChannelResponse.from_model(channel)
 
     @staticmethod
@@ -95,8 +242,150 @@ class ChannelService:
             return False
 
         await channel.delete()
+        LookupCache.invalidate_channel(channel.id)
         return True
 
+    @staticmethod
+    async def bulk_create_channels(
+        data: ChannelBulkCreate,
+    ) -> list[ChannelBulkResult]:
+        """
+        Пакетное создание каналов.
+
+        Все chat_bot_id проверяются одним запросом $in, каналы вставляются
+        одним insert_many. Ошибка в одном канале не отменяет остальные,
+        при ordered=True каналы после первой ошибки не создаются.
+        """
+
+        chat_bot_ids = [_parse_object_id(item.chat_bot_id) for item in data.channels]
+        existing = await _existing_ids(ChatBot, [i for i in chat_bot_ids if i])
+
+        results: list[ChannelBulkResult] = []
+        channels: list[Channel] = []
+        positions: list[int] = []
+        for index, (item, chat_bot_id) in enumerate(zip(data.channels, chat_bot_ids, strict=True)):
+            result = ChannelBulkResult(id=None, status="created")
+            results.append(result)
+            if _stopped(results, data.ordered):
+                _fail(result, NOT_APPLIED)
+            elif chat_bot_id is None:
+                _fail(result, f"'{item.chat_bot_id}' is not a valid ObjectId")
+            elif chat_bot_id not in existing:
+                _fail(result, f"ChatBot with id: '{chat_bot_id}' not found")
+            else:
+                channel = Channel(
+                    id=PydanticObjectId(),
+                    name=item.name,
+                    chat_bot_id=chat_bot_id,
+                    settings=item.settings,
+                    is_active=item.is_active,
+                )
+                result.id = str(channel.id)
+                result.channel = ChannelResponse.from_model(channel)
+                channels.append(channel)
+                positions.append(index)
+
+        if channels:
+            try:
+                await Channel.insert_many(channels, ordered=data.ordered)
+            except BulkWriteError as e:
+                _apply_write_errors(results, positions, e, data.ordered)
+
+        return results
+
+    @staticmethod
+    async def bulk_update_channels(
+        data: ChannelBulkUpdate,
+    ) -> list[ChannelBulkResult]:
+        """
+        Пакетное обновление каналов одним bulk_write из $set-операций,
+        без чтения и пересохранения документов целиком. Существование
+        каналов и новых chat_bot_id проверяется двумя запросами $in.
+        """
+
+        channel_ids = [_parse_object_id(item.id) for item in data.channels]
+        chat_bot_ids = [_parse_object_id(item.chat_bot_id) if item.chat_bot_id else None for item in data.channels]
+        existing_channels = await _existing_ids(Channel, [i for i in channel_ids if i])
+        existing_chat_bots = await _existing_ids(ChatBot, [i for i in chat_bot_ids if i])
+
+        results: list[ChannelBulkResult] = []
+        operations: list[UpdateOne] = []
+        positions: list[int] = []
+        for index, (item, channel_id, chat_bot_id) in enumerate(
+            zip(data.channels, channel_ids, chat_bot_ids, strict=True)
+        ):
+            result = ChannelBulkResult(id=item.id, status="updated")
+            results.append(result)
+            if _stopped(results, data.ordered):
+                _fail(result, NOT_APPLIED)
+            elif channel_id is None:
+                _fail(result, f"'{item.id}' is not a valid ObjectId")
+            elif channel_id not in existing_channels:
+                _fail(result, f"Channel with id: '{channel_id}' not found")
+            elif item.chat_bot_id and chat_bot_id is None:
+                _fail(result, f"'{item.chat_bot_id}' is not a valid ObjectId")
+            elif chat_bot_id and chat_bot_id not in existing_chat_bots:
+                _fail(result, f"ChatBot with id: '{chat_bot_id}' not found")
+            else:
+                # null означает "не менять": иначе в документ попадёт $set: null
+                update = item.model_dump(
+                    exclude_unset=True,
+                    exclude_none=True,
+                    exclude={"id", "chat_bot_id"},
+                )
+                if "url" in update:
+                    update["settings.url"] = str(update.pop("url"))
+                if chat_bot_id:
+                    update["chat_bot_id"] = chat_bot_id
+                if update:
+                    operations.append(UpdateOne({"_id": channel_id}, {"$set": update}))
+                    positions.append(index)
+
+        if operations:
+            try:
+                await Channel.get_pymongo_collection().bulk_write(operations, ordered=data.ordered)
+            except BulkWriteError as e:
+                _apply_write_errors(results, positions, e, data.ordered)
+
+        for position in positions:
+            LookupCache.invalidate_channel(data.channels[position].id)
+        return results
+
+    @staticmethod
+    async def bulk_delete_channels(
+        data: ChannelBulkDelete,
+    ) -> list[ChannelBulkResult]:
+        """Пакетное удаление каналов одним bulk_write"""
+
+        channel_ids = [_parse_object_id(channel_id) for channel_id in data.ids]
+        existing = await _existing_ids(Channel, [i for i in channel_ids if i])
+
+        results: list[ChannelBulkResult] = []
+        operations: list[DeleteOne] = []
+        positions: list[int] = []
+        for index, (raw_id, channel_id) in enumerate(zip(data.ids, channel_ids, strict=True)):
+            result = ChannelBulkResult(id=raw_id, status="deleted")
+            results.append(result)
+            if _stopped(results, data.ordered):
+                _fail(result, NOT_APPLIED)
+            elif channel_id is None:
+                _fail(result, f"'{raw_id}' is not a valid ObjectId")
+            elif channel_id not in existing:
+                _fail(result, f"Channel with id: '{channel_id}' not found")
+            else:
+                operations.append(DeleteOne({"_id": channel_id}))
+                positions.append(index)
+
+        if operations:
+            try:
+                await Channel.get_pymongo_collection().bulk_write(operations, ordered=data.ordered)
+            except BulkWriteError as e:
+                _apply_write_errors(results, positions, e, data.ordered)
+
+        for position in positions:
+            LookupCache.invalidate_channel(data.ids[position])
+        return results
+
     @staticmethod
     async def get_channel_by_token(token: str) -> Channel | None:
         return await Channel.find_one(Channel.settings.token == token)
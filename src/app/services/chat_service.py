@@ -1,20 +1,41 @@
+import asyncio
+import time
 import uuid
 
-import httpx
 from fastapi import HTTPException, Request
-from loguru import logger
 
-from app.schemas.message import MessageWebhook
+from app.schemas.message import MessageBatchResult, MessageWebhook
+from app.services.conversation import conversations
+from app.services.dialogue_service import DialogueService
+from app.services.job_pipeline import Job, reply_pipeline
+from app.services.lookup_cache import LookupCache
+from app.services.metrics import WebhookStage
+from app.services.outbox_worker import outbox_worker
+from app.services.reply_stream import ReplyStream
+from core import settings
+from core.cache import TTLCache
 from core.database.models import (
     Channel,
-    ChatBot,
     Dialogue,
     DialogueMessage,
     MessageRole,
 )
-from predict.mock_llm_call import mock_llm_call
+from core.tracing import span, trace_service
+from predict import (
+    build_context,
+    llm_scheduler,
+    mock_llm_call,
+    mock_llm_stream,
+    response_cache,
+)
+
+# Недавно обработанные (токен бота, chat_id, message_id) для быстрого отсева дублей
+seen_messages: TTLCache[tuple[str, str, str], bool] = TTLCache(
+    maxsize=settings.dedup.cache_size, ttl=settings.dedup.cache_ttl
+)
 
 
+@trace_service
 class ChatService:
     @staticmethod
     async def verify_token(request: Request, header_name: str) -> str:
@@ -43,79 +64,221 @@ class ChatService:
     async def process_webhook_message(
         chatbot_token: str,
         message_data: MessageWebhook,
-    ) -> None:
-        """Обработка сообщения, поступившего на webhook"""
+        stream: ReplyStream | None = None,
+    ) -> Job | None:
+        """
+        Обработка сообщения, поступившего на webhook.
+
+        Сообщение сохраняется в диалог, а генерация ответа LLM и отправка его
+        в канал ставятся в фоновую очередь (последовательно в пределах чата,
+        несколько сообщений подряд могут получить общую задачу). Возвращает
+        задачу или None, если ответ не требуется (сотрудник или дубликат).
+
+        Со stream ответ получает собственную задачу, которая передаёт
+        фрагменты ответа в stream по мере генерации.
+        """
 
-        chatbot = await ChatBot.find_one(ChatBot.secret_token == chatbot_token)
+        # Повторы сообщений (ретраи мессенджеров) отсекаются без похода в БД.
+        # Токен входит в ключ, поэтому запись в кэше подтверждает и авторизацию
+        seen_key = (chatbot_token, message_data.chat_id, message_data.message_id)
+        if seen_key in seen_messages:
+            return None
+
+        with WebhookStage.CHATBOT_LOOKUP.time():
+            chatbot = await LookupCache.get_chatbot_by_token(chatbot_token)
         if not chatbot:
             raise KeyError(f"ChatBot with chat bot token '{chatbot_token}' not found")
 
-        channel = await Channel.get(message_data.chat_id)
+        with WebhookStage.CHANNEL_LOOKUP.time():
+            channel = await LookupCache.get_channel(message_data.chat_id)
         if not channel:
             raise KeyError(f"Channel with id '{message_data.chat_id}' not found")
 
-        message = DialogueMessage(
-            role=(
-                MessageRole.USER
-                if message_data.message_sender == "customer"
-                else MessageRole.EMPLOYEE
-            ),
-            text=message_data.text,
-            message_id=message_data.message_id,
-        )
+        message = ChatService._to_dialogue_message(message_data)
+
+        # Проверяем заранее, чтобы не сохранить сообщение, на которое не ответим.
+        # Сохранённое сообщение ответ получает всегда: если очередь успела
+        # заполниться, задача встанет в неё позже
+        if message.role == MessageRole.USER:
+            if reply_pipeline.is_full():
+                raise asyncio.QueueFull("Reply queue is full")
+            llm_scheduler.check_capacity(str(chatbot.id))
+
+        with WebhookStage.DIALOGUE_SAVE.time():
+            dialogue = await DialogueService.append_message(chatbot.id, message_data.chat_id, message)
+
+        job = None
+        if dialogue is not None and message.role == MessageRole.USER:
+            if stream is not None:
+                job = conversations.schedule_reply(
+                    message_data.chat_id,
+                    ChatService.post_llm_to_channel,
+                    channel,
+                    dialogue,
+                    stream,
+                    coalesce=False,
+                )
+                # Задача, не дошедшая до генерации, тоже должна завершить поток
+                job.add_done_callback(lambda _: stream.close(None))
+            else:
+                job = conversations.schedule_reply(
+                    message_data.chat_id,
+                    ChatService.post_llm_to_channel,
+                    channel,
+                    dialogue,
+                )
+        seen_messages.set(seen_key, True)
+        return job
+
+    @staticmethod
+    async def process_webhook_batch(
+        chatbot_token: str,
+        messages_data: list[MessageWebhook],
+    ) -> list[MessageBatchResult]:
+        """
+        Пакетная обработка сообщений, поступивших на webhook.
+
+        Токен бота проверяется один раз, каналы читаются одним запросом,
+        сообщения всех чатов пишутся одной пакетной вставкой. Ошибки отдельных
+        сообщений (несуществующий канал, дубликат) не прерывают обработку
+        остальных и возвращаются в результате по каждому сообщению.
+        """
+
+        with WebhookStage.CHATBOT_LOOKUP.time():
+            chatbot = await LookupCache.get_chatbot_by_token(chatbot_token)
+        if not chatbot:
+            raise KeyError(f"ChatBot with chat bot token '{chatbot_token}' not found")
 
-        dialogue = await Dialogue.find_one({"chat_id": message_data.chat_id})
+        with WebhookStage.CHANNEL_LOOKUP.time():
+            channels = await LookupCache.get_channels(list({message_data.chat_id for message_data in messages_data}))
 
-        if not dialogue:
-            dialogue = Dialogue(
-                chat_bot_id=chatbot.id,
+        results = [
+            MessageBatchResult(
+                message_id=message_data.message_id,
                 chat_id=message_data.chat_id,
-                message_list=[],
+                status="accepted",
             )
-            await dialogue.insert()
-        else:
+            for message_data in messages_data
+        ]
+        messages_by_chat: dict[str, list[DialogueMessage]] = {}
+        batch_keys: set[tuple[str, str, str | None]] = set()
 
-            # Проверка на повторяющееся сообщение по id
-            message_list = dialogue.message_list
-            for existing_message in message_list:
-                if existing_message.message_id == message.message_id:
-                    dialogue.message_list.append(message)
-                    await dialogue.save()
-                    return
+        for message_data, result in zip(messages_data, results, strict=True):
+            seen_key = (chatbot_token, message_data.chat_id, message_data.message_id)
+            if message_data.chat_id not in channels:
+                result.status = "error"
+                result.detail = f"Channel with id '{message_data.chat_id}' not found"
+            elif seen_key in seen_messages or seen_key in batch_keys:
+                result.status = "duplicate"
+            else:
+                batch_keys.add(seen_key)
+                messages_by_chat.setdefault(message_data.chat_id, []).append(
+                    ChatService._to_dialogue_message(message_data)
+                )
 
-        dialogue.message_list.append(message)
-        await dialogue.save()
+        if not messages_by_chat:
+            return results
 
-        if message.role == MessageRole.EMPLOYEE:
-            return
+        has_customer_messages = any(
+            message.role == MessageRole.USER for messages in messages_by_chat.values() for message in messages
+        )
+        if has_customer_messages:
+            if reply_pipeline.is_full():
+                raise asyncio.QueueFull("Reply queue is full")
+            llm_scheduler.check_capacity(str(chatbot.id))
 
-        await ChatService.post_llm_to_channel(channel, dialogue)
+        with WebhookStage.DIALOGUE_SAVE.time():
+            dialogues, duplicates = await DialogueService.append_messages(chatbot.id, messages_by_chat)
 
-    @staticmethod
-    async def post_llm_to_channel(channel: Channel, dialogue: Dialogue) -> None:
-        """Отправляет ответ от LLM в канал и на url из настроек канала"""
+        jobs: dict[str, Job] = {}
+        for message_data, result in zip(messages_data, results, strict=True):
+            if result.status != "accepted":
+                continue
+            if (message_data.chat_id, message_data.message_id) in duplicates:
+                result.status = "duplicate"
+                continue
+            if message_data.message_sender != "customer":
+                continue
+
+            chat_id = message_data.chat_id
+            if chat_id not in jobs:
+                jobs[chat_id] = conversations.schedule_reply(
+                    chat_id,
+                    ChatService.post_llm_to_channel,
+                    channels[chat_id],
+                    dialogues[chat_id],
+                )
+            result.job_id = jobs[chat_id].id
 
-        llm_response = await mock_llm_call(dialogue.message_list)
+        for seen_key in batch_keys:
+            seen_messages.set(seen_key, True)
+        return results
 
-        assistant_message = DialogueMessage(
-            message_id=str(uuid.uuid4()),
-            role=MessageRole.ASSISTANT,
-            text=llm_response,
+    @staticmethod
+    def _to_dialogue_message(message_data: MessageWebhook) -> DialogueMessage:
+        return DialogueMessage(
+            role=(MessageRole.USER if message_data.message_sender == "customer" else MessageRole.EMPLOYEE),
+            text=message_data.text,
+            message_id=message_data.message_id,
         )
-        dialogue.message_list.append(assistant_message)
-        await dialogue.save()
-
-        async with httpx.AsyncClient() as client:
-            try:
-                await client.post(
-                    str(channel.settings.url),
-                    json=assistant_message.model_dump(),
-                    headers={
-                        "x-chat_auth_token": f"Bearer {channel.settings.token}",
-                        "Content-Type": "application/json",
-                    },
-                )
-            except Exception as e:
-                logger.error(
-                    f"Error sending message to channel '{channel.name}' with url: '{channel.settings.url}': {e}"
+
+    @staticmethod
+    async def post_llm_to_channel(channel: Channel, dialogue: Dialogue, stream: ReplyStream | None = None) -> None:
+        """
+        Генерирует ответ LLM, сохраняет его в диалог и ставит в outbox канала.
+        Со stream фрагменты ответа передаются в него по мере генерации
+        """
+
+        assistant_message = None
+        try:
+            with WebhookStage.DIALOGUE_LOAD.time():
+                history = await build_context(
+                    dialogue.id,
+                    max_messages=settings.dialogue.history_limit,
+                    max_chars=settings.dialogue.context_max_chars,
+                    max_system_messages=settings.dialogue.context_max_system_messages,
                 )
+            chatbot = await LookupCache.get_chatbot(dialogue.chat_bot_id)
+            weight = chatbot.llm_weight if chatbot else 1.0
+            streamed = False
+
+            async def generate() -> str:
+                nonlocal streamed
+                enqueued_at = time.perf_counter()
+                async with llm_scheduler.slot(str(dialogue.chat_bot_id), weight):
+                    WebhookStage.LLM_QUEUE.observe(time.perf_counter() - enqueued_at)
+                    with WebhookStage.LLM_CALL.time(), span("llm.call"):
+                        if stream is None:
+                            return await mock_llm_call(history)
+
+                        chunks = []
+                        async for chunk in mock_llm_stream(history):
+                            chunks.append(chunk)
+                            stream.push(chunk)
+                        streamed = True
+                        return "".join(chunks)
+
+            if chatbot and chatbot.response_cache:
+                llm_response = await response_cache.get_or_generate(str(chatbot.id), history, generate)
+            else:
+                llm_response = await generate()
+
+            if stream is not None and not streamed:
+                # Ответ из кэша или от параллельного запроса отдаём одним фрагментом
+                stream.push(llm_response)
+
+            message = DialogueMessage(
+                message_id=str(uuid.uuid4()),
+                role=MessageRole.ASSISTANT,
+                text=llm_response,
+            )
+            with WebhookStage.DIALOGUE_SAVE.time():
+                await DialogueService.append_message(dialogue.chat_bot_id, dialogue.chat_id, message)
+
+            # Доставка в канал идёт через outbox с повторными попытками
+            with WebhookStage.OUTBOX_ENQUEUE.time():
+                await outbox_worker.enqueue(channel.id, message.model_dump())
+            assistant_message = message
+        finally:
+            if stream is not None:
+                stream.close(assistant_message)
@@ -0,0 +1,92 @@
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.services.job_pipeline import Job, JobPipeline, reply_pipeline
+from core import settings
+
+
+@dataclass(slots=True)
+class _ConversationState:
+    # Задача, к которой присоединяются новые сообщения (ещё не начала работу)
+    pending: Job | None = None
+    # Задачи чата, ждущие завершения текущей. В очередь пайплайна ставится
+    # только следующая, поэтому ожидание не занимает воркер
+    waiting: deque[Job] = field(default_factory=deque)
+
+
+class ConversationCoordinator:
+    """
+    Последовательная обработка ответов в пределах одного чата.
+
+    Для каждого chat_id одновременно генерируется не больше одного ответа:
+    задачи чата выстраиваются в цепочку, и следующая ставится в очередь
+    пайплайна, только когда завершится предыдущая. Пока задача ответа ещё
+    не начала читать историю, новые сообщения этого чата присоединяются
+    к ней, а не порождают отдельный вызов LLM. С debounce задача стартует
+    через debounce секунд после первого сообщения, что объединяет серию
+    сообщений в один ответ.
+    """
+
+    def __init__(self, pipeline: JobPipeline, debounce: float) -> None:
+        self.pipeline = pipeline
+        self.debounce = debounce
+        # Чаты, у которых есть задача в очереди или в работе
+        self._states: dict[str, _ConversationState] = {}
+
+    def schedule_reply(
+        self,
+        chat_id: str,
+        func: Callable[..., Awaitable[Any]],
+        *args: Any,
+        coalesce: bool = True,
+    ) -> Job:
+        """
+        Поставить генерацию ответа для чата.
+        С coalesce=False задача не объединяется с другими и стартует без debounce
+        """
+
+        state = self._states.get(chat_id)
+        if coalesce and state is not None and state.pending is not None:
+            return state.pending
+
+        job = self.pipeline.create(self._run, chat_id, coalesce, func, *args)
+        # Срабатывает и для задачи, снятой без выполнения
+        job.add_done_callback(lambda job: self._finished(chat_id, job))
+        if state is None:
+            state = self._states[chat_id] = _ConversationState()
+            self.pipeline.schedule(job, delay=self.debounce if coalesce else 0)
+        else:
+            state.waiting.append(job)
+
+        if coalesce:
+            state.pending = job
+        return job
+
+    async def _run(
+        self,
+        chat_id: str,
+        coalesce: bool,
+        func: Callable[..., Awaitable[Any]],
+        *args: Any,
+    ) -> None:
+        # Сообщения, пришедшие после этой точки, требуют нового ответа
+        if coalesce:
+            self._states[chat_id].pending = None
+        await func(*args)
+
+    def _finished(self, chat_id: str, job: Job) -> None:
+        state = self._states.get(chat_id)
+        if state is None:
+            return
+        if state.pending is job:
+            state.pending = None
+
+        if state.waiting:
+            self.pipeline.schedule(state.waiting.popleft())
+        else:
+            del self._states[chat_id]
+
+
+conversations = ConversationCoordinator(reply_pipeline, debounce=settings.conversation.debounce)
@@ -0,0 +1,188 @@
+import asyncio
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime
+
+from beanie import PydanticObjectId
+from beanie.odm.queries.update import UpdateResponse
+from beanie.operators import Inc, Set, SetOnInsert
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.schemas.dialogue import HistoryMessage
+from core import settings
+from core.database.models import Dialogue, DialogueMessage, Message
+from core.tracing import trace_service
+
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+
+@trace_service
+class DialogueService:
+    @staticmethod
+    async def append_message(chat_bot_id: PydanticObjectId, chat_id: str, message: DialogueMessage) -> Dialogue | None:
+        """
+        Добавить сообщение в диалог чата, создав диалог при необходимости.
+
+        Заголовок диалога создаётся/обновляется одним атомарным upsert,
+        который заодно выделяет номер сообщения через $inc. Само сообщение
+        пишется отдельным документом, поэтому размер записи не зависит от
+        длины переписки, а параллельные сообщения одного чата не теряются.
+
+        Возвращает None, если сообщение с таким message_id в чате уже есть
+        (уникальный индекс (chat_id, message_id)).
+        """
+
+        dialogue = await DialogueService._reserve_seq(chat_bot_id, chat_id)
+
+        try:
+            await Message(
+                dialogue_id=dialogue.id,
+                chat_id=chat_id,
+                seq=dialogue.last_seq,
+                **message.model_dump(),
+            ).insert()
+        except DuplicateKeyError:
+            return None
+        return dialogue
+
+    @staticmethod
+    async def append_messages(
+        chat_bot_id: PydanticObjectId,
+        messages_by_chat: dict[str, list[DialogueMessage]],
+    ) -> tuple[dict[str, Dialogue], set[tuple[str, str]]]:
+        """
+        Пакетно добавить сообщения в диалоги нескольких чатов.
+
+        Для каждого чата одним upsert'ом резервируется диапазон номеров
+        (запросы по чатам идут параллельно), затем все сообщения пишутся одним
+        неупорядоченным insert_many. Возвращает заголовки диалогов по chat_id
+        и множество (chat_id, message_id), отброшенных как дубликаты.
+        """
+
+        chat_ids = list(messages_by_chat)
+        headers = await asyncio.gather(
+            *(
+                DialogueService._reserve_seq(chat_bot_id, chat_id, len(messages_by_chat[chat_id]))
+                for chat_id in chat_ids
+            )
+        )
+        dialogues = dict(zip(chat_ids, headers, strict=True))
+
+        documents = []
+        for chat_id, messages in messages_by_chat.items():
+            dialogue = dialogues[chat_id]
+            first_seq = dialogue.last_seq - len(messages) + 1
+            documents.extend(
+                Message(
+                    dialogue_id=dialogue.id,
+                    chat_id=chat_id,
+                    seq=first_seq + offset,
+                    **message.model_dump(),
+                )
+                for offset, message in enumerate(messages)
+            )
+
+        duplicates: set[tuple[str, str]] = set()
+        try:
+            await Message.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details["writeErrors"]:
+                if error["code"] != DUPLICATE_KEY_ERROR_CODE:
+                    raise
+                document = documents[error["index"]]
+                duplicates.add((document.chat_id, document.message_id))
+
+        return dialogues, duplicates
+
+    @staticmethod
+    async def _reserve_seq(chat_bot_id: PydanticObjectId, chat_id: str, count: int = 1) -> Dialogue:
+        """Зарезервировать count номеров сообщений, last_seq — последний из них"""
+
+        try:
+            return await DialogueService._next_seq(chat_bot_id, chat_id, count)
+        except DuplicateKeyError:
+            # Два upsert'а одновременно создавали диалог, второй просто повторяем
+            return await DialogueService._next_seq(chat_bot_id, chat_id, count)
+
+    @staticmethod
+    async def _next_seq(chat_bot_id: PydanticObjectId, chat_id: str, count: int) -> Dialogue:
+        return await Dialogue.find_one(Dialogue.chat_id == chat_id).update(
+            Inc({Dialogue.last_seq: count}),
+            Set({Dialogue.updated_at: datetime.now(UTC)}),
+            SetOnInsert({Dialogue.chat_bot_id: chat_bot_id}),
+            response_type=UpdateResponse.NEW_DOCUMENT,
+            upsert=True,
+        )
+
+    @staticmethod
+    async def get_recent_messages(dialogue_id: PydanticObjectId, limit: int) -> list[DialogueMessage]:
+        """Последние limit сообщений диалога в хронологическом порядке"""
+
+        messages = (
+            await Message.find(Message.dialogue_id == dialogue_id)
+            .sort(-Message.seq)
+            .limit(limit)
+            .project(DialogueMessage)
+            .to_list()
+        )
+        messages.reverse()
+        return messages
+
+    @staticmethod
+    async def get_history_page(
+        chat_id: str,
+        limit: int,
+        before: int | None = None,
+        after: int | None = None,
+    ) -> tuple[list[HistoryMessage], int | None]:
+        """
+        Страница истории диалога по курсору seq в хронологическом порядке.
+
+        - after: сообщения новее курсора, листание вперёд от начала диалога
+        - before: сообщения старше курсора, листание назад
+        - без курсора: последние limit сообщений
+
+        Возвращает сообщения и курсор для следующей страницы в том же
+        направлении (None, если страниц больше нет).
+        """
+
+        dialogue = await Dialogue.find_one(Dialogue.chat_id == chat_id)
+        if dialogue is None:
+            return [], None
+
+        if after is not None:
+            query = Message.find(Message.dialogue_id == dialogue.id, Message.seq > after).sort(+Message.seq)
+        elif before is not None:
+            query = Message.find(Message.dialogue_id == dialogue.id, Message.seq < before).sort(-Message.seq)
+        else:
+            query = Message.find(Message.dialogue_id == dialogue.id).sort(-Message.seq)
+
+        # Лишнее сообщение показывает, есть ли следующая страница
+        messages = await query.limit(limit + 1).project(HistoryMessage).to_list()
+        next_cursor = messages[limit - 1].seq if len(messages) > limit else None
+        messages = messages[:limit]
+        if after is None:
+            messages.reverse()
+        return messages, next_cursor
+
+    @staticmethod
+    async def iter_history(chat_id: str, after: int = 0) -> AsyncIterator[HistoryMessage]:
+        """
+        Вся история диалога после курсора, читается курсором Mongo пачками,
+        поэтому память не зависит от длины диалога
+        """
+
+        dialogue = await Dialogue.find_one(Dialogue.chat_id == chat_id)
+        if dialogue is None:
+            return
+
+        query = (
+            Message.find(
+                Message.dialogue_id == dialogue.id,
+                Message.seq > after,
+                batch_size=settings.dialogue.history_stream_batch_size,
+            )
+            .sort(+Message.seq)
+            .project(HistoryMessage)
+        )
+        async for message in query:
+            yield message
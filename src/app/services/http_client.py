@@ -0,0 +1,113 @@
+import asyncio
+from collections import Counter
+from typing import Any
+
+import httpx
+from loguru import logger
+
+from core import settings
+from core.settings_model import HttpClientSettings
+
+
+class ChannelHttpClient:
+    """
+    Долгоживущий httpx-клиент для отправки сообщений в каналы.
+
+    Один пул соединений на процесс: создаётся и закрывается в lifespan
+    приложения. Помимо общих лимитов httpx ограничивает число одновременных
+    запросов на один хост: семафор хоста живёт, пока к нему идут запросы.
+    """
+
+    def __init__(
+        self,
+        config: HttpClientSettings,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.config = config
+        # Подмена транспорта (например, httpx.MockTransport в тестах)
+        self.transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._host_semaphores: dict[str, asyncio.Semaphore] = {}
+        # Сколько запросов держат или ждут семафор хоста
+        self._host_users: Counter[str] = Counter()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("Channel HTTP client is not started")
+        return self._client
+
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+
+        limits = httpx.Limits(
+            max_connections=self.config.max_connections,
+            max_keepalive_connections=self.config.max_keepalive_connections,
+            keepalive_expiry=self.config.keepalive_expiry,
+        )
+        timeout = httpx.Timeout(
+            connect=self.config.connect_timeout,
+            read=self.config.read_timeout,
+            write=self.config.write_timeout,
+            pool=self.config.pool_timeout,
+        )
+
+        try:
+            self._client = httpx.AsyncClient(
+                limits=limits,
+                timeout=timeout,
+                http2=self.config.http2,
+                transport=self.transport,
+            )
+        except ImportError as e:
+            # http2 требует опциональный пакет h2
+            logger.warning(f"HTTP/2 is unavailable, falling back to HTTP/1.1: {e}")
+            self._client = httpx.AsyncClient(limits=limits, timeout=timeout, transport=self.transport)
+
+        logger.info("Channel HTTP client started")
+
+    async def stop(self) -> None:
+        if self._client is None:
+            return
+
+        await self._client.aclose()
+        self._client = None
+        self._host_semaphores = {}
+        self._host_users = Counter()
+        logger.info("Channel HTTP client stopped")
+
+    def host_requests(self) -> dict[str, int]:
+        """Запросы, которые выполняются или ждут лимита, по хостам"""
+
+        return dict(self._host_users)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        """POST-запрос с ограничением числа одновременных запросов на хост"""
+
+        host = httpx.URL(url).host
+        semaphore = self._acquire_host(host)
+        try:
+            async with semaphore:
+                return await self.client.post(url, **kwargs)
+        finally:
+            self._release_host(host)
+
+    def _acquire_host(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.config.max_connections_per_host)
+            self._host_semaphores[host] = semaphore
+        self._host_users[host] += 1
+        return semaphore
+
+    def _release_host(self, host: str) -> None:
+        # Свободный семафор без ожидающих не отличается от нового, хранить
+        # его для каждого когда-либо встреченного хоста незачем
+        self._host_users[host] -= 1
+        if self._host_users[host] <= 0:
+            del self._host_users[host]
+            self._host_semaphores.pop(host, None)
+
+
+channel_http_client = ChannelHttpClient(settings.http_client)
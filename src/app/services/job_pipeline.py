@@ -0,0 +1,269 @@
+import asyncio
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from enum import StrEnum, auto
+from typing import Any
+
+from loguru import logger
+
+from core import settings
+from core.tracing import tracer
+
+
+class JobStatus(StrEnum):
+    QUEUED = auto()
+    RUNNING = auto()
+    DONE = auto()
+    FAILED = auto()
+
+
+@dataclass(slots=True)
+class Job:
+    func: Callable[..., Awaitable[Any]]
+    args: tuple[Any, ...]
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: JobStatus = JobStatus.QUEUED
+    created_at: datetime = field(default_factory=lambda: datetime.now(UTC))
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    error: str | None = None
+    callbacks: list[Callable[["Job"], None]] = field(default_factory=list, repr=False)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JobStatus.DONE, JobStatus.FAILED)
+
+    def add_done_callback(self, callback: Callable[["Job"], None]) -> None:
+        """
+        Вызвать callback при завершении задачи, в том числе если она
+        так и не начала выполняться (остановка очереди)
+        """
+
+        self.callbacks.append(callback)
+
+
+class JobPipeline:
+    """
+    Ограниченная очередь фоновых задач внутри процесса.
+
+    Задачи выполняются фиксированным числом воркеров-корутин, размер очереди
+    ограничен. Если очередь переполнена, задача ждёт retry_delay секунд и
+    ставится снова; отложенных задач не больше max_delayed_jobs, сверх этого
+    задача завершается с ошибкой. Проверять переполнение до приёма работы
+    (например, сообщения) нужно через is_full.
+    Статусы последних задач хранятся в памяти для эндпоинта статуса.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_queue_size: int,
+        max_finished_jobs: int,
+        shutdown_timeout: float,
+        retry_delay: float,
+        max_delayed_jobs: int,
+    ) -> None:
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self.max_finished_jobs = max_finished_jobs
+        self.shutdown_timeout = shutdown_timeout
+        self.retry_delay = retry_delay
+        self.max_delayed_jobs = max_delayed_jobs
+
+        self._queue: asyncio.Queue[Job] | None = None
+        self._worker_tasks: list[asyncio.Task] = []
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._delayed: dict[str, asyncio.TimerHandle] = {}
+        self._running_jobs = 0
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._worker_tasks)
+
+    def is_full(self) -> bool:
+        return self._queue is not None and self._queue.full()
+
+    async def start(self) -> None:
+        if self.is_running:
+            return
+
+        # Очередь создаётся здесь, чтобы привязаться к текущему event loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._worker_tasks = [asyncio.create_task(self._worker(), name=f"job-worker-{i}") for i in range(self.workers)]
+        logger.info(f"Job pipeline started with {self.workers} workers")
+
+    async def stop(self) -> None:
+        if not self.is_running or self._queue is None:
+            return
+
+        # Отложенные задачи не ждут своего таймера, а сразу встают в очередь
+        for job_id, handle in list(self._delayed.items()):
+            handle.cancel()
+            job = self._jobs[job_id]
+            self._delayed.pop(job_id)
+            if self._queue.full():
+                self._fail(job, "Job pipeline stopped")
+            else:
+                self._queue.put_nowait(job)
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.shutdown_timeout)
+        except TimeoutError:
+            logger.warning(f"Job pipeline stopped with {self._queue.qsize()} unfinished jobs")
+
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+
+        queue = self._queue
+        self._worker_tasks = []
+        self._queue = None
+
+        # Не дождавшиеся воркера задачи завершаются, чтобы сработали их callbacks.
+        # Задачи, поставленные из callbacks, завершаются сразу: очереди уже нет
+        leftovers = []
+        for job_id, handle in list(self._delayed.items()):
+            handle.cancel()
+            leftovers.append(self._jobs[job_id])
+        self._delayed.clear()
+        while not queue.empty():
+            leftovers.append(queue.get_nowait())
+        for job in leftovers:
+            self._fail(job, "Job pipeline stopped")
+        logger.info("Job pipeline stopped")
+
+    def submit(self, func: Callable[..., Awaitable[Any]], *args: Any, delay: float = 0) -> Job:
+        """
+        Поставить задачу в очередь. С delay задача попадает в очередь через
+        delay секунд и до этого не занимает воркер. Переполненная очередь
+        откладывает постановку на retry_delay
+        """
+
+        if self._queue is None:
+            raise RuntimeError("Job pipeline is not running")
+
+        job = self.create(func, *args)
+        self.schedule(job, delay)
+        return job
+
+    def create(self, func: Callable[..., Awaitable[Any]], *args: Any) -> Job:
+        """
+        Создать задачу, не ставя её в очередь: её позже поставит schedule.
+        Статус задачи доступен через get_job сразу
+        """
+
+        job = Job(func=func, args=args)
+        self._jobs[job.id] = job
+        return job
+
+    def schedule(self, job: Job, delay: float = 0) -> None:
+        """Поставить созданную задачу в очередь, после остановки — завершить её"""
+
+        if delay > 0 and self._queue is not None:
+            self._defer(job, delay)
+        else:
+            self._enqueue(job)
+
+    def get_job(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "delayed": len(self._delayed),
+            "running": self._running_jobs,
+        }
+
+    def _defer(self, job: Job, delay: float) -> None:
+        self._delayed[job.id] = asyncio.get_running_loop().call_later(delay, self._enqueue, job)
+
+    def _enqueue(self, job: Job) -> None:
+        self._delayed.pop(job.id, None)
+        if self._queue is None:
+            self._fail(job, "Job pipeline stopped")
+            return
+        if self._queue.full():
+            # Отложенные задачи тоже занимают память: при долгой перегрузке
+            # очередь не должна расти без предела в обход max_queue_size
+            if len(self._delayed) >= self.max_delayed_jobs:
+                self._fail(job, "Job queue is full")
+                return
+            logger.warning(f"Job queue is full, job '{job.id}' is retried in {self.retry_delay}s")
+            self._defer(job, self.retry_delay)
+            return
+
+        self._queue.put_nowait(job)
+
+    def _fail(self, job: Job, error: str) -> None:
+        """Завершить задачу, так и не начавшую выполняться"""
+
+        job.status = JobStatus.FAILED
+        job.error = error
+        job.finished_at = datetime.now(UTC)
+        logger.error(f"Job '{job.id}' was dropped: {error}")
+        self._finish(job)
+
+    def _finish(self, job: Job) -> None:
+        for callback in job.callbacks:
+            try:
+                callback(job)
+            except Exception as e:
+                logger.exception(f"Callback of job '{job.id}' failed: {e}")
+        job.callbacks.clear()
+        self._trim_finished_jobs()
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        queue = self._queue
+
+        while True:
+            job = await queue.get()
+            job.status = JobStatus.RUNNING
+            job.started_at = datetime.now(UTC)
+            self._running_jobs += 1
+            try:
+                with tracer.trace(f"job {job.func.__qualname__}"):
+                    await job.func(*job.args)
+                job.status = JobStatus.DONE
+            except Exception as e:
+                job.status = JobStatus.FAILED
+                job.error = str(e)
+                logger.exception(f"Job '{job.id}' failed: {e}")
+            except asyncio.CancelledError:
+                # Воркер остановлен посреди задачи: она не должна остаться RUNNING
+                job.status = JobStatus.FAILED
+                job.error = "Job was cancelled"
+                raise
+            finally:
+                job.finished_at = datetime.now(UTC)
+                self._running_jobs -= 1
+                queue.task_done()
+                self._finish(job)
+
+    def _trim_finished_jobs(self) -> None:
+        # Старые завершённые задачи вытесняются. Незавершённые пропускаются,
+        # но не задерживают вытеснение завершённых после них
+        excess = len(self._jobs) - self.max_finished_jobs
+        if excess <= 0:
+            return
+        finished = []
+        for job_id, job in self._jobs.items():
+            if job.is_finished:
+                finished.append(job_id)
+                if len(finished) == excess:
+                    break
+        for job_id in finished:
+            del self._jobs[job_id]
+
+
+reply_pipeline = JobPipeline(
+    workers=settings.pipeline.workers,
+    max_queue_size=settings.pipeline.max_queue_size,
+    max_finished_jobs=settings.pipeline.max_finished_jobs,
+    shutdown_timeout=settings.pipeline.shutdown_timeout,
+    retry_delay=settings.pipeline.retry_delay,
+    max_delayed_jobs=settings.pipeline.max_delayed_jobs,
+)
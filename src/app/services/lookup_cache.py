@@ -0,0 +1,92 @@
+from beanie import PydanticObjectId
+from beanie.operators import In
+
+from core import settings
+from core.cache import TTLCache
+from core.database.models import Channel, ChatBot
+from core.tracing import trace_service
+
+_chatbots_by_token: TTLCache[str, ChatBot] = TTLCache(
+    maxsize=settings.lookup_cache.chatbot_size, ttl=settings.lookup_cache.ttl
+)
+_chatbots_by_id: TTLCache[PydanticObjectId, ChatBot] = TTLCache(
+    maxsize=settings.lookup_cache.chatbot_size, ttl=settings.lookup_cache.ttl
+)
+_channels_by_id: TTLCache[str, Channel] = TTLCache(
+    maxsize=settings.lookup_cache.channel_size, ttl=settings.lookup_cache.ttl
+)
+
+
+@trace_service
+class LookupCache:
+    """
+    Read-through кэш редко меняющихся ChatBot и Channel.
+
+    Промахи (несуществующие записи) не кэшируются. Изменения в других
+    воркерах становятся видны не позже чем через ttl.
+    """
+
+    @staticmethod
+    async def get_chatbot_by_token(token: str) -> ChatBot | None:
+        chatbot = _chatbots_by_token.get(token)
+        if chatbot is None:
+            chatbot = await ChatBot.find_one(ChatBot.secret_token == token)
+            if chatbot:
+                _chatbots_by_token.set(token, chatbot)
+        return chatbot
+
+    @staticmethod
+    async def get_chatbot(chat_bot_id: PydanticObjectId) -> ChatBot | None:
+        chatbot = _chatbots_by_id.get(chat_bot_id)
+        if chatbot is None:
+            chatbot = await ChatBot.get(chat_bot_id)
+            if chatbot:
+                _chatbots_by_id.set(chat_bot_id, chatbot)
+        return chatbot
+
+    @staticmethod
+    async def get_channel(channel_id: str | PydanticObjectId) -> Channel | None:
+        channel = _channels_by_id.get(str(channel_id))
+        if channel is None:
+            channel = await Channel.get(channel_id)
+            if channel:
+                _channels_by_id.set(str(channel_id), channel)
+        return channel
+
+    @staticmethod
+    async def get_channels(channel_ids: list[str]) -> dict[str, Channel]:
+        """Каналы по списку id: промахи кэша добираются одним запросом $in"""
+
+        channels: dict[str, Channel] = {}
+        missing: list[PydanticObjectId] = []
+        for channel_id in channel_ids:
+            channel = _channels_by_id.get(channel_id)
+            if channel is not None:
+                channels[channel_id] = channel
+            elif PydanticObjectId.is_valid(channel_id):
+                missing.append(PydanticObjectId(channel_id))
+
+        if missing:
+            for channel in await Channel.find(In(Channel.id, missing)).to_list():
+                channels[str(channel.id)] = channel
+                _channels_by_id.set(str(channel.id), channel)
+
+        return channels
+
+    @staticmethod
+    def invalidate_channel(channel_id: str | PydanticObjectId) -> None:
+        _channels_by_id.pop(str(channel_id))
+
+    @staticmethod
+    def clear() -> None:
+        _chatbots_by_token.clear()
+        _chatbots_by_id.clear()
+        _channels_by_id.clear()
+
+    @staticmethod
+    def stats() -> dict[str, dict[str, int]]:
+        return {
+            "chatbots_by_token": _chatbots_by_token.stats(),
+            "chatbots_by_id": _chatbots_by_id.stats(),
+            "channels_by_id": _channels_by_id.stats(),
+        }
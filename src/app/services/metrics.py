@@ -0,0 +1,40 @@
+from core.metrics import Counter, Gauge, Histogram, metrics
+
+http_requests = metrics.register(
+    Counter(
+        "http_requests_total",
+        "Number of HTTP requests by route and status code",
+        ("method", "route", "status"),
+    )
+)
+http_request_duration = metrics.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request duration by route",
+        ("method", "route"),
+    )
+)
+http_requests_in_progress = metrics.register(
+    Gauge("http_requests_in_progress", "Number of HTTP requests being processed")
+)
+
+webhook_stage_duration = metrics.register(
+    Histogram(
+        "webhook_stage_duration_seconds",
+        "Duration of webhook message processing stages",
+        ("stage",),
+    )
+)
+
+
+class WebhookStage:
+    """Заранее полученные гистограммы этапов обработки сообщения"""
+
+    CHATBOT_LOOKUP = webhook_stage_duration.labels("chatbot_lookup")
+    CHANNEL_LOOKUP = webhook_stage_duration.labels("channel_lookup")
+    DIALOGUE_SAVE = webhook_stage_duration.labels("dialogue_save")
+    DIALOGUE_LOAD = webhook_stage_duration.labels("dialogue_load")
+    LLM_QUEUE = webhook_stage_duration.labels("llm_queue")
+    LLM_CALL = webhook_stage_duration.labels("llm_call")
+    OUTBOX_ENQUEUE = webhook_stage_duration.labels("outbox_enqueue")
+    OUTBOUND_POST = webhook_stage_duration.labels("outbound_post")
@@ -0,0 +1,250 @@
+import asyncio
+import contextlib
+import random
+from datetime import UTC, datetime, timedelta
+
+from beanie import PydanticObjectId
+from loguru import logger
+
+from app.services.http_client import channel_http_client
+from app.services.lookup_cache import LookupCache
+from app.services.metrics import WebhookStage
+from core import settings
+from core.database.models import OutboxMessage, OutboxStatus
+from core.serialization import dumps
+from core.settings_model import OutboxSettings
+from core.tracing import span, tracer
+
+UNFINISHED_STATUSES = [OutboxStatus.PENDING, OutboxStatus.IN_PROGRESS]
+
+
+class OutboxWorker:
+    """
+    Воркер, доставляющий сообщения из outbox в каналы.
+
+    Для каждого канала доставляется только самое старое недоставленное
+    сообщение ("голова"), поэтому порядок сообщений внутри канала сохраняется,
+    а разные каналы обрабатываются параллельно. Неудачные попытки повторяются
+    с экспоненциальной задержкой и джиттером, после max_attempts сообщение
+    помечается как DEAD.
+    """
+
+    def __init__(self, config: OutboxSettings) -> None:
+        self.config = config
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._active_channels: dict[PydanticObjectId, asyncio.Task] = {}
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.config.concurrency)
+        self._task = asyncio.create_task(self._run(), name="outbox-worker")
+        logger.info("Outbox worker started")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        tasks = [self._task, *self._active_channels.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        self._task = None
+        self._active_channels = {}
+        logger.info("Outbox worker stopped")
+
+    def notify(self) -> None:
+        """Разбудить воркер, не дожидаясь следующего опроса"""
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    @property
+    def active_channels(self) -> int:
+        """Сколько каналов доставляется прямо сейчас"""
+
+        return len(self._active_channels)
+
+    async def enqueue(self, channel_id: PydanticObjectId, payload: dict) -> None:
+        await OutboxMessage(channel_id=channel_id, payload=payload).insert()
+        self.notify()
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+
+        while True:
+            self._wakeup.clear()
+            try:
+                for channel_id in await self.find_due_channels():
+                    if channel_id not in self._active_channels:
+                        self._spawn_drain(channel_id)
+            except Exception as e:
+                logger.exception(f"Outbox polling failed: {e}")
+
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.config.poll_interval)
+
+    def _spawn_drain(self, channel_id: PydanticObjectId) -> None:
+        task = asyncio.create_task(self._drain_limited(channel_id))
+        self._active_channels[channel_id] = task
+        task.add_done_callback(lambda _: self._active_channels.pop(channel_id, None))
+
+    async def _drain_limited(self, channel_id: PydanticObjectId) -> None:
+        assert self._semaphore is not None
+
+        async with self._semaphore:
+            try:
+                await self.drain_channel(channel_id)
+            except Exception as e:
+                logger.exception(f"Outbox drain for channel '{channel_id}' failed: {e}")
+
+    async def find_due_channels(self) -> list[PydanticObjectId]:
+        """Каналы, у которых самое старое недоставленное сообщение готово к отправке"""
+
+        now = datetime.now(UTC)
+        pipeline = [
+            {"$match": {"status": {"$in": UNFINISHED_STATUSES}}},
+            {"$sort": {"channel_id": 1, "created_at": 1, "_id": 1}},
+            {"$group": {"_id": "$channel_id", "head": {"$first": "$$ROOT"}}},
+            {
+                "$match": {
+                    "$or": [
+                        {
+                            "head.status": OutboxStatus.PENDING,
+                            "head.next_attempt_at": {"$lte": now},
+                        },
+                        {
+                            "head.status": OutboxStatus.IN_PROGRESS,
+                            "head.locked_until": {"$lte": now},
+                        },
+                    ]
+                }
+            },
+            {"$limit": self.config.batch_size},
+            {"$project": {"_id": 1}},
+        ]
+        # Через коллекцию motor: aggregate Beanie ждёт awaitable-курсор pymongo
+        heads = await OutboxMessage.get_pymongo_collection().aggregate(pipeline).to_list(None)
+        return [head["_id"] for head in heads]
+
+    async def drain_channel(self, channel_id: PydanticObjectId) -> None:
+        """Последовательно доставить готовые сообщения одного канала"""
+
+        while message := await self._claim_head(channel_id):
+            await self._deliver(message)
+
+    async def _claim_head(self, channel_id: PydanticObjectId) -> OutboxMessage | None:
+        head = (
+            await OutboxMessage.find(
+                OutboxMessage.channel_id == channel_id,
+                {"status": {"$in": UNFINISHED_STATUSES}},
+            )
+            .sort("created_at", "_id")
+            .first_or_none()
+        )
+        if head is None:
+            return None
+
+        now = datetime.now(UTC)
+        if head.status == OutboxStatus.PENDING and _as_utc(head.next_attempt_at) > now:
+            return None
+        if head.status == OutboxStatus.IN_PROGRESS and (head.locked_until is None or _as_utc(head.locked_until) > now):
+            return None
+
+        # Захват с условием на текущее состояние: если сообщение
+        # уже забрал другой воркер, обновление ничего не изменит
+        locked_until = now + timedelta(seconds=self.config.lease_timeout)
+        result = await OutboxMessage.find_one(
+            {
+                "_id": head.id,
+                "status": head.status,
+                "attempts": head.attempts,
+                "locked_until": head.locked_until,
+            }
+        ).update(
+            {
+                "$set": {
+                    "status": OutboxStatus.IN_PROGRESS,
+                    "locked_until": locked_until,
+                }
+            }
+        )
+        if not result or not result.modified_count:
+            return None
+
+        head.status = OutboxStatus.IN_PROGRESS
+        head.locked_until = locked_until
+        return head
+
+    async def _deliver(self, message: OutboxMessage) -> None:
+        with tracer.trace("outbox.deliver"):
+            await self._deliver_traced(message)
+
+    async def _deliver_traced(self, message: OutboxMessage) -> None:
+        try:
+            channel = await LookupCache.get_channel(message.channel_id)
+            if not channel:
+                raise KeyError(f"Channel with id '{message.channel_id}' not found")
+
+            with WebhookStage.OUTBOUND_POST.time(), span("http.post"):
+                response = await channel_http_client.post(
+                    str(channel.settings.url),
+                    content=dumps(message.payload),
+                    headers={
+                        "x-chat_auth_token": f"Bearer {channel.settings.token}",
+                        "Content-Type": "application/json",
+                    },
+                )
+            response.raise_for_status()
+        except Exception as e:
+            await self._mark_failed(message, e)
+            return
+
+        await message.delete()
+
+    async def _mark_failed(self, message: OutboxMessage, error: Exception) -> None:
+        attempts = message.attempts + 1
+        update: dict = {
+            "attempts": attempts,
+            "last_error": str(error),
+            "locked_until": None,
+        }
+
+        if isinstance(error, KeyError) or attempts >= self.config.max_attempts:
+            update["status"] = OutboxStatus.DEAD
+            logger.error(
+                f"Outbox message '{message.id}' for channel '{message.channel_id}' "
+                f"moved to dead letters after {attempts} attempts: {error}"
+            )
+        else:
+            delay = self.backoff(attempts)
+            update["status"] = OutboxStatus.PENDING
+            update["next_attempt_at"] = datetime.now(UTC) + timedelta(seconds=delay)
+            logger.warning(
+                f"Outbox message '{message.id}' for channel '{message.channel_id}' "
+                f"failed (attempt {attempts}), retrying in {delay:.1f}s: {error}"
+            )
+
+        await OutboxMessage.find_one({"_id": message.id}).update({"$set": update})
+
+    def backoff(self, attempts: int) -> float:
+        """Экспоненциальная задержка с джиттером (половина задержки случайна)"""
+
+        delay = min(
+            self.config.max_backoff,
+            self.config.base_backoff * 2 ** (attempts - 1),
+        )
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Mongo возвращает naive datetime в UTC
+    return value if value.tzinfo else value.replace(tzinfo=UTC)
+
+
+outbox_worker = OutboxWorker(settings.outbox)
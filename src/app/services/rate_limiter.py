@@ -0,0 +1,290 @@
+import math
+import time
+from collections import Counter
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Protocol
+
+from pymongo import ReturnDocument
+
+from app.services.lookup_cache import LookupCache
+from core import settings
+from core.cache import TTLCache
+from core.database.models import ChatBot, RateLimit, RateLimitBucket
+from core.tracing import trace_service
+
+
+@dataclass(slots=True, frozen=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    # Через сколько секунд бакет снова будет полон
+    reset_after: int
+    # Через сколько секунд повторить отклонённый запрос
+    retry_after: int
+
+    @property
+    def headers(self) -> dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(self.reset_after),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after)
+        return headers
+
+
+@dataclass(slots=True, frozen=True)
+class RateLimitCharge:
+    """Токены, списанные за запрос к webhook, для возврата через refund"""
+
+    chatbot_id: str
+    chatbot_limit: RateLimit
+    channel_limit: RateLimit
+    # Состояние лимита бота для заголовков ответа
+    result: RateLimitResult
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, key: str, result: RateLimitResult) -> None:
+        super().__init__(f"Rate limit exceeded for {key}")
+        self.result = result
+
+
+class RateLimitStore(Protocol):
+    async def take(self, key: str, rate: float, burst: int, cost: int) -> tuple[float, bool]:
+        """Пополнить бакет и списать cost токенов, вернуть (остаток, разрешено)"""
+
+    async def refund(self, key: str, rate: float, burst: int, cost: int) -> None:
+        """Вернуть в бакет cost токенов, не больше burst"""
+
+    def clear(self) -> None: ...
+
+
+class MemoryRateLimitStore:
+    """Бакеты в памяти процесса: у каждого воркера свой лимит"""
+
+    def __init__(self, max_keys: int, idle_ttl: float) -> None:
+        self._buckets: TTLCache[str, tuple[float, float]] = TTLCache(maxsize=max_keys, ttl=idle_ttl)
+
+    async def take(self, key: str, rate: float, burst: int, cost: int) -> tuple[float, bool]:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key) or (burst, now)
+        tokens = min(burst, tokens + (now - updated_at) * rate)
+
+        allowed = tokens >= min(cost, burst)
+        if allowed:
+            tokens -= cost
+        self._buckets.set(key, (tokens, now))
+        return tokens, allowed
+
+    async def refund(self, key: str, rate: float, burst: int, cost: int) -> None:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return
+        now = time.monotonic()
+        tokens, updated_at = bucket
+        tokens = min(burst, tokens + (now - updated_at) * rate + cost)
+        self._buckets.set(key, (tokens, now))
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+class MongoRateLimitStore:
+    """
+    Бакеты в Mongo, общий лимит для всех воркеров. Пополнение и списание
+    выполняются одним атомарным findOneAndUpdate с pipeline-обновлением.
+    """
+
+    def __init__(self, idle_ttl: float) -> None:
+        self.idle_ttl = idle_ttl
+
+    async def take(self, key: str, rate: float, burst: int, cost: int) -> tuple[float, bool]:
+        now = datetime.now(UTC)
+        refilled = self._refilled(now, rate, burst)
+
+        bucket = await RateLimitBucket.get_pymongo_collection().find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now}},
+                {"$set": {"allowed": {"$gte": ["$tokens", min(cost, burst)]}}},
+                {
+                    "$set": {
+                        "tokens": {
+                            "$cond": [
+                                "$allowed",
+                                {"$subtract": ["$tokens", cost]},
+                                "$tokens",
+                            ]
+                        },
+                        "expires_at": now + timedelta(seconds=self.idle_ttl),
+                    }
+                },
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return bucket["tokens"], bucket["allowed"]
+
+    async def refund(self, key: str, rate: float, burst: int, cost: int) -> None:
+        # Истёкший бакет и так полон, возвращать некуда
+        now = datetime.now(UTC)
+        await RateLimitBucket.get_pymongo_collection().update_one(
+            {"_id": key},
+            [
+                {
+                    "$set": {
+                        "tokens": {
+                            "$min": [
+                                burst,
+                                {"$add": [self._refilled(now, rate, burst), cost]},
+                            ]
+                        },
+                        "updated_at": now,
+                    }
+                }
+            ],
+        )
+
+    def clear(self) -> None:
+        pass
+
+    @staticmethod
+    def _refilled(now: datetime, rate: float, burst: int) -> dict:
+        """Выражение: токены бакета, пополненные к моменту now"""
+
+        elapsed = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        return {
+            "$min": [
+                burst,
+                {
+                    "$add": [
+                        {"$ifNull": ["$tokens", burst]},
+                        {"$multiply": [elapsed, rate]},
+                    ]
+                },
+            ]
+        }
+
+
+class RateLimiter:
+    """
+    Token bucket: в среднем rate запросов в секунду, всплеск до burst.
+
+    Запрос стоимостью больше burst (пачка сообщений) пропускается при полном
+    бакете и уводит его в минус, следующие запросы ждут, пока долг погасится.
+    """
+
+    def __init__(self, store: RateLimitStore) -> None:
+        self.store = store
+
+    async def hit(self, key: str, limit: RateLimit, cost: int = 1) -> RateLimitResult:
+        tokens, allowed = await self.store.take(key, limit.rate, limit.burst, cost)
+        needed = min(cost, limit.burst) - tokens
+        return RateLimitResult(
+            allowed=allowed,
+            limit=limit.burst,
+            remaining=max(0, math.floor(tokens)),
+            reset_after=math.ceil((limit.burst - tokens) / limit.rate),
+            retry_after=0 if allowed else max(1, math.ceil(needed / limit.rate)),
+        )
+
+    async def refund(self, key: str, limit: RateLimit, cost: int = 1) -> None:
+        await self.store.refund(key, limit.rate, limit.burst, cost)
+
+
+@trace_service
+class RateLimitService:
+    @staticmethod
+    async def check_webhook(chatbot_token: str, chat_ids: list[str]) -> RateLimitCharge | None:
+        """
+        Списать лимиты бота и каналов за пачку сообщений из chat_ids.
+
+        Рейзит KeyError для неизвестного токена и RateLimitExceeded, если
+        лимит бота или одного из каналов исчерпан; уже списанные при этом
+        токены возвращаются. Возвращает списание с состоянием лимита бота
+        для заголовков ответа (None, если лимиты выключены).
+        """
+
+        if not settings.rate_limit.enabled:
+            return None
+
+        chatbot = await LookupCache.get_chatbot_by_token(chatbot_token)
+        if not chatbot:
+            raise KeyError(f"ChatBot with chat bot token '{chatbot_token}' not found")
+
+        chatbot_limit = _chatbot_limit(chatbot)
+        result = await rate_limiter.hit(_chatbot_key(chatbot.id), chatbot_limit, cost=len(chat_ids))
+        if not result.allowed:
+            raise RateLimitExceeded(f"chatbot '{chatbot.id}'", result)
+
+        charge = RateLimitCharge(str(chatbot.id), chatbot_limit, _channel_limit(chatbot), result)
+        charged: list[str] = []
+        for chat_id, count in Counter(chat_ids).items():
+            channel_result = await rate_limiter.hit(
+                _channel_key(charge.chatbot_id, chat_id), charge.channel_limit, count
+            )
+            if not channel_result.allowed:
+                await _refund(charge, len(chat_ids), Counter(charged))
+                raise RateLimitExceeded(f"channel '{chat_id}'", channel_result)
+            charged.extend([chat_id] * count)
+
+        return charge
+
+    @staticmethod
+    async def refund(charge: RateLimitCharge | None, chat_ids: list[str]) -> None:
+        """Вернуть токены за сообщения, которые не были приняты (дубликаты, ошибки)"""
+
+        if charge is None or not chat_ids:
+            return
+        await _refund(charge, len(chat_ids), Counter(chat_ids))
+
+    @staticmethod
+    @asynccontextmanager
+    async def charge_webhook(chatbot_token: str, chat_ids: list[str]) -> AsyncIterator[RateLimitCharge | None]:
+        """check_webhook, токены возвращаются, если обработка запроса упала"""
+
+        charge = await RateLimitService.check_webhook(chatbot_token, chat_ids)
+        try:
+            yield charge
+        except Exception:
+            await RateLimitService.refund(charge, chat_ids)
+            raise
+
+
+def _chatbot_key(chatbot_id: object) -> str:
+    return f"chatbot:{chatbot_id}"
+
+
+def _channel_key(chatbot_id: object, chat_id: str) -> str:
+    return f"channel:{chatbot_id}:{chat_id}"
+
+
+async def _refund(charge: RateLimitCharge, chatbot_cost: int, channel_costs: Counter[str]) -> None:
+    await rate_limiter.refund(_chatbot_key(charge.chatbot_id), charge.chatbot_limit, chatbot_cost)
+    for chat_id, count in channel_costs.items():
+        await rate_limiter.refund(_channel_key(charge.chatbot_id, chat_id), charge.channel_limit, count)
+
+
+def _chatbot_limit(chatbot: ChatBot) -> RateLimit:
+    return chatbot.rate_limit or RateLimit(
+        rate=settings.rate_limit.chatbot_rate, burst=settings.rate_limit.chatbot_burst
+    )
+
+
+def _channel_limit(chatbot: ChatBot) -> RateLimit:
+    return chatbot.channel_rate_limit or RateLimit(
+        rate=settings.rate_limit.channel_rate, burst=settings.rate_limit.channel_burst
+    )
+
+
+rate_limiter = RateLimiter(
+    MongoRateLimitStore(idle_ttl=settings.rate_limit.idle_ttl)
+    if settings.rate_limit.backend == "mongo"
+    else MemoryRateLimitStore(max_keys=settings.rate_limit.max_keys, idle_ttl=settings.rate_limit.idle_ttl)
+)
@@ -0,0 +1,35 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+from core.database.models import DialogueMessage
+
+
+class ReplyStream:
+    """
+    Передача фрагментов ответа LLM из фоновой задачи клиенту (SSE).
+
+    Задача генерации не зависит от клиента: если он отключился,
+    ответ всё равно дописывается, сохраняется и уходит в канал.
+    """
+
+    def __init__(self) -> None:
+        # Сохранённое сообщение ассистента, None — генерация не удалась
+        self.message: DialogueMessage | None = None
+        self.closed = False
+        self._chunks: asyncio.Queue[str | None] = asyncio.Queue()
+
+    def push(self, chunk: str) -> None:
+        self._chunks.put_nowait(chunk)
+
+    def close(self, message: DialogueMessage | None) -> None:
+        """Завершить поток, повторное закрытие ничего не меняет"""
+
+        if self.closed:
+            return
+        self.closed = True
+        self.message = message
+        self._chunks.put_nowait(None)
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        while (chunk := await self._chunks.get()) is not None:
+            yield chunk
@@ -4,7 +4,7 @@ from typing import Any, Callable
 
 from httpx import ASGITransport, AsyncClient
 
-from app.app import app
+from app.app import app, lifespan
 from core.database import initialize_database
 from core.database.models.chat_bot import ChatBot
 
@@ -44,12 +44,13 @@ def with_database_and_client(func: Callable) -> Callable:
         asyncio.set_event_loop(loop)
 
         async def setup_and_run():
-            await initialize_database()
-            chat_bot = ChatBot(name="TestBot", secret_token="test_token_123")
-            await chat_bot.insert()
-            kwargs["chat_bot_id"] = str(chat_bot.id)
-            async with create_test_client() as client:
-                return await inner_func(client, **kwargs)
+            # ASGITransport не запускает lifespan, поэтому поднимаем его вручную
+            async with lifespan(app):
+                chat_bot = ChatBot(name="TestBot", secret_token="test_token_123")
+                await chat_bot.insert()
+                kwargs["chat_bot_id"] = str(chat_bot.id)
+                async with create_test_client() as client:
+                    return await inner_func(client, **kwargs)
 
         try:
             return loop.run_until_complete(setup_and_run())
@@ -59,6 +60,22 @@ def with_database_and_client(func: Callable) -> Callable:
     return wrapper
 
 
+async def wait_for_job(client: AsyncClient, job_id: str, timeout: float = 30.0) -> dict:
+    """
+    Дожидается завершения фоновой задачи, опрашивая эндпоинт статуса.
+    """
+
+    async def _poll() -> dict:
+        while True:
+            response = await client.get(f"/api/webhook/jobs/{job_id}")
+            job = response.json()
+            if job["status"] in ("done", "failed"):
+                return job
+            await asyncio.sleep(0.1)
+
+    return await asyncio.wait_for(_poll(), timeout=timeout)
+
+
 def with_database_setup(func: Callable) -> Callable:
     """
     Декоратор, инициализирующий БД.
@@ -2,18 +2,26 @@ import motor.motor_asyncio
 import pytest_asyncio
 from loguru import logger
 
+from app.services.chat_service import seen_messages
+from app.services.lookup_cache import LookupCache
+from app.services.rate_limiter import rate_limiter
 from core import settings
+from core.tracing import tracer
+from predict import response_cache
 
 
 @pytest_asyncio.fixture(autouse=True)
 async def drop_db() -> None:
-    """Фикстура, для того чтобы дропнуть бд перед каждым тестом"""
+    """Фикстура, для того чтобы дропнуть бд и in-memory кэши перед каждым тестом"""
 
     if not settings.mongo.db_name.lower().endswith("test"):
         raise RuntimeError("Database name must end with 'test' for safety")
 
-    mongo: motor.motor_asyncio.AsyncIOMotorClient = (
-        motor.motor_asyncio.AsyncIOMotorClient(settings.mongo.url)
-    )
+    mongo: motor.motor_asyncio.AsyncIOMotorClient = motor.motor_asyncio.AsyncIOMotorClient(settings.mongo.url)
     await mongo.drop_database(settings.mongo.db_name)
+    LookupCache.clear()
+    seen_messages.clear()
+    response_cache.clear()
+    rate_limiter.store.clear()
+    tracer.clear()
     logger.success(f"Dropped database: {settings.mongo.db_name}")
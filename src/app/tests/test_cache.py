@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+from core.cache import TTLCache
+from core.database.models import DialogueMessage, MessageRole
+from predict import ResponseCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    """Тест вытеснения самой давно использованной записи при переполнении"""
+
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_ttl_cache_expires_entries():
+    """Тест истечения времени жизни записи"""
+
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats()["misses"] == 1
+
+
+def test_ttl_cache_limits_total_weight():
+    """Тест ограничения суммарного веса записей: старые вытесняются, вес пересчитывается"""
+
+    cache: TTLCache[str, str] = TTLCache(maxsize=10, ttl=60, weigher=len, max_weight=10)
+    cache.set("a", "x" * 4)
+    cache.set("b", "x" * 4)
+    cache.set("c", "x" * 4)
+
+    assert cache.get("a") is None
+    assert cache.weight == 8
+
+    cache.set("b", "x")
+    assert cache.weight == 5
+    assert cache.stats()["weight"] == 5
+
+
+def test_response_cache_single_flight():
+    """Тест кэша ответов LLM: одинаковые параллельные запросы вызывают модель один раз"""
+
+    calls = 0
+
+    async def generate() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def run() -> list[str]:
+        cache = ResponseCache(maxsize=10, max_bytes=1024, ttl=60)
+        context = [DialogueMessage(role=MessageRole.USER, text=" Hi ", message_id="1")]
+        same = [DialogueMessage(role=MessageRole.USER, text="hi", message_id="2")]
+
+        results = await asyncio.gather(*(cache.get_or_generate("bot", context, generate) for _ in range(5)))
+        results.append(await cache.get_or_generate("bot", same, generate))
+        assert cache.stats()["coalesced"] == 4
+        assert cache.stats()["hits"] == 1
+        return results
+
+    assert asyncio.run(run()) == ["answer"] * 6
+    assert calls == 1
@@ -1,8 +1,12 @@
+import json
+
 from bson import ObjectId
 from httpx import AsyncClient
 
-from core.database.models import Channel
+from app.services.dialogue_service import DialogueService
+from core.database.models import Channel, DialogueMessage, MessageRole
 from core.database.models.channel import ChannelSettings
+
 from .async_client import with_database_and_client
 
 
@@ -46,8 +50,7 @@ def test_create_channel_chatbot_incorrect_id():
         assert response.status_code == 422
         assert (
             f"'{channel_data['chat_bot_id']}' is not a valid ObjectId, "
-            "it must be a 12-byte input or a 24-character hex string"
-            in response.json()["detail"]
+            "it must be a 12-byte input or a 24-character hex string" in response.json()["detail"]
         )
 
     return _test
@@ -95,10 +98,7 @@ def test_create_channel_chatbot_not_found():
         response = await client.post("/api/channels/", json=channel_data)
 
         assert response.status_code == 404
-        assert (
-            f"ChatBot with id: '{channel_data["chat_bot_id"]}' not found"
-            in response.json()["detail"]
-        )
+        assert f"ChatBot with id: '{channel_data['chat_bot_id']}' not found" in response.json()["detail"]
 
     return _test
 
@@ -111,9 +111,7 @@ def test_get_channels_by_chatbot():
         channel1 = Channel(
             name="Channel 1",
             chat_bot_id=kwargs["chat_bot_id"],
-            settings=ChannelSettings(
-                url="https://example1.com/webhook", token="token1"
-            ),
+            settings=ChannelSettings(url="https://example1.com/webhook", token="token1"),
             is_active=True,
         )
         await channel1.insert()
@@ -121,16 +119,12 @@ def test_get_channels_by_chatbot():
         channel2 = Channel(
             name="Channel 2",
             chat_bot_id=kwargs["chat_bot_id"],
-            settings=ChannelSettings(
-                url="https://example2.com/webhook", token="token2"
-            ),
+            settings=ChannelSettings(url="https://example2.com/webhook", token="token2"),
             is_active=True,
         )
         await channel2.insert()
 
-        response = await client.get(
-            f"/api/channels/?chat_bot_id={kwargs["chat_bot_id"]}"
-        )
+        response = await client.get(f"/api/channels/?chat_bot_id={kwargs['chat_bot_id']}")
 
         assert response.status_code == 200
         data = response.json()
@@ -149,9 +143,7 @@ def test_get_channels_not_active():
         channel1 = Channel(
             name="Channel 1",
             chat_bot_id=kwargs["chat_bot_id"],
-            settings=ChannelSettings(
-                url="https://example1.com/webhook", token="token1"
-            ),
+            settings=ChannelSettings(url="https://example1.com/webhook", token="token1"),
             is_active=False,
         )
         await channel1.insert()
@@ -159,16 +151,12 @@ def test_get_channels_not_active():
         channel2 = Channel(
             name="Channel 2",
             chat_bot_id=kwargs["chat_bot_id"],
-            settings=ChannelSettings(
-                url="https://example2.com/webhook", token="token2"
-            ),
+            settings=ChannelSettings(url="https://example2.com/webhook", token="token2"),
             is_active=True,
         )
         await channel2.insert()
 
-        response = await client.get(
-            f"/api/channels/?chat_bot_id={kwargs["chat_bot_id"]}&active=false"
-        )
+        response = await client.get(f"/api/channels/?chat_bot_id={kwargs['chat_bot_id']}&active=false")
 
         assert response.status_code == 200
         data = response.json()
@@ -186,9 +174,7 @@ def test_get_channels_by_chatbot_chat_bot_not_found():
         channel1 = Channel(
             name="Channel 1",
             chat_bot_id=kwargs["chat_bot_id"],
-            settings=ChannelSettings(
-                url="https://example1.com/webhook", token="token1"
-            ),
+            settings=ChannelSettings(url="https://example1.com/webhook", token="token1"),
             is_active=True,
         )
         await channel1.insert()
@@ -196,22 +182,15 @@ def test_get_channels_by_chatbot_chat_bot_not_found():
         channel2 = Channel(
             name="Channel 2",
             chat_bot_id=kwargs["chat_bot_id"],
-            settings=ChannelSettings(
-                url="https://example2.com/webhook", token="token2"
-            ),
+            settings=ChannelSettings(url="https://example2.com/webhook", token="token2"),
             is_active=True,
         )
         await channel2.insert()
 
-        response = await client.get(
-            f"/api/channels/?chat_bot_id={kwargs["chat_bot_id"][:-3] + 'abc'}"
-        )
+        response = await client.get(f"/api/channels/?chat_bot_id={kwargs['chat_bot_id'][:-3] + 'abc'}")
 
         assert response.status_code == 404
-        assert (
-            f"ChatBot with id: '{kwargs["chat_bot_id"][:-3] + 'abc'}' not found"
-            in response.json()["detail"]
-        )
+        assert f"ChatBot with id: '{kwargs['chat_bot_id'][:-3] + 'abc'}' not found" in response.json()["detail"]
 
     return _test
 
@@ -224,9 +203,7 @@ def test_get_channels_by_chatbot_incorrect_id():
         channel1 = Channel(
             name="Channel 1",
             chat_bot_id=kwargs["chat_bot_id"],
-            settings=ChannelSettings(
-                url="https://example1.com/webhook", token="token1"
-            ),
+            settings=ChannelSettings(url="https://example1.com/webhook", token="token1"),
             is_active=True,
         )
         await channel1.insert()
@@ -234,9 +211,7 @@ def test_get_channels_by_chatbot_incorrect_id():
         channel2 = Channel(
             name="Channel 2",
             chat_bot_id=kwargs["chat_bot_id"],
-            settings=ChannelSettings(
-                url="https://example2.com/webhook", token="token2"
-            ),
+            settings=ChannelSettings(url="https://example2.com/webhook", token="token2"),
             is_active=True,
         )
         await channel2.insert()
@@ -257,13 +232,10 @@ def test_get_channel_by_id():
     """Тест получения канала по ID"""
 
     async def _test(client: AsyncClient, **kwargs):
-
         channel = Channel(
             name="Test Channel",
             chat_bot_id=kwargs["chat_bot_id"],
-            settings=ChannelSettings(
-                url="https://example.com/webhook", token="token123"
-            ),
+            settings=ChannelSettings(url="https://example.com/webhook", token="token123"),
             is_active=True,
         )
         await channel.insert()
@@ -304,10 +276,7 @@ def test_get_channel_not_found():
         response = await client.get(f"/api/channels/{non_existing_id}")
 
         assert response.status_code == 404
-        assert (
-            f"Channel with id: '{non_existing_id}' not found"
-            in response.json()["detail"]
-        )
+        assert f"Channel with id: '{non_existing_id}' not found" in response.json()["detail"]
 
     return _test
 
@@ -320,9 +289,7 @@ def test_update_channel():
         channel = Channel(
             name="Test Channel",
             chat_bot_id=kwargs["chat_bot_id"],
-            settings=ChannelSettings(
-                url="https://example.com/webhook", token="token123"
-            ),
+            settings=ChannelSettings(url="https://example.com/webhook", token="token123"),
             is_active=True,
         )
         await channel.insert()
@@ -347,9 +314,7 @@ def test_delete_channel():
         channel = Channel(
             name="Test Channel",
             chat_bot_id=kwargs["chat_bot_id"],
-            settings=ChannelSettings(
-                url="https://example.com/webhook", token="token123"
-            ),
+            settings=ChannelSettings(url="https://example.com/webhook", token="token123"),
             is_active=True,
         )
         await channel.insert()
@@ -362,3 +327,247 @@ def test_delete_channel():
         assert deleted_channel is None
 
     return _test
+
+
+@with_database_and_client
+def test_update_channel_invalidates_cache():
+    """Тест сброса кэша канала при обновлении: повторное чтение видит новые данные"""
+
+    async def _test(client: AsyncClient, **kwargs):
+        channel = Channel(
+            name="Cached Channel",
+            chat_bot_id=kwargs["chat_bot_id"],
+            settings=ChannelSettings(url="https://example.com/webhook", token="token123"),
+            is_active=True,
+        )
+        await channel.insert()
+
+        await client.get(f"/api/channels/{channel.id}")
+        response = await client.get(f"/api/channels/{channel.id}")
+        assert response.json()["name"] == "Cached Channel"
+
+        stats = (await client.get("/api/system/cache")).json()
+        assert stats["channels_by_id"]["hits"] == 1
+
+        await client.put(f"/api/channels/{channel.id}", json={"name": "Renamed"})
+        response = await client.get(f"/api/channels/{channel.id}")
+
+        assert response.json()["name"] == "Renamed"
+
+    return _test
+
+
+@with_database_and_client
+def test_get_channel_dialogue_paginated():
+    """Тест постраничной истории диалога по курсору и NDJSON-стриминга"""
+
+    async def _test(client: AsyncClient, **kwargs):
+        channel = Channel(
+            name="History Channel",
+            chat_bot_id=kwargs["chat_bot_id"],
+            settings=ChannelSettings(url="https://example.com/webhook", token="token123"),
+            is_active=True,
+        )
+        await channel.insert()
+        for i in range(5):
+            await DialogueService.append_message(
+                channel.chat_bot_id,
+                str(channel.id),
+                DialogueMessage(role=MessageRole.USER, text=f"msg {i}", message_id=str(i)),
+            )
+
+        url = f"/api/channels/{channel.id}/dialogue"
+        latest = (await client.get(url, params={"limit": 2})).json()
+        assert [m["text"] for m in latest["messages"]] == ["msg 3", "msg 4"]
+        assert latest["next_cursor"] == 4
+
+        older = (await client.get(url, params={"limit": 2, "before": 4})).json()
+        assert [m["text"] for m in older["messages"]] == ["msg 1", "msg 2"]
+
+        last = (await client.get(url, params={"limit": 2, "after": 3})).json()
+        assert [m["message_id"] for m in last["messages"]] == ["3", "4"]
+        assert last["next_cursor"] is None
+
+        response = await client.get(url, params={"stream": True, "after": 1})
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["seq"] for line in lines] == [2, 3, 4, 5]
+
+    return _test
+
+
+@with_database_and_client
+def test_get_channels_paginated_with_fields():
+    """Тест keyset-пагинации списка каналов и проекции полей"""
+
+    async def _test(client: AsyncClient, **kwargs):
+        for i in range(5):
+            await Channel(
+                name=f"Channel {i}",
+                chat_bot_id=kwargs["chat_bot_id"],
+                settings=ChannelSettings(url="https://example.com/webhook", token=f"token{i}"),
+            ).insert()
+
+        names = []
+        params = {"chat_bot_id": kwargs["chat_bot_id"], "limit": 2, "fields": "id,name"}
+        while True:
+            response = await client.get("/api/channels/", params=params)
+            assert response.status_code == 200
+            page = response.json()
+            assert all(set(channel) == {"id", "name"} for channel in page)
+            names.extend(channel["name"] for channel in page)
+
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+            params["cursor"] = cursor
+
+        assert names == [f"Channel {i}" for i in range(5)]
+
+        response = await client.get("/api/channels/", params={"fields": "secret"})
+        assert response.status_code == 422
+
+    return _test
+
+
+@with_database_and_client
+def test_bulk_channels_partial_failure():
+    """Тест пакетных операций с каналами: результат по каждому элементу, ошибки не отменяют остальные"""
+
+    async def _test(client: AsyncClient, **kwargs):
+        missing_id = str(ObjectId())
+        response = await client.post(
+            "/api/channels/bulk",
+            json={
+                "channels": [
+                    {
+                        "name": f"Bulk {i}",
+                        "chat_bot_id": kwargs["chat_bot_id"],
+                        "url": "https://example.com/webhook",
+                    }
+                    for i in range(3)
+                ]
+                + [
+                    {
+                        "name": "Orphan",
+                        "chat_bot_id": missing_id,
+                        "url": "https://example.com/webhook",
+                    }
+                ]
+            },
+        )
+
+        assert response.status_code == 200
+        created = response.json()
+        assert [item["status"] for item in created] == [
+            "created",
+            "created",
+            "created",
+            "error",
+        ]
+        assert missing_id in created[3]["detail"]
+        assert await Channel.find(Channel.chat_bot_id == ObjectId(kwargs["chat_bot_id"])).count() == 3
+
+        ids = [item["id"] for item in created[:3]]
+        response = await client.put(
+            "/api/channels/bulk",
+            json={
+                "channels": [
+                    {"id": ids[0], "name": "Renamed", "url": "https://new.com/hook"},
+                    {"id": missing_id, "is_active": False},
+                    {"id": ids[1], "is_active": False},
+                ]
+            },
+        )
+        assert [item["status"] for item in response.json()] == [
+            "updated",
+            "error",
+            "updated",
+        ]
+        renamed = await Channel.get(ObjectId(ids[0]))
+        assert renamed.name == "Renamed"
+        assert str(renamed.settings.url) == "https://new.com/hook"
+        assert (await Channel.get(ObjectId(ids[1]))).is_active is False
+
+        response = await client.post(
+            "/api/channels/bulk/delete",
+            json={"ids": ["123", ids[0], ids[2]], "ordered": True},
+        )
+        assert [item["status"] for item in response.json()] == [
+            "error",
+            "error",
+            "error",
+        ]
+
+        response = await client.post("/api/channels/bulk/delete", json={"ids": ["123", ids[0], ids[2]]})
+        assert [item["status"] for item in response.json()] == [
+            "error",
+            "deleted",
+            "deleted",
+        ]
+        assert await Channel.get(ObjectId(ids[0])) is None
+
+    return _test
+
+
+@with_database_and_client
+def test_bulk_update_ignores_null_fields():
+    """Тест пакетного обновления: null в поле не меняет канал и не ломает документ"""
+
+    async def _test(client: AsyncClient, **kwargs):
+        channel = Channel(
+            name="Test Channel",
+            chat_bot_id=kwargs["chat_bot_id"],
+            settings=ChannelSettings(url="https://example.com/webhook", token="token123"),
+            is_active=True,
+        )
+        await channel.insert()
+
+        response = await client.put(
+            "/api/channels/bulk",
+            json={
+                "channels": [
+                    {
+                        "id": str(channel.id),
+                        "name": None,
+                        "chat_bot_id": None,
+                        "url": None,
+                        "is_active": None,
+                    }
+                ]
+            },
+        )
+        assert [item["status"] for item in response.json()] == ["updated"]
+
+        response = await client.get(f"/api/channels/{channel.id}")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["name"] == "Test Channel"
+        assert data["chat_bot_id"] == kwargs["chat_bot_id"]
+        assert data["url"] == "https://example.com/webhook"
+        assert data["is_active"] is True
+
+    return _test
+
+
+@with_database_and_client
+def test_get_channels_without_limit_returns_all():
+    """Тест совместимости списка каналов: без limit и cursor — все каналы без курсора"""
+
+    async def _test(client: AsyncClient, **kwargs):
+        for i in range(3):
+            await Channel(
+                name=f"Channel {i}",
+                chat_bot_id=kwargs["chat_bot_id"],
+                settings=ChannelSettings(url="https://example.com/webhook", token=f"token{i}"),
+            ).insert()
+
+        response = await client.get("/api/channels/", params={"fields": "id, name"})
+
+        assert response.status_code == 200
+        assert "X-Next-Cursor" not in response.headers
+        channels = response.json()
+        assert [channel["name"] for channel in channels] == [f"Channel {i}" for i in range(3)]
+        assert all(set(channel) == {"id", "name"} for channel in channels)
+
+    return _test
@@ -0,0 +1,27 @@
+from core.database.models import DialogueMessage, MessageRole
+from predict import select_context
+
+
+def _message(role: MessageRole, text: str) -> DialogueMessage:
+    return DialogueMessage(role=role, text=text, message_id=text)
+
+
+def test_select_context_respects_char_budget():
+    """Тест бюджета контекста: закреплённые сообщения остаются, старые отбрасываются"""
+
+    system = [_message(MessageRole.SYSTEM, "s" * 10)]
+    recent = [_message(MessageRole.USER, str(i) * 10) for i in range(5)]
+
+    context = select_context(system, recent, max_chars=35)
+
+    assert [message.text for message in context] == ["s" * 10, "3" * 10, "4" * 10]
+
+
+def test_select_context_keeps_latest_message_over_budget():
+    """Тест что самое новое сообщение попадает в контекст даже сверх бюджета"""
+
+    recent = [_message(MessageRole.USER, "a"), _message(MessageRole.USER, "b" * 100)]
+
+    context = select_context([], recent, max_chars=10)
+
+    assert [message.text for message in context] == ["b" * 100]
@@ -0,0 +1,85 @@
+import asyncio
+
+from app.services.conversation import ConversationCoordinator
+from app.services.job_pipeline import JobPipeline, JobStatus
+
+
+def _pipeline(workers: int) -> JobPipeline:
+    return JobPipeline(
+        workers=workers,
+        max_queue_size=10,
+        max_finished_jobs=100,
+        shutdown_timeout=0.1,
+        retry_delay=0.05,
+        max_delayed_jobs=100,
+    )
+
+
+def test_busy_chat_does_not_hold_workers():
+    """Тест цепочки задач чата: ожидающий ответ не занимает воркер, другие чаты не голодают"""
+
+    async def run() -> None:
+        pipeline = _pipeline(workers=2)
+        await pipeline.start()
+        conversations = ConversationCoordinator(pipeline, debounce=0)
+        release = asyncio.Event()
+        order: list[str] = []
+
+        async def reply(name: str, wait: bool) -> None:
+            order.append(name)
+            if wait:
+                await release.wait()
+
+        busy = [conversations.schedule_reply("busy", reply, f"busy-{i}", True, coalesce=False) for i in range(3)]
+        other = conversations.schedule_reply("other", reply, "other", False)
+        await asyncio.sleep(0.05)
+
+        # Первый ответ занятого чата ещё идёт, второй воркер свободен для другого чата
+        assert other.status == JobStatus.DONE
+        assert busy[1].status == JobStatus.QUEUED
+        assert pipeline.stats()["running"] == 1
+
+        release.set()
+        await asyncio.sleep(0.05)
+        assert order == ["busy-0", "other", "busy-1", "busy-2"]
+        assert conversations._states == {}
+        await pipeline.stop()
+
+    asyncio.run(run())
+
+
+def test_dropped_jobs_release_chat_state():
+    """Тест остановки очереди: снятые без выполнения задачи не оставляют состояния чата"""
+
+    async def run() -> None:
+        pipeline = JobPipeline(
+            workers=1,
+            max_queue_size=1,
+            max_finished_jobs=100,
+            shutdown_timeout=0.1,
+            retry_delay=0.05,
+            max_delayed_jobs=100,
+        )
+        await pipeline.start()
+        conversations = ConversationCoordinator(pipeline, debounce=10)
+        release = asyncio.Event()
+        # Воркер занят, очередь заполнена
+        pipeline.submit(release.wait)
+        await asyncio.sleep(0)
+        pipeline.submit(release.wait)
+
+        async def reply() -> None:
+            pass
+
+        first = conversations.schedule_reply("chat", reply)
+        # Присоединяется к ещё не начавшейся задаче
+        assert conversations.schedule_reply("chat", reply) is first
+        second = conversations.schedule_reply("chat", reply, coalesce=False)
+
+        await pipeline.stop()
+
+        assert first.status == JobStatus.FAILED
+        assert second.status == JobStatus.FAILED
+        assert conversations._states == {}
+
+    asyncio.run(run())
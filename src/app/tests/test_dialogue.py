@@ -0,0 +1,42 @@
+from app.services.dialogue_service import DialogueService
+from app.tests.async_client import with_database_setup
+from core.database.models import Dialogue, DialogueMessage, MessageRole
+from predict import build_context
+
+
+@with_database_setup
+def test_append_and_get_recent_messages():
+    """Тест хранения сообщений отдельно от диалога: последние N сообщений по порядку"""
+
+    async def _test(chat_bot):
+        for i in range(5):
+            dialogue = await DialogueService.append_message(
+                chat_bot.id,
+                "chat_1",
+                DialogueMessage(role=MessageRole.USER, text=f"msg {i}", message_id=str(i)),
+            )
+
+        recent = await DialogueService.get_recent_messages(dialogue.id, limit=3)
+
+        assert [message.text for message in recent] == ["msg 2", "msg 3", "msg 4"]
+        assert await Dialogue.find(Dialogue.chat_id == "chat_1").count() == 1
+        assert (await Dialogue.get(dialogue.id)).last_seq == 5
+
+    return _test
+
+
+@with_database_setup
+def test_build_context_pins_system_messages():
+    """Тест контекста LLM: SYSTEM-сообщения закреплены, остальные — последние N"""
+
+    async def _test(chat_bot):
+        messages = [DialogueMessage(role=MessageRole.SYSTEM, text="rules", message_id="s")]
+        messages += [DialogueMessage(role=MessageRole.USER, text=f"msg {i}", message_id=str(i)) for i in range(5)]
+        for message in messages:
+            dialogue = await DialogueService.append_message(chat_bot.id, "chat_1", message)
+
+        context = await build_context(dialogue.id, max_messages=2)
+
+        assert [message.text for message in context] == ["rules", "msg 3", "msg 4"]
+
+    return _test
@@ -0,0 +1,57 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.http_client import ChannelHttpClient
+from core import settings
+
+
+def test_channel_http_client_lifecycle():
+    """Тест клиента каналов: один клиент на процесс, закрывается при остановке"""
+
+    async def run() -> None:
+        http_client = ChannelHttpClient(settings.http_client)
+        with pytest.raises(RuntimeError):
+            _ = http_client.client
+
+        await http_client.start()
+        client = http_client.client
+        await http_client.start()
+        assert http_client.client is client
+
+        await http_client.stop()
+        assert client.is_closed
+        with pytest.raises(RuntimeError):
+            _ = http_client.client
+        await http_client.stop()
+
+    asyncio.run(run())
+
+
+def test_channel_http_client_drops_idle_hosts():
+    """Тест лимита на хост: учёт хоста удаляется, когда к нему нет запросов"""
+
+    async def run() -> None:
+        in_flight: list[dict[str, int]] = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(0.01)
+            in_flight.append(http_client.host_requests())
+            return httpx.Response(200)
+
+        http_client = ChannelHttpClient(settings.http_client, transport=httpx.MockTransport(handler))
+        await http_client.start()
+        try:
+            responses = await asyncio.gather(
+                http_client.post("https://a.example/webhook"),
+                http_client.post("https://a.example/webhook"),
+                http_client.post("https://b.example/webhook"),
+            )
+            assert [response.status_code for response in responses] == [200, 200, 200]
+            assert in_flight[0] == {"a.example": 2, "b.example": 1}
+            assert http_client.host_requests() == {}
+        finally:
+            await http_client.stop()
+
+    asyncio.run(run())
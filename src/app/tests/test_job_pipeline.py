@@ -0,0 +1,87 @@
+import asyncio
+
+from app.services.job_pipeline import JobPipeline, JobStatus
+
+
+def _pipeline(max_finished_jobs: int = 100, max_delayed_jobs: int = 100) -> JobPipeline:
+    return JobPipeline(
+        workers=1,
+        max_queue_size=1,
+        max_finished_jobs=max_finished_jobs,
+        shutdown_timeout=0.05,
+        retry_delay=0.05,
+        max_delayed_jobs=max_delayed_jobs,
+    )
+
+
+def test_job_pipeline_limits_delayed_jobs():
+    """Тест переполнения: сверх max_delayed_jobs задача завершается ошибкой, а не копится"""
+
+    async def run() -> None:
+        pipeline = _pipeline(max_delayed_jobs=1)
+        await pipeline.start()
+        release = asyncio.Event()
+        pipeline.submit(release.wait)
+        await asyncio.sleep(0)
+        pipeline.submit(release.wait)
+
+        deferred = pipeline.submit(release.wait)
+        dropped = pipeline.submit(release.wait)
+        assert deferred.status == JobStatus.QUEUED
+        assert pipeline.stats()["delayed"] == 1
+        assert dropped.status == JobStatus.FAILED
+        assert dropped.error == "Job queue is full"
+
+        release.set()
+        await asyncio.sleep(0.2)
+        assert deferred.status == JobStatus.DONE
+        await pipeline.stop()
+
+    asyncio.run(run())
+
+
+def test_job_pipeline_trims_finished_behind_running_job():
+    """Тест вытеснения: долгая задача не удерживает завершённые задачи после неё"""
+
+    async def run() -> None:
+        pipeline = _pipeline(max_finished_jobs=2)
+        pipeline.workers = 2
+        await pipeline.start()
+        release = asyncio.Event()
+        long_job = pipeline.submit(release.wait)
+        await asyncio.sleep(0)
+
+        async def noop() -> None:
+            pass
+
+        quick = []
+        for _ in range(3):
+            quick.append(pipeline.submit(noop))
+            await asyncio.sleep(0.01)
+
+        assert pipeline.get_job(long_job.id) is long_job
+        assert pipeline.get_job(quick[0].id) is None
+        assert pipeline.get_job(quick[-1].id) is quick[-1]
+
+        release.set()
+        await pipeline.stop()
+
+    asyncio.run(run())
+
+
+def test_job_pipeline_marks_cancelled_job_failed():
+    """Тест остановки: задача, прерванная отменой воркера, не остаётся RUNNING"""
+
+    async def run() -> None:
+        pipeline = _pipeline()
+        await pipeline.start()
+        job = pipeline.submit(asyncio.Event().wait)
+        await asyncio.sleep(0)
+
+        await pipeline.stop()
+        assert job.status == JobStatus.FAILED
+        assert job.error == "Job was cancelled"
+        assert job.finished_at is not None
+        assert pipeline.stats()["running"] == 0
+
+    asyncio.run(run())
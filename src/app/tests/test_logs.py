@@ -0,0 +1,89 @@
+import io
+import json
+import logging
+
+from loguru import logger
+
+from core.logs import _json_sink
+from core.logs.handlers import UvicornHandler
+
+
+def _access_record(status_code: int) -> logging.LogRecord:
+    return logging.LogRecord(
+        "uvicorn.access",
+        logging.INFO,
+        __file__,
+        1,
+        '%s - "%s %s HTTP/%s" %d',
+        ("127.0.0.1:5000", "GET", "/api/channels/", "1.1", status_code),
+        None,
+    )
+
+
+def test_uvicorn_handler_samples_access_log():
+    """Тест семплирования access-логов: при нулевой доле остаются только 5xx"""
+
+    messages: list[str] = []
+    sink_id = logger.add(messages.append, format="{message}")
+    try:
+        handler = UvicornHandler()
+        handler.access_log_sample_rate = 0.0
+        handler.fast_path = True
+        handler.emit(_access_record(200))
+        handler.emit(_access_record(503))
+    finally:
+        logger.remove(sink_id)
+
+    assert messages == ['127.0.0.1:5000 - "GET /api/channels/ HTTP/1.1" 503\n']
+
+
+def test_json_log_format():
+    """Тест JSON-формата: одна строка с уровнем, сообщением и extra, record не меняется"""
+
+    stream = io.StringIO()
+    extras: list[dict] = []
+    sink_ids = [
+        logger.add(_json_sink(stream), format="{message}"),
+        logger.add(lambda message: extras.append(message.record["extra"].copy())),
+    ]
+    try:
+        logger.bind(chat_id="chat_1").warning("Reply {queue} is full <tag>")
+    finally:
+        for sink_id in sink_ids:
+            logger.remove(sink_id)
+
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 1
+    assert extras == [{"chat_id": "chat_1"}]
+    record = json.loads(lines[0])
+    assert record["level"] == "WARNING"
+    assert record["message"] == "Reply {queue} is full <tag>"
+    assert record["extra"] == {"chat_id": "chat_1"}
+    assert record["function"] == "test_json_log_format"
+
+
+def test_uvicorn_handler_exception_caller():
+    """Тест fast path: запись Logger.exception указывает на вызвавшую функцию"""
+
+    functions: list[str] = []
+    sink_id = logger.add(lambda message: functions.append(message.record["function"]))
+    stdlib_logger = logging.getLogger("test_uvicorn_handler_exception_caller")
+    handler = UvicornHandler()
+    handler.fast_path = True
+    stdlib_logger.addHandler(handler)
+    stdlib_logger.propagate = False
+    stdlib_logger.setLevel(logging.INFO)
+    try:
+        stdlib_logger.info("plain")
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            stdlib_logger.exception("failed")
+    finally:
+        stdlib_logger.removeHandler(handler)
+        logger.remove(sink_id)
+
+    assert functions == [
+        "test_uvicorn_handler_exception_caller",
+        "test_uvicorn_handler_exception_caller",
+    ]
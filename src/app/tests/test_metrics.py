@@ -0,0 +1,55 @@
+from httpx import AsyncClient
+
+from core.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+from .async_client import with_database_and_client
+
+
+def test_metrics_prometheus_format():
+    """Тест текстового формата: накопительные бакеты, сумма, количество, метки"""
+
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("requests_total", "Requests", ("route",)))
+    histogram = registry.register(Histogram("duration_seconds", "Duration", ("stage",), buckets=(0.1, 1.0)))
+    registry.register(Gauge("queue_depth", "Queue depth", collect=lambda: {(): 3}))
+
+    counter.inc('/a"b')
+    counter.inc('/a"b')
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, "llm")
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{route="/a\\"b"} 2' in lines
+    assert 'duration_seconds_bucket{stage="llm",le="0.1"} 1' in lines
+    assert 'duration_seconds_bucket{stage="llm",le="1.0"} 2' in lines
+    assert 'duration_seconds_bucket{stage="llm",le="+Inf"} 3' in lines
+    assert 'duration_seconds_sum{stage="llm"} 5.55' in lines
+    assert 'duration_seconds_count{stage="llm"} 3' in lines
+    assert "queue_depth 3" in lines
+
+
+@with_database_and_client
+def test_metrics_endpoint():
+    """Тест /metrics: запросы по шаблону маршрута, этапы webhook и команды Mongo"""
+
+    async def _test(client: AsyncClient, **kwargs):
+        await client.get("/api/channels/000000000000000000000000")
+        await client.post(
+            "/api/webhook/new_message",
+            json={"chat_id": "missing", "text": "Hi", "message_sender": "customer"},
+            headers={"x-chatbot_auth_token": "Bearer test_token_123"},
+        )
+
+        response = await client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        text = response.text
+        assert 'http_requests_total{method="GET",route="/api/channels/{channel_id}",status="404"}' in text
+        assert 'webhook_stage_duration_seconds_count{stage="chatbot_lookup"}' in text
+        assert 'mongo_command_duration_seconds_count{command="find"}' in text
+        assert 'in_flight_tasks{component="llm",state="running"}' in text
+
+    return _test
@@ -26,9 +26,17 @@ def test_app_has_routes():
         assert "/" in routes
         assert "/docs" in routes
         assert "/api/channels/" in routes
+        assert "/api/channels/bulk" in routes
+        assert "/api/channels/bulk/delete" in routes
         assert "/api/channels/{channel_id}" in routes
         assert "/api/channels/{channel_id}/dialogue" in routes
         assert "/api/webhook/new_message" in routes
+        assert "/api/webhook/new_message/stream" in routes
+        assert "/api/webhook/new_messages" in routes
+        assert "/api/webhook/jobs/{job_id}" in routes
+        assert "/api/system/cache" in routes
+        assert "/api/system/llm" in routes
+        assert "/metrics" in routes
         print("App has expected routes")
     except Exception as e:
         pytest.fail(f"Route check failed: {e}")
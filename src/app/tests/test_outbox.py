@@ -0,0 +1,95 @@
+from datetime import UTC, datetime, timedelta
+
+from beanie import PydanticObjectId
+
+from app.services.http_client import channel_http_client
+from app.services.outbox_worker import OutboxWorker
+from app.tests.async_client import with_database_setup
+from core.database.models import Channel, OutboxMessage, OutboxStatus
+from core.database.models.channel import ChannelSettings
+from core.settings_model import OutboxSettings
+
+
+async def create_unreachable_channel(chat_bot_id: PydanticObjectId) -> Channel:
+    channel = Channel(
+        name="Unreachable Channel",
+        chat_bot_id=chat_bot_id,
+        settings=ChannelSettings(url="http://127.0.0.1:9/webhook", token="token"),
+        is_active=True,
+    )
+    await channel.insert()
+    return channel
+
+
+@with_database_setup
+def test_outbox_retries_then_dead_letters():
+    """Тест повторных попыток доставки: после max_attempts сообщение уходит в DEAD"""
+
+    async def _test(chat_bot):
+        channel = await create_unreachable_channel(chat_bot.id)
+        worker = OutboxWorker(OutboxSettings(max_attempts=2, base_backoff=60, max_backoff=60))
+        message = OutboxMessage(channel_id=channel.id, payload={"text": "hi"})
+        await message.insert()
+
+        await channel_http_client.start()
+        try:
+            await worker.drain_channel(channel.id)
+            message = await OutboxMessage.get(message.id)
+            assert message.status == OutboxStatus.PENDING
+            assert message.attempts == 1
+            assert message.last_error
+
+            await OutboxMessage.find_one({"_id": message.id}).update({"$set": {"next_attempt_at": datetime.now(UTC)}})
+            await worker.drain_channel(channel.id)
+        finally:
+            await channel_http_client.stop()
+
+        message = await OutboxMessage.get(message.id)
+        assert message.status == OutboxStatus.DEAD
+        assert message.attempts == 2
+
+    return _test
+
+
+@with_database_setup
+def test_outbox_keeps_channel_order():
+    """Тест порядка доставки: пока старое сообщение ждёт повтора, новые не отправляются"""
+
+    async def _test(chat_bot):
+        channel = await create_unreachable_channel(chat_bot.id)
+        worker = OutboxWorker(OutboxSettings())
+        first = OutboxMessage(
+            channel_id=channel.id,
+            payload={"text": "first"},
+            next_attempt_at=datetime.now(UTC) + timedelta(hours=1),
+        )
+        await first.insert()
+        second = OutboxMessage(channel_id=channel.id, payload={"text": "second"})
+        await second.insert()
+
+        assert channel.id not in await worker.find_due_channels()
+
+        await worker.drain_channel(channel.id)
+
+        second = await OutboxMessage.get(second.id)
+        assert second.status == OutboxStatus.PENDING
+        assert second.attempts == 0
+
+    return _test
+
+
+@with_database_setup
+def test_outbox_dead_letters_missing_channel():
+    """Тест доставки в удалённый канал: сообщение сразу уходит в DEAD"""
+
+    async def _test(chat_bot):
+        worker = OutboxWorker(OutboxSettings())
+        message = OutboxMessage(channel_id=PydanticObjectId(), payload={"text": "hi"})
+        await message.insert()
+
+        await worker.drain_channel(message.channel_id)
+
+        message = await OutboxMessage.get(message.id)
+        assert message.status == OutboxStatus.DEAD
+
+    return _test
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from app.services.rate_limiter import (
+    MemoryRateLimitStore,
+    MongoRateLimitStore,
+    RateLimiter,
+)
+from app.tests.async_client import with_database_setup
+from core.database.models import RateLimit, RateLimitBucket
+
+
+def test_rate_limiter_token_bucket():
+    """Тест token bucket: всплеск до burst, затем отказ с Retry-After"""
+
+    async def run() -> None:
+        limiter = RateLimiter(MemoryRateLimitStore(max_keys=10, idle_ttl=60))
+        limit = RateLimit(rate=1, burst=3)
+
+        results = [await limiter.hit("key", limit) for _ in range(4)]
+        assert [result.allowed for result in results] == [True, True, True, False]
+        assert results[2].remaining == 0
+        assert results[3].retry_after == 1
+        assert results[3].headers["Retry-After"] == "1"
+        assert "Retry-After" not in results[0].headers
+
+        # Лимиты разных ключей независимы
+        assert (await limiter.hit("other", limit)).allowed
+
+    asyncio.run(run())
+
+
+def test_rate_limiter_cost_above_burst():
+    """Тест пачки дороже burst: пропускается при полном бакете, дальше долг"""
+
+    async def run() -> None:
+        limiter = RateLimiter(MemoryRateLimitStore(max_keys=10, idle_ttl=60))
+        limit = RateLimit(rate=10, burst=5)
+
+        assert (await limiter.hit("key", limit, cost=20)).allowed
+        result = await limiter.hit("key", limit)
+        assert not result.allowed
+        assert result.retry_after == 2
+
+    asyncio.run(run())
+
+
+def test_rate_limiter_refund():
+    """Тест возврата токенов: бакет пополняется, но не выше burst"""
+
+    async def run() -> None:
+        limiter = RateLimiter(MemoryRateLimitStore(max_keys=10, idle_ttl=60))
+        limit = RateLimit(rate=0.001, burst=2)
+
+        assert (await limiter.hit("key", limit, cost=2)).allowed
+        assert not (await limiter.hit("key", limit)).allowed
+
+        await limiter.refund("key", limit, cost=5)
+        assert (await limiter.hit("key", limit, cost=2)).allowed
+        assert not (await limiter.hit("key", limit)).allowed
+
+    asyncio.run(run())
+
+
+@with_database_setup
+def test_mongo_rate_limit_store():
+    """Тест token bucket в Mongo: списание, отказ, возврат и общий бакет"""
+
+    async def _test(chat_bot):
+        limiter = RateLimiter(MongoRateLimitStore(idle_ttl=60))
+        limit = RateLimit(rate=0.001, burst=3)
+
+        results = [await limiter.hit("key", limit) for _ in range(4)]
+        assert [result.allowed for result in results] == [True, True, True, False]
+        assert results[3].retry_after > 0
+
+        # Отказ не списывает токены, возврат не поднимает бакет выше burst
+        await limiter.refund("key", limit, cost=10)
+        bucket = await RateLimitBucket.get("key")
+        assert bucket.tokens == pytest.approx(3, abs=0.01)
+        assert bucket.expires_at is not None
+
+        # Бакет общий для всех экземпляров хранилища
+        other = RateLimiter(MongoRateLimitStore(idle_ttl=60))
+        assert (await other.hit("key", limit, cost=3)).allowed
+        assert not (await limiter.hit("key", limit)).allowed
+
+        # Возврат в отсутствующий бакет ничего не создаёт
+        await limiter.refund("missing", limit)
+        assert await RateLimitBucket.get("missing") is None
+
+    return _test
+
+
+def test_rate_limit_rejects_non_positive_values():
+    """Тест схемы лимита: нулевая скорость или всплеск отклоняются при валидации"""
+
+    with pytest.raises(ValidationError):
+        RateLimit(rate=0, burst=10)
+    with pytest.raises(ValidationError):
+        RateLimit(rate=1, burst=0)
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from predict import LLMQueueFull, LLMScheduler
+
+
+def test_llm_scheduler_fair_queuing():
+    """Тест справедливой очереди: шумный бот не вытесняет остальных, вес учитывается"""
+
+    order: list[str] = []
+
+    async def call(scheduler: LLMScheduler, chat_bot_id: str, weight: float) -> None:
+        async with scheduler.slot(chat_bot_id, weight):
+            order.append(chat_bot_id)
+            await asyncio.sleep(0.001)
+
+    async def run() -> None:
+        scheduler = LLMScheduler(max_concurrency=1, max_queue_size=100, max_queue_per_chatbot=100)
+        tasks = [asyncio.create_task(call(scheduler, "noisy", 2.0)) for _ in range(8)]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(call(scheduler, "quiet", 1.0)) for _ in range(3)]
+        await asyncio.gather(*tasks)
+
+        stats = scheduler.stats()
+        assert stats["total"]["running"] == 0
+        assert stats["total"]["served"] == 11
+        # Очереди простаивающих ботов не хранятся, а счётчики сохраняются
+        assert stats["total"]["active_chatbots"] == 0
+        assert stats["chatbots"]["noisy"]["served"] == 8
+        assert stats["chatbots"]["quiet"]["served"] == 3
+        assert stats["chatbots"]["quiet"]["wait_seconds_total"] > 0
+        assert stats["chatbots"]["quiet"]["queue_depth"] == 0
+
+    asyncio.run(run())
+
+    # Бот с весом 2 получает два вызова на каждый вызов бота с весом 1
+    assert "".join(name[0] for name in order[:9]) == "nqnnqnnqn"
+
+
+def test_llm_scheduler_rejects_when_queue_full():
+    """Тест ограничения очереди: отказ с оценкой Retry-After"""
+
+    async def run() -> None:
+        scheduler = LLMScheduler(max_concurrency=1, max_queue_size=10, max_queue_per_chatbot=1)
+        release = asyncio.Event()
+
+        async def call() -> None:
+            async with scheduler.slot("bot"):
+                await release.wait()
+
+        tasks = [asyncio.create_task(call()) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(LLMQueueFull) as error:
+            scheduler.check_capacity("bot")
+        assert error.value.per_chatbot
+        assert error.value.retry_after >= 1
+        scheduler.check_capacity("other_bot")
+        assert scheduler.stats()["chatbots"]["bot"]["rejected"] == 1
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+
+def test_llm_scheduler_skips_cancelled_waiters():
+    """Тест отмены ожидающих задач: слот не уходит отменённой задаче и не теряется"""
+
+    async def run() -> None:
+        scheduler = LLMScheduler(max_concurrency=1, max_queue_size=10, max_queue_per_chatbot=10)
+        release = asyncio.Event()
+        served: list[str] = []
+
+        async def call(name: str) -> None:
+            async with scheduler.slot("bot"):
+                served.append(name)
+                if name == "first":
+                    await release.wait()
+
+        first = asyncio.create_task(call("first"))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(call("cancelled"))
+        last = asyncio.create_task(call("last"))
+        await asyncio.sleep(0)
+
+        # Слот освобождается раньше, чем отменённая задача успевает проснуться
+        release.set()
+        cancelled.cancel()
+        await asyncio.gather(first, last)
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+
+        assert served == ["first", "last"]
+        stats = scheduler.stats()
+        assert stats["total"]["running"] == 0
+        assert stats["total"]["queue_depth"] == 0
+        assert stats["total"]["active_chatbots"] == 0
+        assert stats["chatbots"]["bot"]["served"] == 2
+
+    asyncio.run(run())
@@ -0,0 +1,72 @@
+import json
+import math
+
+import pytest
+
+from app.responses import ValidatedJSONResponse
+from app.schemas.channel import ChannelBulkResult, ChannelResponse
+from core import serialization
+from core.database.models import DialogueMessage, MessageRole
+from core.serialization import dumps
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    """Оба пути dumps: через orjson (если установлен) и через стандартный json"""
+
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(serialization, "orjson", None)
+    return request.param
+
+
+def test_dumps_matches_json_response_encoding(encoder):
+    """Тест dumps: компактный UTF-8 JSON, как у стандартного JSONResponse"""
+
+    message = DialogueMessage(role=MessageRole.USER, text="Привет", message_id="1")
+    payload = message.model_dump()
+
+    assert dumps(payload) == json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def test_dumps_non_str_keys(encoder):
+    """Тест dumps: ключи-не-строки приводятся к строкам в обоих путях"""
+
+    assert json.loads(dumps({1: "a", None: "b", False: "c"})) == {
+        "1": "a",
+        "null": "b",
+        "false": "c",
+    }
+
+
+def test_dumps_nan(encoder):
+    """Тест dumps: NaN в orjson становится null, стандартный json рейзит"""
+
+    if encoder == "orjson":
+        assert dumps({"value": math.nan}) == b'{"value":null}'
+    else:
+        with pytest.raises(ValueError):
+            dumps({"value": math.nan})
+
+
+def test_validated_json_response_serializes_models():
+    """Тест ответа из моделей: тело совпадает с model_dump, включая вложенные"""
+
+    channel = ChannelResponse(
+        id="1",
+        name="Channel",
+        chat_bot_id="2",
+        url="https://example.com/webhook",
+        is_active=True,
+        token="token",
+    )
+    results = [
+        ChannelBulkResult(id="1", status="created", channel=channel),
+        ChannelBulkResult(id=None, status="error", detail="Invalid chat_bot_id"),
+    ]
+
+    response = ValidatedJSONResponse(results)
+
+    assert response.headers["content-type"] == "application/json"
+    assert json.loads(response.body) == [result.model_dump(mode="json") for result in results]
@@ -2,6 +2,7 @@ from loguru import logger
 
 from app.tests.async_client import with_database_setup
 from core.database.models import ChatBot
+from core.database.registry import collect_index_report
 
 
 @with_database_setup
@@ -26,3 +27,17 @@ def test_chatbot_find():
         logger.success(f"ChatBot found successfully: {found_bot.name}")
 
     return _test
+
+
+@with_database_setup
+def test_declared_indexes_created():
+    """Тест на то, что все объявленные в моделях индексы созданы при инициализации БД"""
+
+    async def _test(chat_bot):
+        report = await collect_index_report()
+
+        assert all(not problems["missing"] for problems in report.values())
+        indexes = await ChatBot.get_pymongo_collection().index_information()
+        assert any(info["key"] == [("secret_token", 1)] and info.get("unique") for info in indexes.values())
+
+    return _test
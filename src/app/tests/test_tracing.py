@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+from httpx import AsyncClient
+
+from core import settings
+from core.tracing import Tracer, span, trace_service
+
+from .async_client import with_database_and_client
+
+
+@trace_service
+class _Service:
+    @staticmethod
+    async def work() -> None:
+        with span("inner"):
+            await asyncio.sleep(0)
+
+
+def test_tracer_records_nested_spans():
+    """Тест спанов: вложенность, сохранение выбранных и медленных трейсов"""
+
+    config = settings.tracing.model_copy(update={"sample_rate": 0.0, "slow_threshold": 0.05, "max_traces": 2})
+    local_tracer = Tracer(config)
+
+    async def run() -> None:
+        with local_tracer.trace("forced", force=True) as trace:
+            await _Service.work()
+        with local_tracer.trace("fast"):
+            await _Service.work()
+        with local_tracer.trace("slow"):
+            await asyncio.sleep(0.06)
+
+        spans = [(span.name, span.depth) for span in trace.spans]
+        assert sorted(spans) == [("_Service.work", 0), ("inner", 1)]
+
+    asyncio.run(run())
+
+    assert [trace.name for trace in local_tracer.recent()] == ["slow", "forced"]
+    assert local_tracer.recent()[1].profile is not None
+
+
+def test_tracer_profiles_busy_code():
+    """Тест профайлера: в свёрнутых стеках виден код, занимавший event loop"""
+
+    config = settings.tracing.model_copy(update={"profile_interval": 0.001})
+    local_tracer = Tracer(config)
+
+    with local_tracer.trace("busy", force=True) as trace:
+        started = time.perf_counter()
+        while time.perf_counter() - started < 0.1:
+            pass
+
+    assert trace.profile
+    assert "test_tracer_profiles_busy_code" in trace.folded_profile()
+
+
+@with_database_and_client
+def test_debug_trace_header():
+    """Тест X-Debug-Trace: запрос трейсится, в трейсе вызовы сервисов и Mongo"""
+
+    async def _test(client: AsyncClient, **kwargs):
+        debug_token = settings.tracing.debug_token
+        settings.tracing.debug_token = "debug_secret"
+        try:
+            response = await client.get(
+                "/api/channels/000000000000000000000000",
+                headers={"X-Debug-Trace": "debug_secret"},
+            )
+            untraced = await client.get(
+                "/api/channels/000000000000000000000000",
+                headers={"X-Debug-Trace": "wrong"},
+            )
+        finally:
+            settings.tracing.debug_token = debug_token
+
+        assert response.status_code == 404
+        assert "x-trace-id" not in untraced.headers
+        trace_id = response.headers["x-trace-id"]
+
+        trace = (await client.get(f"/api/system/traces/{trace_id}")).json()
+        span_names = {span["name"] for span in trace["spans"]}
+        assert "ChannelService.get_channel" in span_names
+        assert "mongo.find" in span_names
+        assert trace["profiled"]
+
+        profile = await client.get(f"/api/system/traces/{trace_id}/profile")
+        assert profile.status_code == 200
+
+    return _test
@@ -1,9 +1,22 @@
+import asyncio
+import json
+
+from beanie import PydanticObjectId
 from httpx import AsyncClient
 
-from core.database.models import Channel, Dialogue
+from app.routers.api.webhook import _reply_events
+from app.services.chat_service import seen_messages
+from app.services.conversation import conversations
+from app.services.dialogue_service import DialogueService
+from app.services.job_pipeline import Job, JobPipeline, reply_pipeline
+from app.services.lookup_cache import LookupCache
+from app.services.reply_stream import ReplyStream
+from core import settings
+from core.database.models import Channel, ChatBot, Dialogue, Message, RateLimit
 from core.database.models.channel import ChannelSettings
+from predict import llm_scheduler
 
-from .async_client import with_database_and_client
+from .async_client import wait_for_job, with_database_and_client
 
 
 @with_database_and_client
@@ -14,9 +27,7 @@ def test_webhook_message_success():
         channel = Channel(
             name="Test Channel",
             chat_bot_id=kwargs["chat_bot_id"],
-            settings=ChannelSettings(
-                url="https://example.com/webhook", token="channel_token"
-            ),
+            settings=ChannelSettings(url="https://example.com/webhook", token="channel_token"),
             is_active=True,
         )
         await channel.insert()
@@ -28,16 +39,17 @@ def test_webhook_message_success():
         }
 
         headers = {"x-chatbot_auth_token": "Bearer test_token_123"}
-        response = await client.post(
-            "/api/webhook/new_message", json=message_data, headers=headers
-        )
+        response = await client.post("/api/webhook/new_message", json=message_data, headers=headers)
 
-        assert response.status_code == 200
-        assert response.json()["status"] == "Message processed successfully"
+        assert response.status_code == 202
+        assert response.json()["status"] == "Message accepted"
+
+        job = await wait_for_job(client, response.json()["job_id"])
+        assert job["status"] == "done"
 
         dialogue = await Dialogue.find_one({"chat_id": str(channel.id)})
 
-        assert len(dialogue.message_list) == 2
+        assert await Message.find(Message.dialogue_id == dialogue.id).count() == 2
 
     return _test
 
@@ -51,9 +63,7 @@ def test_webhook_message_employee_ignored():
         channel = Channel(
             name="Ignored Channel",
             chat_bot_id=kwargs["chat_bot_id"],
-            settings=ChannelSettings(
-                url="https://example.com/webhook", token="channel_token"
-            ),
+            settings=ChannelSettings(url="https://example.com/webhook", token="channel_token"),
             is_active=True,
         )
         await channel.insert()
@@ -67,15 +77,14 @@ def test_webhook_message_employee_ignored():
 
         headers = {"x-chatbot_auth_token": "Bearer test_token_123"}
 
-        response = await client.post(
-            "/api/webhook/new_message", json=message_data, headers=headers
-        )
+        response = await client.post("/api/webhook/new_message", json=message_data, headers=headers)
 
-        assert response.status_code == 200
+        assert response.status_code == 202
+        assert response.json()["job_id"] is None
 
         dialogue = await Dialogue.find_one({"chat_id": str(channel.id)})
 
-        assert len(dialogue.message_list) == 1
+        assert await Message.find(Message.dialogue_id == dialogue.id).count() == 1
 
     return _test
 
@@ -94,16 +103,11 @@ def test_webhook_message_invalid_token():
 
         headers = {"x-chatbot_auth_token": "Bearer invalid_token"}
 
-        response = await client.post(
-            "/api/webhook/new_message", json=message_data, headers=headers
-        )
+        response = await client.post("/api/webhook/new_message", json=message_data, headers=headers)
         invalid_token = headers["x-chatbot_auth_token"][7:]
 
         assert response.status_code == 401
-        assert (
-            f"ChatBot with chat bot token '{invalid_token}' not found"
-            in response.json()["detail"]
-        )
+        assert f"ChatBot with chat bot token '{invalid_token}' not found" in response.json()["detail"]
 
     return _test
 
@@ -142,9 +146,7 @@ def test_webhook_message_invalid_authorization_format():
 
         headers = {"x-chatbot_auth_token": "InvalidFormat token"}
 
-        response = await client.post(
-            "/api/webhook/new_message", json=message_data, headers=headers
-        )
+        response = await client.post("/api/webhook/new_message", json=message_data, headers=headers)
 
         assert response.status_code == 401
         assert "Invalid authorization header format" in response.json()["detail"]
@@ -161,9 +163,7 @@ def test_webhook_message_duplicate_ignored():
         channel = Channel(
             name="Dup Channel",
             chat_bot_id=kwargs["chat_bot_id"],
-            settings=ChannelSettings(
-                url="https://example.com/webhook", token="channel_token"
-            ),
+            settings=ChannelSettings(url="https://example.com/webhook", token="channel_token"),
             is_active=True,
         )
         await channel.insert()
@@ -177,21 +177,548 @@ def test_webhook_message_duplicate_ignored():
 
         headers = {"x-chatbot_auth_token": "Bearer test_token_123"}
 
-        response1 = await client.post(
-            "/api/webhook/new_message", json=message_data, headers=headers
-        )
+        response1 = await client.post("/api/webhook/new_message", json=message_data, headers=headers)
 
-        assert response1.status_code == 200
+        assert response1.status_code == 202
+        await wait_for_job(client, response1.json()["job_id"])
 
         # Отправляем то же сообщение второй раз
-        response2 = await client.post(
-            "/api/webhook/new_message", json=message_data, headers=headers
-        )
+        response2 = await client.post("/api/webhook/new_message", json=message_data, headers=headers)
 
-        assert response2.status_code == 200
-        # Проверяем, что второе сообщение было проигнорировано
+        assert response2.status_code == 202
+        assert response2.json()["job_id"] is None
+        # Проверяем, что второе сообщение было проигнорировано и не сохранено
         dialogue = await Dialogue.find_one({"chat_id": str(channel.id)})
 
-        assert len(dialogue.message_list) == 3
+        assert await Message.find(Message.dialogue_id == dialogue.id).count() == 2
+
+    return _test
+
+
+@with_database_and_client
+def test_webhook_job_not_found():
+    """Тест получения статуса несуществующей фоновой задачи"""
+
+    async def _test(client: AsyncClient, **kwargs):
+        response = await client.get("/api/webhook/jobs/unknown_job")
+
+        assert response.status_code == 404
+        assert "Job with id: 'unknown_job' not found" in response.json()["detail"]
+
+    return _test
+
+
+@with_database_and_client
+def test_webhook_concurrent_messages_single_chat():
+    """Тест параллельных сообщений в один чат: ни одно сообщение не теряется, диалог один."""
+
+    async def _test(client: AsyncClient, **kwargs):
+        channel = Channel(
+            name="Busy Channel",
+            chat_bot_id=kwargs["chat_bot_id"],
+            settings=ChannelSettings(url="https://example.com/webhook", token="channel_token"),
+            is_active=True,
+        )
+        await channel.insert()
+
+        headers = {"x-chatbot_auth_token": "Bearer test_token_123"}
+        messages_count = 200
+
+        responses = await asyncio.gather(
+            *(
+                client.post(
+                    "/api/webhook/new_message",
+                    json={
+                        "message_id": f"msg_{i}",
+                        "chat_id": str(channel.id),
+                        "text": f"Message {i}",
+                        "message_sender": "employee",
+                    },
+                    headers=headers,
+                )
+                for i in range(messages_count)
+            )
+        )
+
+        assert all(response.status_code == 202 for response in responses)
+
+        dialogues = await Dialogue.find({"chat_id": str(channel.id)}).to_list()
+        assert len(dialogues) == 1
+        assert dialogues[0].last_seq == messages_count
+
+        messages = await Message.find(Message.dialogue_id == dialogues[0].id).to_list()
+        assert len(messages) == messages_count
+        assert sorted(message.seq for message in messages) == list(range(1, messages_count + 1))
+
+    return _test
+
+
+@with_database_and_client
+def test_webhook_duplicate_rejected_by_index():
+    """Тест отсева дубля уникальным индексом, когда кэш недавних сообщений пуст."""
+
+    async def _test(client: AsyncClient, **kwargs):
+        channel = Channel(
+            name="Dup Index Channel",
+            chat_bot_id=kwargs["chat_bot_id"],
+            settings=ChannelSettings(url="https://example.com/webhook", token="channel_token"),
+            is_active=True,
+        )
+        await channel.insert()
+
+        message_data = {
+            "message_id": "msg_456",
+            "chat_id": str(channel.id),
+            "text": "Duplicate message",
+            "message_sender": "employee",
+        }
+        headers = {"x-chatbot_auth_token": "Bearer test_token_123"}
+
+        await client.post("/api/webhook/new_message", json=message_data, headers=headers)
+        seen_messages.clear()
+        response = await client.post("/api/webhook/new_message", json=message_data, headers=headers)
+
+        assert response.status_code == 202
+        assert response.json()["job_id"] is None
+        assert await Message.find(Message.chat_id == str(channel.id)).count() == 1
+
+    return _test
+
+
+@with_database_and_client
+def test_webhook_burst_coalesced_into_single_reply():
+    """Тест объединения серии сообщений клиента в одно окно debounce: один ответ LLM на всю серию."""
+
+    async def _test(client: AsyncClient, **kwargs):
+        channel = Channel(
+            name="Chatty Channel",
+            chat_bot_id=kwargs["chat_bot_id"],
+            settings=ChannelSettings(url="https://example.com/webhook", token="channel_token"),
+            is_active=True,
+        )
+        await channel.insert()
+
+        headers = {"x-chatbot_auth_token": "Bearer test_token_123"}
+        debounce = conversations.debounce
+        conversations.debounce = 0.5
+        try:
+            responses = [
+                await client.post(
+                    "/api/webhook/new_message",
+                    json={
+                        "chat_id": str(channel.id),
+                        "text": f"Message {i}",
+                        "message_sender": "customer",
+                    },
+                    headers=headers,
+                )
+                for i in range(3)
+            ]
+        finally:
+            conversations.debounce = debounce
+
+        job_ids = {response.json()["job_id"] for response in responses}
+        assert len(job_ids) == 1
+
+        job = await wait_for_job(client, job_ids.pop())
+        assert job["status"] == "done"
+
+        messages = await Message.find(Message.chat_id == str(channel.id)).to_list()
+        assert [message.role for message in messages].count("assistant") == 1
+        assert len(messages) == 4
+
+    return _test
+
+
+@with_database_and_client
+def test_webhook_batch_messages():
+    """Тест пакетного приёма: результат по каждому сообщению, один ответ на чат с сообщениями клиента."""
+
+    async def _test(client: AsyncClient, **kwargs):
+        channels = [
+            Channel(
+                name=f"Batch Channel {i}",
+                chat_bot_id=kwargs["chat_bot_id"],
+                settings=ChannelSettings(url="https://example.com/webhook", token=f"channel_token_{i}"),
+                is_active=True,
+            )
+            for i in range(2)
+        ]
+        for channel in channels:
+            await channel.insert()
+        first_id, second_id = (str(channel.id) for channel in channels)
+        missing_id = "507f1f77bcf86cd799439011"
+
+        batch = [
+            {
+                "message_id": "m1",
+                "chat_id": first_id,
+                "text": "Hi",
+                "message_sender": "customer",
+            },
+            {
+                "message_id": "m2",
+                "chat_id": first_id,
+                "text": "Hello?",
+                "message_sender": "customer",
+            },
+            {
+                "message_id": "m1",
+                "chat_id": first_id,
+                "text": "Hi",
+                "message_sender": "customer",
+            },
+            {
+                "message_id": "m3",
+                "chat_id": second_id,
+                "text": "Note",
+                "message_sender": "employee",
+            },
+            {
+                "message_id": "m4",
+                "chat_id": missing_id,
+                "text": "Lost",
+                "message_sender": "customer",
+            },
+        ]
+        headers = {"x-chatbot_auth_token": "Bearer test_token_123"}
+
+        response = await client.post("/api/webhook/new_messages", json=batch, headers=headers)
+
+        assert response.status_code == 202
+        results = response.json()["results"]
+        assert [result["status"] for result in results] == [
+            "accepted",
+            "accepted",
+            "duplicate",
+            "accepted",
+            "error",
+        ]
+        assert results[0]["job_id"] is not None
+        assert results[0]["job_id"] == results[1]["job_id"]
+        assert results[3]["job_id"] is None
+        assert missing_id in results[4]["detail"]
+
+        job = await wait_for_job(client, results[0]["job_id"])
+        assert job["status"] == "done"
+
+        first_messages = await Message.find(Message.chat_id == first_id).sort(Message.seq).to_list()
+        assert [message.message_id for message in first_messages][:2] == ["m1", "m2"]
+        assert [message.role for message in first_messages].count("assistant") == 1
+        assert await Message.find(Message.chat_id == second_id).count() == 1
+
+    return _test
+
+
+@with_database_and_client
+def test_webhook_batch_too_large():
+    """Тест ограничения размера пакета."""
+
+    async def _test(client: AsyncClient, **kwargs):
+        batch = [
+            {
+                "chat_id": "507f1f77bcf86cd799439011",
+                "text": "Hi",
+                "message_sender": "customer",
+            }
+        ] * (settings.webhook.max_batch_size + 1)
+        headers = {"x-chatbot_auth_token": "Bearer test_token_123"}
+
+        response = await client.post("/api/webhook/new_messages", json=batch, headers=headers)
+
+        assert response.status_code == 413
+
+    return _test
+
+
+@with_database_and_client
+def test_webhook_message_stream():
+    """Тест потокового ответа по SSE: фрагменты, затем сохранённое сообщение целиком"""
+
+    async def _test(client: AsyncClient, **kwargs):
+        channel = Channel(
+            name="Widget Channel",
+            chat_bot_id=kwargs["chat_bot_id"],
+            settings=ChannelSettings(url="https://example.com/webhook", token="channel_token"),
+            is_active=True,
+        )
+        await channel.insert()
+
+        response = await client.post(
+            "/api/webhook/new_message/stream",
+            json={
+                "message_id": "msg_stream",
+                "chat_id": str(channel.id),
+                "text": "Hello",
+                "message_sender": "customer",
+            },
+            headers={"x-chatbot_auth_token": "Bearer test_token_123"},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [
+            (block.split("\n")[0].removeprefix("event: "), block.split("\n")[1])
+            for block in response.text.strip().split("\n\n")
+        ]
+        names = [name for name, _ in events]
+        assert names[0] == "job"
+        assert names[-1] == "done"
+        assert "chunk" in names
+
+        chunks = [json.loads(data[6:])["text"] for name, data in events if name == "chunk"]
+        done = json.loads(events[-1][1][6:])
+        assert "".join(chunks) == done["text"]
+
+        messages = await Message.find(Message.chat_id == str(channel.id)).to_list()
+        assert [message.role for message in messages] == ["user", "assistant"]
+        assert messages[1].message_id == done["message_id"]
+
+    return _test
+
+
+def test_webhook_stream_closed_when_job_dropped():
+    """Тест SSE: задача, снятая при остановке очереди, завершает поток ошибкой"""
+
+    async def run() -> list[str]:
+        pipeline = JobPipeline(
+            workers=1,
+            max_queue_size=1,
+            max_finished_jobs=10,
+            shutdown_timeout=0.1,
+            retry_delay=0.05,
+            max_delayed_jobs=10,
+        )
+        await pipeline.start()
+        release = asyncio.Event()
+        pipeline.submit(release.wait)
+        await asyncio.sleep(0)
+        pipeline.submit(release.wait)
+
+        stream = ReplyStream()
+        job = pipeline.submit(stream.push, "never", delay=10)
+        job.add_done_callback(lambda _: stream.close(None))
+        await pipeline.stop()
+
+        async def collect() -> list[str]:
+            return [event async for event in _reply_events(job, stream)]
+
+        # Без закрытия потока SSE-ответ ждал бы фрагментов бесконечно
+        return await asyncio.wait_for(collect(), timeout=1)
+
+    events = asyncio.run(run())
+    assert events[0].startswith("event: job")
+    assert events[-1].startswith("event: error")
+    assert "Job pipeline stopped" in events[-1]
+
+
+@with_database_and_client
+def test_webhook_llm_queue_full():
+    """Тест отказа с 429 и Retry-After, когда очередь бота к LLM переполнена"""
+
+    async def _test(client: AsyncClient, **kwargs):
+        channel = Channel(
+            name="Noisy Channel",
+            chat_bot_id=kwargs["chat_bot_id"],
+            settings=ChannelSettings(url="https://example.com/webhook", token="channel_token"),
+            is_active=True,
+        )
+        await channel.insert()
+
+        max_queue_per_chatbot = llm_scheduler.max_queue_per_chatbot
+        llm_scheduler.max_queue_per_chatbot = 0
+        try:
+            response = await client.post(
+                "/api/webhook/new_message",
+                json={
+                    "message_id": "msg_rejected",
+                    "chat_id": str(channel.id),
+                    "text": "Hello",
+                    "message_sender": "customer",
+                },
+                headers={"x-chatbot_auth_token": "Bearer test_token_123"},
+            )
+        finally:
+            llm_scheduler.max_queue_per_chatbot = max_queue_per_chatbot
+
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        assert await Message.find(Message.chat_id == str(channel.id)).count() == 0
+
+    return _test
+
+
+@with_database_and_client
+def test_webhook_reply_scheduled_when_queue_fills_after_save():
+    """Тест гонки: очередь заполнилась после сохранения сообщения — ответ всё равно приходит"""
+
+    async def _test(client: AsyncClient, **kwargs):
+        channel = Channel(
+            name="Busy Channel",
+            chat_bot_id=kwargs["chat_bot_id"],
+            settings=ChannelSettings(url="https://example.com/webhook", token="channel_token"),
+            is_active=True,
+        )
+        await channel.insert()
+
+        async def noop() -> None:
+            pass
+
+        append_message = DialogueService.__dict__["append_message"]
+
+        async def append_and_fill_queue(*args):
+            dialogue = await append_message.__func__(*args)
+            while not reply_pipeline.is_full():
+                reply_pipeline._queue.put_nowait(Job(func=noop, args=()))
+            return dialogue
+
+        retry_delay = reply_pipeline.retry_delay
+        reply_pipeline.retry_delay = 0.05
+        DialogueService.append_message = staticmethod(append_and_fill_queue)
+        try:
+            message = {
+                "message_id": "msg_race",
+                "chat_id": str(channel.id),
+                "text": "Hello",
+                "message_sender": "customer",
+            }
+            headers = {"x-chatbot_auth_token": "Bearer test_token_123"}
+            response = await client.post("/api/webhook/new_message", json=message, headers=headers)
+            DialogueService.append_message = append_message
+
+            assert response.status_code == 202
+            job = await wait_for_job(client, response.json()["job_id"])
+            assert job["status"] == "done"
+
+            # Повтор того же сообщения — дубликат, задача уже выполнена
+            response = await client.post("/api/webhook/new_message", json=message, headers=headers)
+            assert response.status_code == 202
+            assert response.json()["job_id"] is None
+        finally:
+            DialogueService.append_message = append_message
+            reply_pipeline.retry_delay = retry_delay
+
+        messages = await Message.find(Message.chat_id == str(channel.id)).to_list()
+        assert [message.role for message in messages] == ["user", "assistant"]
+
+    return _test
+
+
+@with_database_and_client
+def test_webhook_rate_limited():
+    """Тест лимита запросов: сверх лимита канала 429 с Retry-After и RateLimit-*"""
+
+    async def _test(client: AsyncClient, **kwargs):
+        chatbot = await ChatBot.get(PydanticObjectId(kwargs["chat_bot_id"]))
+        chatbot.channel_rate_limit = RateLimit(rate=0.1, burst=1)
+        await chatbot.save()
+        LookupCache.clear()
+
+        channel = Channel(
+            name="Limited Channel",
+            chat_bot_id=kwargs["chat_bot_id"],
+            settings=ChannelSettings(url="https://example.com/webhook", token="channel_token"),
+            is_active=True,
+        )
+        await channel.insert()
+
+        headers = {"x-chatbot_auth_token": "Bearer test_token_123"}
+        responses = [
+            await client.post(
+                "/api/webhook/new_message",
+                json={
+                    "message_id": f"msg_{i}",
+                    "chat_id": str(channel.id),
+                    "text": "Hello",
+                    "message_sender": "customer",
+                },
+                headers=headers,
+            )
+            for i in range(2)
+        ]
+
+        assert responses[0].status_code == 202
+        assert "RateLimit-Remaining" in responses[0].headers
+        assert responses[1].status_code == 429
+        assert int(responses[1].headers["Retry-After"]) >= 1
+        assert responses[1].headers["RateLimit-Remaining"] == "0"
+
+        await wait_for_job(client, responses[0].json()["job_id"])
+        assert await Message.find(Message.chat_id == str(channel.id)).count() == 2
+
+    return _test
+
+
+@with_database_and_client
+def test_webhook_rate_limit_refunded():
+    """Тест возврата лимита бота: отказ по каналу, дубликаты и ошибки его не расходуют"""
+
+    async def _test(client: AsyncClient, **kwargs):
+        chatbot = await ChatBot.get(PydanticObjectId(kwargs["chat_bot_id"]))
+        chatbot.rate_limit = RateLimit(rate=0.001, burst=3)
+        chatbot.channel_rate_limit = RateLimit(rate=0.001, burst=1)
+        await chatbot.save()
+        LookupCache.clear()
+
+        channels = []
+        for i in range(4):
+            channel = Channel(
+                name=f"Channel {i}",
+                chat_bot_id=kwargs["chat_bot_id"],
+                settings=ChannelSettings(url="https://example.com/webhook", token=f"channel_token_{i}"),
+                is_active=True,
+            )
+            await channel.insert()
+            channels.append(str(channel.id))
+
+        headers = {"x-chatbot_auth_token": "Bearer test_token_123"}
+
+        async def send(message_id: str, chat_id: str, sender: str = "employee"):
+            return await client.post(
+                "/api/webhook/new_message",
+                json={
+                    "message_id": message_id,
+                    "chat_id": chat_id,
+                    "text": "Hello",
+                    "message_sender": sender,
+                },
+                headers=headers,
+            )
+
+        assert (await send("msg_0", channels[0])).status_code == 202
+
+        # Отказ по лимиту канала возвращает токен бота
+        response = await send("msg_1", channels[0])
+        assert response.status_code == 429
+        assert "channel" in response.json()["detail"]
+
+        # Дубликат внутри пачки возвращает свою долю лимита
+        response = await client.post(
+            "/api/webhook/new_messages",
+            json=[
+                {
+                    "message_id": "msg_2",
+                    "chat_id": channels[1],
+                    "text": "Hello",
+                    "message_sender": "employee",
+                }
+            ]
+            * 2,
+            headers=headers,
+        )
+        assert response.status_code == 202
+        assert [r["status"] for r in response.json()["results"]] == [
+            "accepted",
+            "duplicate",
+        ]
+
+        # Неизвестный канал: запрос упал, токен возвращён
+        assert (await send("msg_3", str(PydanticObjectId()))).status_code == 401
+
+        # У бота осталось ровно одно сообщение из трёх
+        assert (await send("msg_4", channels[2])).status_code == 202
+        response = await send("msg_5", channels[3])
+        assert response.status_code == 429
+        assert "chatbot" in response.json()["detail"]
 
     return _test
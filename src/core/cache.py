@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+
+
+class TTLCache[K, V]:
+    """
+    Ограниченный in-memory LRU кэш с временем жизни записей.
+
+    Не потокобезопасен: рассчитан на использование внутри одного event loop.
+    Счётчики hits/misses/evictions доступны для метрик.
+
+    С weigher кэш дополнительно ограничен суммарным весом записей
+    (например, размером в байтах) — max_weight, 0 — без ограничения.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        weigher: Callable[[V], int] | None = None,
+        max_weight: int = 0,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.weigher = weigher
+        self.max_weight = max_weight
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: K) -> V | None:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            self.pop(key)
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        self.pop(key)
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        if self.weigher:
+            self.weight += self.weigher(value)
+
+        while len(self._data) > self.maxsize or (
+            self.max_weight and self.weight > self.max_weight and len(self._data) > 1
+        ):
+            self.pop(next(iter(self._data)))
+            self.evictions += 1
+
+    def pop(self, key: K) -> V | None:
+        item = self._data.pop(key, None)
+        if item is None:
+            return None
+        if self.weigher:
+            self.weight -= self.weigher(item[1])
+        return item[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.weight = 0
+
+    def stats(self) -> dict[str, int]:
+        stats = {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+        if self.weigher:
+            stats["weight"] = self.weight
+        return stats
@@ -1,11 +1,23 @@
 from core.database.models.channel import Channel
-from core.database.models.chat_bot import ChatBot
-from core.database.models.dialogue import Dialogue, DialogueMessage, MessageRole
+from core.database.models.chat_bot import ChatBot, RateLimit
+from core.database.models.dialogue import (
+    Dialogue,
+    DialogueMessage,
+    Message,
+    MessageRole,
+)
+from core.database.models.outbox import OutboxMessage, OutboxStatus
+from core.database.models.rate_limit import RateLimitBucket
 
 __all__ = [
     "ChatBot",
     "Channel",
     "Dialogue",
     "DialogueMessage",
+    "Message",
     "MessageRole",
+    "OutboxMessage",
+    "OutboxStatus",
+    "RateLimit",
+    "RateLimitBucket",
 ]
@@ -1,5 +1,7 @@
+import pymongo
 from beanie import Document, PydanticObjectId
 from pydantic import BaseModel, HttpUrl
+from pymongo import IndexModel
 
 
 class ChannelSettings(BaseModel):
@@ -12,3 +14,29 @@ class Channel(Document):
     chat_bot_id: PydanticObjectId
     settings: ChannelSettings
     is_active: bool = True
+
+    class Settings:
+        indexes = [
+            IndexModel("settings.token", unique=True),
+            IndexModel(
+                [
+                    ("chat_bot_id", pymongo.ASCENDING),
+                    ("is_active", pymongo.ASCENDING),
+                    ("name", pymongo.ASCENDING),
+                    ("_id", pymongo.ASCENDING),
+                ],
+            ),
+            IndexModel(
+                [
+                    ("chat_bot_id", pymongo.ASCENDING),
+                    ("name", pymongo.ASCENDING),
+                    ("_id", pymongo.ASCENDING),
+                ],
+            ),
+            IndexModel(
+                [
+                    ("name", pymongo.ASCENDING),
+                    ("_id", pymongo.ASCENDING),
+                ],
+            ),
+        ]
@@ -1,6 +1,26 @@
-from beanie import Document
-
-
-class ChatBot(Document):
-    name: str
-    secret_token: str
+from beanie import Document
+from pydantic import BaseModel, Field
+from pymongo import IndexModel
+
+
+class RateLimit(BaseModel):
+    # Запросов в секунду в среднем и допустимый всплеск
+    rate: float = Field(gt=0)
+    burst: int = Field(ge=1)
+
+
+class ChatBot(Document):
+    name: str
+    secret_token: str
+    # Кэшировать ответы LLM на одинаковый контекст диалога
+    response_cache: bool = False
+    # Вес бота в справедливой очереди к LLM
+    llm_weight: float = 1.0
+    # Лимиты запросов бота и каждого его канала, None — из настроек RATE_LIMIT
+    rate_limit: RateLimit | None = None
+    channel_rate_limit: RateLimit | None = None
+
+    class Settings:
+        indexes = [
+            IndexModel("secret_token", unique=True),
+        ]
@@ -1,7 +1,14 @@
+from datetime import UTC, datetime
 from enum import StrEnum, auto
 
+import pymongo
 from beanie import Document, PydanticObjectId
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from pymongo import IndexModel
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC)
 
 
 class MessageRole(StrEnum):
@@ -18,6 +25,55 @@ class DialogueMessage(BaseModel):
 
 
 class Dialogue(Document):
+    """
+    Заголовок диалога. Сами сообщения хранятся в коллекции Message,
+    поэтому размер документа не растёт с длиной переписки.
+    """
+
     chat_bot_id: PydanticObjectId
     chat_id: str
-    message_list: list[DialogueMessage] = []
+    last_seq: int = 0
+    updated_at: datetime = Field(default_factory=_utcnow)
+
+    class Settings:
+        indexes = [
+            IndexModel("chat_id", unique=True),
+        ]
+
+
+class Message(Document):
+    """Сообщение диалога, seq задаёт порядок сообщений внутри диалога"""
+
+    dialogue_id: PydanticObjectId
+    chat_id: str
+    seq: int
+    role: MessageRole
+    text: str
+    message_id: str
+    created_at: datetime = Field(default_factory=_utcnow)
+
+    class Settings:
+        indexes = [
+            IndexModel(
+                [
+                    ("dialogue_id", pymongo.ASCENDING),
+                    ("seq", pymongo.DESCENDING),
+                ],
+                unique=True,
+            ),
+            # Закреплённые SYSTEM-сообщения для контекста LLM
+            IndexModel(
+                [
+                    ("dialogue_id", pymongo.ASCENDING),
+                    ("seq", pymongo.ASCENDING),
+                ],
+                partialFilterExpression={"role": MessageRole.SYSTEM.value},
+            ),
+            IndexModel(
+                [
+                    ("chat_id", pymongo.ASCENDING),
+                    ("message_id", pymongo.ASCENDING),
+                ],
+                unique=True,
+            ),
+        ]
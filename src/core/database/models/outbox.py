@@ -0,0 +1,60 @@
+from datetime import UTC, datetime
+from enum import StrEnum, auto
+
+import pymongo
+from beanie import Document, PydanticObjectId
+from pydantic import Field
+from pymongo import IndexModel
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC)
+
+
+class OutboxStatus(StrEnum):
+    PENDING = auto()
+    IN_PROGRESS = auto()
+    DEAD = auto()
+
+
+class OutboxMessage(Document):
+    """
+    Исходящее сообщение в канал, ожидающее доставки.
+
+    Доставленные сообщения удаляются, недоставленные после max_attempts
+    попыток остаются со статусом DEAD (dead-letter).
+    """
+
+    channel_id: PydanticObjectId
+    payload: dict
+    status: OutboxStatus = OutboxStatus.PENDING
+    attempts: int = 0
+    next_attempt_at: datetime = Field(default_factory=_utcnow)
+    locked_until: datetime | None = None
+    last_error: str | None = None
+    created_at: datetime = Field(default_factory=_utcnow)
+
+    class Settings:
+        indexes = [
+            IndexModel(
+                [
+                    ("channel_id", pymongo.ASCENDING),
+                    ("status", pymongo.ASCENDING),
+                    ("created_at", pymongo.ASCENDING),
+                ],
+            ),
+            IndexModel(
+                [
+                    ("status", pymongo.ASCENDING),
+                    ("next_attempt_at", pymongo.ASCENDING),
+                ],
+            ),
+            # Порядок сообщений в каналах: сортировка в find_due_channels и _claim_head
+            IndexModel(
+                [
+                    ("channel_id", pymongo.ASCENDING),
+                    ("created_at", pymongo.ASCENDING),
+                    ("_id", pymongo.ASCENDING),
+                ],
+            ),
+        ]
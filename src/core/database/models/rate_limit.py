@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from beanie import Document
+from pymongo import IndexModel
+
+
+class RateLimitBucket(Document):
+    """
+    Состояние token bucket для общего между воркерами лимита запросов.
+    Обновляется только атомарным pipeline-update, _id — ключ лимита.
+    """
+
+    id: str
+    tokens: float
+    updated_at: datetime
+    allowed: bool
+    # Простаивающие бакеты удаляются TTL-индексом: к этому времени бакет полон
+    expires_at: datetime
+
+    class Settings:
+        name = "rate_limit_buckets"
+        indexes = [
+            IndexModel("expires_at", expireAfterSeconds=0),
+        ]
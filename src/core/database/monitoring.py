@@ -0,0 +1,61 @@
+import threading
+
+from pymongo import monitoring
+
+from core.metrics import Counter, Histogram, metrics
+from core.tracing import record_span
+
+mongo_command_duration = metrics.register(
+    Histogram(
+        "mongo_command_duration_seconds",
+        "Duration of MongoDB commands",
+        ("command",),
+    )
+)
+mongo_command_failures = metrics.register(
+    Counter(
+        "mongo_command_failures_total",
+        "Number of failed MongoDB commands",
+        ("command",),
+    )
+)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    Время выполнения команд Mongo по имени команды (find, insert, update...).
+
+    Длительность измеряет сам драйвер, слушатель только записывает её.
+    Motor выполняет команды в пуле потоков, поэтому запись под блокировкой.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        with self._lock:
+            mongo_command_duration.observe(event.duration_micros / 1_000_000, event.command_name)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        with self._lock:
+            mongo_command_duration.observe(event.duration_micros / 1_000_000, event.command_name)
+            mongo_command_failures.inc(event.command_name)
+
+
+class MongoCommandTracing(monitoring.CommandListener):
+    """
+    Спаны команд Mongo в трейсе запроса. Motor копирует контекст в поток,
+    выполняющий команду, поэтому текущий трейс виден и здесь
+    """
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        record_span(f"mongo.{event.command_name}", event.duration_micros / 1_000_000)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        record_span(f"mongo.{event.command_name} (failed)", event.duration_micros / 1_000_000)
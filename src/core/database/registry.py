@@ -1,22 +1,100 @@
-from beanie import init_beanie
+from collections.abc import Iterable
+from typing import Any
+
+from beanie import Document, init_beanie
 from loguru import logger
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 
 from core import settings
-from core.database.models import Channel, ChatBot, Dialogue
+from core.database.models import (
+    Channel,
+    ChatBot,
+    Dialogue,
+    Message,
+    OutboxMessage,
+    RateLimitBucket,
+)
+from core.database.monitoring import MongoCommandMetrics, MongoCommandTracing
+
+DOCUMENT_MODELS: list[type[Document]] = [
+    ChatBot,
+    Channel,
+    Dialogue,
+    Message,
+    OutboxMessage,
+    RateLimitBucket,
+]
 
 
-async def initialize_database() -> None:
+async def initialize_database(create_indexes: bool = True) -> None:
     logger.info("Initialising DB...")
 
+    event_listeners: list[monitoring.CommandListener] = []
+    if settings.metrics.enabled:
+        event_listeners.append(MongoCommandMetrics())
+    if settings.tracing.enabled:
+        event_listeners.append(MongoCommandTracing())
+    client = AsyncIOMotorClient(settings.mongo.url, event_listeners=event_listeners)
+
     await init_beanie(
-        database=AsyncIOMotorClient(settings.mongo.url).get_database(
-            settings.mongo.db_name
-        ),
-        document_models=[
-            ChatBot,
-            Channel,
-            Dialogue,
-        ],
+        database=client.get_database(settings.mongo.db_name),
+        document_models=DOCUMENT_MODELS,
+        skip_indexes=not create_indexes,
     )
+    if settings.mongo.report_indexes:
+        await report_indexes()
     logger.success("DB is ready!")
+
+
+async def collect_index_report() -> dict[str, dict[str, list[str]]]:
+    """
+    Сравнивает объявленные в моделях индексы с индексами в БД.
+
+    - missing: объявлены в модели, но отсутствуют в коллекции
+    - undeclared: есть в коллекции, но не объявлены в модели
+    - unused: есть в коллекции, но не использовались с момента старта mongod
+    """
+
+    report: dict[str, dict[str, list[str]]] = {}
+
+    for model in DOCUMENT_MODELS:
+        collection = model.get_pymongo_collection()
+        declared = {_key_signature(index.index.document["key"].items()) for index in model.get_settings().indexes or []}
+        existing = {
+            name: _key_signature(info["key"])
+            for name, info in (await collection.index_information()).items()
+            if name != "_id_"
+        }
+
+        try:
+            index_stats = await collection.aggregate([{"$indexStats": {}}]).to_list()
+            unused = sorted(
+                stat["name"] for stat in index_stats if stat["name"] != "_id_" and not stat["accesses"]["ops"]
+            )
+        except Exception as e:
+            # $indexStats может быть запрещён правами пользователя БД
+            logger.debug(f"Index usage stats are unavailable for {model.__name__}: {e}")
+            unused = []
+
+        report[collection.name] = {
+            "missing": sorted(declared - set(existing.values())),
+            "undeclared": sorted(name for name, key in existing.items() if key not in declared),
+            "unused": unused,
+        }
+
+    return report
+
+
+async def report_indexes() -> None:
+    for collection, problems in (await collect_index_report()).items():
+        if problems["missing"]:
+            logger.warning(f"Missing indexes in '{collection}': {problems['missing']}")
+        if problems["undeclared"]:
+            logger.warning(f"Undeclared indexes in '{collection}': {problems['undeclared']}")
+        if problems["unused"]:
+            logger.info(f"Unused indexes in '{collection}': {problems['unused']}")
+
+
+def _key_signature(key: Iterable[tuple[str, Any]]) -> str:
+    return ",".join(f"{field}:{direction}" for field, direction in key)
@@ -1,7 +1,12 @@
+import json
 import sys
+import traceback
+from collections.abc import Callable
+from typing import TextIO
 
 from loguru import logger
 
+from core import settings
 from core.logs.handlers import UvicornHandler
 
 __all__ = ["UvicornHandler", "configure_logger", "get_uvicorn_log_config"]
@@ -18,13 +23,15 @@ def configure_logger() -> None:
             return log_format_request
         return log_format_all
 
+    text_format = settings.logging.format == "text"
     logger.remove()
     logger.add(
-        sys.stdout,
-        colorize=True,
-        format=log_format,
-        diagnose=True,
+        sys.stdout if text_format else _json_sink(sys.stdout),
+        colorize=text_format,
+        format=log_format if text_format else "{message}",
+        diagnose=settings.logging.diagnose,
         backtrace=False,
+        enqueue=settings.logging.enqueue,
     )
     logger.level("DEBUG", color="<fg #7f7f7f>")
     logger.level("INFO", color="<white>")
@@ -35,6 +42,38 @@ def configure_logger() -> None:
     logger.level("REQUEST", no=38, color="<magenta>")
 
 
+def _json_sink(stream: TextIO) -> Callable[["Message"], None]:  # type: ignore  # noqa: F821
+    """
+    Sink, пишущий запись одной строкой JSON. Строка собирается из record
+    напрямую: шаблон формата разобрал бы фигурные скобки и теги в сообщении,
+    а сам record общий для всех sink'ов и не изменяется
+    """
+
+    def sink(message: "Message") -> None:  # type: ignore  # noqa: F821
+        stream.write(_json_line(message.record) + "\n")
+        stream.flush()
+
+    return sink
+
+
+def _json_line(record: "Record") -> str:  # type: ignore  # noqa: F821
+    data = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+    }
+    if record["extra"]:
+        data["extra"] = record["extra"]
+    if record["exception"] is not None:
+        # Трейсбек внутри JSON, чтобы запись оставалась одной строкой
+        data["exception"] = "".join(traceback.format_exception(*record["exception"]))
+
+    return json.dumps(data, default=str, ensure_ascii=False)
+
+
 def get_uvicorn_log_config() -> dict:
     return {
         "version": 1,
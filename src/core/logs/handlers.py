@@ -1,25 +1,56 @@
 import inspect
 import logging
+import random
 
 from loguru import logger
 
+from core import settings
+
+# Frames between the caller of logger.info(...) and Handler.emit:
+# Handler.handle, Logger.callHandlers, Logger.handle, Logger._log, Logger.info.
+# Logger.exception adds a Logger.error frame, so records with exc_info
+# still walk the frames
+STDLIB_CALL_DEPTH = 6
+SERVER_ERROR = 500
+
 
 class UvicornHandler(logging.Handler):
-    def emit(self, record: logging.LogRecord) -> None:
-        # Get corresponding Loguru level if it exists.
-        level: str | int
-        try:
-            level = logger.level(record.levelname).name
-        except ValueError:
-            level = record.levelno
-
-        # Find caller from where originated the logged message.
-        frame, depth = inspect.currentframe(), 0
-        while frame and (depth == 0 or frame.f_code.co_filename == logging.__file__):
-            frame = frame.f_back
-            depth += 1
+    def __init__(self, level: int = logging.NOTSET) -> None:
+        super().__init__(level)
+        self.fast_path = settings.logging.fast_path
+        self.access_log_sample_rate = settings.logging.access_log_sample_rate
 
+    def emit(self, record: logging.LogRecord) -> None:
         if record.name == "uvicorn.access":
-            level = "INFO"
+            # Drop sampled-out access lines before doing any work
+            if (
+                self.access_log_sample_rate < 1
+                and random.random() >= self.access_log_sample_rate
+                and not _is_server_error(record)
+            ):
+                return
+            level: str | int = "INFO"
+        else:
+            # Get corresponding Loguru level if it exists.
+            try:
+                level = logger.level(record.levelname).name
+            except ValueError:
+                level = record.levelno
+
+        if self.fast_path and not record.exc_info:
+            # Assume a direct logger.info(...)-style call instead of walking frames
+            depth = STDLIB_CALL_DEPTH
+        else:
+            # Find caller from where originated the logged message.
+            frame, depth = inspect.currentframe(), 0
+            while frame and (depth == 0 or frame.f_code.co_filename == logging.__file__):
+                frame = frame.f_back
+                depth += 1
 
         logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
+
+
+def _is_server_error(record: logging.LogRecord) -> bool:
+    # uvicorn access record args: (client_addr, method, path, http_version, status)
+    args = record.args
+    return isinstance(args, tuple) and len(args) == 5 and isinstance(args[4], int) and args[4] >= SERVER_ERROR
@@ -0,0 +1,50 @@
+import sys
+import threading
+from collections import Counter
+from types import FrameType
+
+
+class SamplingProfiler:
+    """
+    Семплирующий профайлер потока event loop.
+
+    Фоновый поток раз в interval секунд снимает стек целевого потока и
+    считает одинаковые стеки. Результат — стеки в свёрнутом формате
+    ("корень;...;лист" -> число семплов), его понимают flamegraph.pl
+    и speedscope. Стек снимается со всего event loop, поэтому в профиль
+    попадают и другие корутины, работавшие в это время, а ожидание I/O
+    видно как время в select.
+    """
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> dict[str, int]:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        return dict(self.samples)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[_fold(frame)] += 1
+
+
+def _fold(frame: FrameType | None) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_qualname} ({code.co_filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    stack.reverse()
+    return ";".join(stack)
@@ -0,0 +1,22 @@
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    # orjson — опциональная зависимость (poetry install -E orjson)
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """
+    JSON в байтах: через orjson, если он установлен, иначе стандартным json.
+
+    Ключи-не-строки (int, float, bool, None) в обоих случаях приводятся к
+    строкам, как в json. Отличие одно: NaN и Infinity orjson пишет как null,
+    а json рейзит ValueError (как стандартный JSONResponse)
+    """
+
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
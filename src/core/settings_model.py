@@ -1,28 +1,195 @@
-from typing import Annotated
-
-from pydantic import BaseModel, MongoDsn
-from pydantic_settings import BaseSettings, SettingsConfigDict
-
-
-class MongoSettings(BaseModel):
-    url: Annotated[str, MongoDsn] = "mongodb://localhost:27017"
-    db_name: str = "chatbot_test"
-
-
-class ServerSettings(BaseModel):
-    workers: int = 1
-
-
-class Settings(BaseSettings):
-    model_config = SettingsConfigDict(
-        extra="ignore",
-        env_file_encoding="utf-8",
-        env_file=".env",
-        env_nested_delimiter="__",
-    )
-
-    mongo: MongoSettings = MongoSettings()
-    server: ServerSettings = ServerSettings()
-
-
-settings = Settings()
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field, MongoDsn
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class MongoSettings(BaseModel):
+    url: Annotated[str, MongoDsn] = "mongodb://localhost:27017"
+    db_name: str = "chatbot_test"
+    report_indexes: bool = True
+
+
+class ServerSettings(BaseModel):
+    # development — один процесс с автоперезагрузкой, production — workers
+    # процессов без перезагрузки
+    mode: Literal["development", "production"] = "development"
+    host: str = "0.0.0.0"
+    port: int = 8000
+    # Только в production, 0 — по числу доступных процессору ядер
+    workers: int = 1
+    # auto — uvloop и httptools, если установлены (poetry install -E server)
+    loop: Literal["auto", "asyncio", "uvloop"] = "auto"
+    http: Literal["auto", "h11", "httptools"] = "auto"
+    backlog: int = 2048
+    keep_alive_timeout: int = 5
+    # Сверх лимита одновременных соединений отвечать 503, 0 — без ограничения
+    limit_concurrency: int = 0
+    # Перезапускать воркер после стольких запросов, 0 — не перезапускать
+    limit_max_requests: int = 0
+    # Сколько ждать завершения запросов при остановке, 0 — без ограничения
+    graceful_shutdown_timeout: int = 30
+
+
+class LoggingSettings(BaseModel):
+    # text — цветной текст для разработки, json — одна JSON-строка на запись
+    format: Literal["text", "json"] = "text"
+    # Писать в stdout из отдельного потока, не блокируя event loop
+    enqueue: bool = False
+    # Значения переменных в трейсбеках: удобно при отладке, дорого и небезопасно
+    diagnose: bool = True
+    # Не искать в стеке место вызова для записей стандартного logging (uvicorn)
+    fast_path: bool = False
+    # Доля записываемых access-логов uvicorn, ответы 5xx пишутся всегда
+    access_log_sample_rate: float = 1.0
+
+
+class PipelineSettings(BaseModel):
+    # Воркеры в основном ждут LLM, число одновременных вызовов модели
+    # ограничивает LLMSettings.max_concurrency
+    workers: int = 64
+    max_queue_size: int = 1000
+    max_finished_jobs: int = 10_000
+    shutdown_timeout: float = 10.0
+    # Через сколько секунд повторить постановку задачи в переполненную очередь
+    retry_delay: float = 1.0
+    # Сколько задач может ждать повторной постановки или debounce
+    max_delayed_jobs: int = 1000
+
+
+class HttpClientSettings(BaseModel):
+    max_connections: int = 100
+    max_connections_per_host: int = 20
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+    connect_timeout: float = 5.0
+    read_timeout: float = 10.0
+    write_timeout: float = 10.0
+    pool_timeout: float = 5.0
+
+
+class OutboxSettings(BaseModel):
+    concurrency: int = 16
+    max_attempts: int = 8
+    base_backoff: float = 1.0
+    max_backoff: float = 300.0
+    poll_interval: float = 1.0
+    lease_timeout: float = 60.0
+    batch_size: int = 100
+
+
+class DialogueSettings(BaseModel):
+    history_limit: int = 100
+    # Бюджет контекста LLM в символах, 0 — без ограничения
+    context_max_chars: int = 0
+    context_max_system_messages: int = 10
+    history_max_page_size: int = 1000
+    history_stream_batch_size: int = 1000
+
+
+class DedupSettings(BaseModel):
+    cache_size: int = 100_000
+    cache_ttl: float = 600.0
+
+
+class LookupCacheSettings(BaseModel):
+    chatbot_size: int = 10_000
+    channel_size: int = 100_000
+    ttl: float = 60.0
+
+
+class ConversationSettings(BaseModel):
+    debounce: float = 0.0
+
+
+class ResponseCacheSettings(BaseModel):
+    size: int = 10_000
+    max_bytes: int = 64 * 1024 * 1024
+    ttl: float = 3600
+
+
+class LLMSettings(BaseModel):
+    max_concurrency: int = 4
+    max_queue_size: int = 48
+    max_queue_per_chatbot: int = 16
+    # Длительность ответа mock LLM, сек (для нагрузочных тестов — около 0)
+    mock_min_delay: float = 1.0
+    mock_max_delay: float = 5.0
+
+
+class RateLimitSettings(BaseModel):
+    enabled: bool = True
+    # memory — отдельный лимит в каждом воркере, mongo — общий для всех воркеров
+    backend: Literal["memory", "mongo"] = "memory"
+    chatbot_rate: float = Field(default=100, gt=0)
+    chatbot_burst: int = Field(default=500, ge=1)
+    channel_rate: float = Field(default=20, gt=0)
+    channel_burst: int = Field(default=200, ge=1)
+    max_keys: int = 100_000
+    # Через сколько секунд простоя состояние бакета можно забыть
+    idle_ttl: float = 3600
+
+
+class MetricsSettings(BaseModel):
+    # Запись метрик HTTP, этапов webhook и команд Mongo для /metrics
+    enabled: bool = True
+
+
+class TracingSettings(BaseModel):
+    enabled: bool = True
+    # Доля запросов, трейс которых сохраняется; медленные сохраняются всегда
+    sample_rate: float = 0.0
+    slow_threshold: float = 1.0
+    # Доля запросов, которые дополнительно профилируются
+    profile_sample_rate: float = 0.0
+    # Чаще семплировать бессмысленно: поток профайлера ждёт GIL
+    # (sys.getswitchinterval, 5 мс)
+    profile_interval: float = 0.005
+    # Запрос с заголовком X-Debug-Trace: <debug_token> всегда трейсится
+    # и профилируется, пустой токен отключает заголовок
+    debug_token: str = ""
+    max_traces: int = 100
+    # Каталог для профилей на диске, пустой — только в памяти
+    profile_dir: str = ""
+
+
+class ChannelsSettings(BaseModel):
+    # Размер страницы, если передан только cursor
+    default_page_size: int = 100
+    max_page_size: int = 1000
+    max_bulk_size: int = 10_000
+
+
+class WebhookSettings(BaseModel):
+    max_batch_size: int = 1000
+
+
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(
+        extra="ignore",
+        env_file_encoding="utf-8",
+        env_file=".env",
+        env_nested_delimiter="__",
+    )
+
+    mongo: MongoSettings = MongoSettings()
+    server: ServerSettings = ServerSettings()
+    logging: LoggingSettings = LoggingSettings()
+    pipeline: PipelineSettings = PipelineSettings()
+    http_client: HttpClientSettings = HttpClientSettings()
+    outbox: OutboxSettings = OutboxSettings()
+    dialogue: DialogueSettings = DialogueSettings()
+    dedup: DedupSettings = DedupSettings()
+    lookup_cache: LookupCacheSettings = LookupCacheSettings()
+    conversation: ConversationSettings = ConversationSettings()
+    webhook: WebhookSettings = WebhookSettings()
+    channels: ChannelsSettings = ChannelsSettings()
+    response_cache: ResponseCacheSettings = ResponseCacheSettings()
+    llm: LLMSettings = LLMSettings()
+    rate_limit: RateLimitSettings = RateLimitSettings()
+    metrics: MetricsSettings = MetricsSettings()
+    tracing: TracingSettings = TracingSettings()
+
+
+settings = Settings()
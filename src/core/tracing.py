@@ -0,0 +1,213 @@
+import asyncio
+import inspect
+import json
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from functools import wraps
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from core import settings
+from core.profiling import SamplingProfiler
+from core.settings_model import TracingSettings
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    # Секунды от начала трейса
+    start: float
+    duration: float
+    depth: int
+
+
+@dataclass(slots=True)
+class Trace:
+    name: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    started_at: datetime = field(default_factory=lambda: datetime.now(UTC))
+    origin: float = field(default_factory=time.perf_counter)
+    duration: float = 0.0
+    spans: list[Span] = field(default_factory=list)
+    profile: dict[str, int] | None = None
+    # Выбран для сохранения заранее (sample_rate или force)
+    sampled: bool = False
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 3),
+            "spans": len(self.spans),
+            "profiled": self.profile is not None,
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            **self.summary(),
+            "spans": [
+                {
+                    "name": span.name,
+                    "start_ms": round(span.start * 1000, 3),
+                    "duration_ms": round(span.duration * 1000, 3),
+                    "depth": span.depth,
+                }
+                for span in sorted(self.spans, key=lambda span: span.start)
+            ],
+            "profile_samples": sum(self.profile.values()) if self.profile else 0,
+        }
+
+    def folded_profile(self) -> str:
+        if not self.profile:
+            return ""
+        return "".join(f"{stack} {count}\n" for stack, count in self.profile.items())
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+_span_depth: ContextVar[int] = ContextVar("span_depth", default=0)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Записать участок кода в текущий трейс; вне трейса ничего не делает"""
+
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    depth = _span_depth.get()
+    token = _span_depth.set(depth + 1)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _span_depth.reset(token)
+        finished = time.perf_counter()
+        trace.spans.append(Span(name, started - trace.origin, finished - started, depth))
+
+
+def record_span(name: str, duration: float) -> None:
+    """
+    Добавить в текущий трейс уже завершившийся участок длительностью duration.
+    Для событий, время которых измерил кто-то другой (драйвер Mongo)
+    """
+
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    finished = time.perf_counter()
+    trace.spans.append(Span(name, finished - duration - trace.origin, duration, _span_depth.get()))
+
+
+def traced[**P, R](
+    name: str,
+) -> Callable[[Callable[P, Awaitable[R]]], Callable[P, Awaitable[R]]]:
+    def decorator(func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+        @wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if _current_trace.get() is None:
+                return await func(*args, **kwargs)
+            with span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_service[T: type](cls: T) -> T:
+    """Обернуть в span все асинхронные static-методы сервиса"""
+
+    for attr, value in list(vars(cls).items()):
+        if isinstance(value, staticmethod) and inspect.iscoroutinefunction(value.__func__):
+            traced_method = traced(f"{cls.__name__}.{attr}")(value.__func__)
+            setattr(cls, attr, staticmethod(traced_method))
+    return cls
+
+
+class Tracer:
+    """
+    Трейсы запросов и фоновых задач.
+
+    Спаны пишутся для каждого трейса, а сохраняются только выбранные
+    (sample_rate или force) и медленные (дольше slow_threshold) — последние
+    max_traces. Часть трейсов (profile_sample_rate или force) дополнительно
+    профилируется семплирующим профайлером; одновременно профилируется
+    не больше одного трейса.
+    """
+
+    def __init__(self, config: TracingSettings) -> None:
+        self.config = config
+        self._traces: OrderedDict[str, Trace] = OrderedDict()
+        self._profiling = False
+
+    @contextmanager
+    def trace(self, name: str, force: bool = False) -> Iterator[Trace | None]:
+        if not self.config.enabled:
+            yield None
+            return
+
+        sampled = force or random.random() < self.config.sample_rate
+        profiler = None
+        if not self._profiling and (force or random.random() < self.config.profile_sample_rate):
+            self._profiling = True
+            profiler = SamplingProfiler(threading.get_ident(), self.config.profile_interval)
+            profiler.start()
+
+        trace = Trace(name, sampled=sampled)
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+            trace.duration = time.perf_counter() - trace.origin
+            if profiler is not None:
+                trace.profile = profiler.stop()
+                self._profiling = False
+            if trace.sampled or trace.duration >= self.config.slow_threshold:
+                self._store(trace)
+
+    def get(self, trace_id: str) -> Trace | None:
+        return self._traces.get(trace_id)
+
+    def recent(self) -> list[Trace]:
+        return list(reversed(self._traces.values()))
+
+    def clear(self) -> None:
+        self._traces.clear()
+
+    def _store(self, trace: Trace) -> None:
+        self._traces[trace.id] = trace
+        while len(self._traces) > self.config.max_traces:
+            self._traces.popitem(last=False)
+
+        if trace.profile is not None and self.config.profile_dir:
+            try:
+                # Запись на диск не должна блокировать event loop
+                asyncio.get_running_loop().run_in_executor(None, self._dump, trace)
+            except RuntimeError:
+                self._dump(trace)
+
+    def _dump(self, trace: Trace) -> None:
+        directory = Path(self.config.profile_dir)
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            (directory / f"{trace.id}.json").write_text(json.dumps(trace.to_dict()))
+            (directory / f"{trace.id}.folded").write_text(trace.folded_profile())
+        except OSError as e:
+            logger.error(f"Failed to write profile of trace '{trace.id}': {e}")
+
+
+tracer = Tracer(settings.tracing)
@@ -1,23 +1,75 @@
+import os
+from importlib.util import find_spec
+
 import uvicorn
 from loguru import logger
 
 from core.logs import configure_logger, get_uvicorn_log_config
-from core.settings_model import settings
-
+from core.settings_model import ServerSettings, settings
 
-def main() -> None:
-    configure_logger()
-    logger.info("Starting app...")
 
+def run_development(config: ServerSettings) -> None:
     uvicorn.run(
         "app.app:app",
         log_config=get_uvicorn_log_config(),
-        port=8000,
-        host="0.0.0.0",
-        workers=settings.server.workers,
+        port=config.port,
+        host=config.host,
         reload=True,
+        # При нулевой доле access-логи не формируются вовсе
+        access_log=settings.logging.access_log_sample_rate > 0,
+    )
+
+
+def run_production(config: ServerSettings) -> None:
+    workers = config.workers or os.process_cpu_count() or 1
+    for option, package, fallback in (
+        ("loop", "uvloop", "asyncio"),
+        ("http", "httptools", "h11"),
+    ):
+        if getattr(config, option) == "auto" and find_spec(package) is None:
+            logger.warning(f"{package} is not installed, falling back to {fallback}")
+    limit_max_requests = config.limit_max_requests or None
+    if limit_max_requests and workers == 1:
+        # Единственный процесс некому перезапустить, сервер бы просто остановился
+        logger.warning("SERVER__LIMIT_MAX_REQUESTS requires more than one worker")
+        limit_max_requests = None
+    logger.info(f"Running {workers} worker processes")
+    if workers > 1:
+        # Очереди и планировщики живут в памяти процесса: общие только
+        # лимиты частоты запросов при RATE_LIMIT__BACKEND=mongo
+        logger.warning(
+            "Per-chat reply ordering and coalescing, LLM__MAX_CONCURRENCY, "
+            "LLM__MAX_QUEUE_SIZE, LLM__MAX_QUEUE_PER_CHATBOT and "
+            "PIPELINE__MAX_QUEUE_SIZE apply per worker"
+            + (", as do rate limits with RATE_LIMIT__BACKEND=memory" if settings.rate_limit.backend == "memory" else "")
+        )
+
+    uvicorn.run(
+        "app.app:app",
+        log_config=get_uvicorn_log_config(),
+        port=config.port,
+        host=config.host,
+        workers=workers,
+        loop=config.loop,
+        http=config.http,
+        backlog=config.backlog,
+        timeout_keep_alive=config.keep_alive_timeout,
+        limit_concurrency=config.limit_concurrency or None,
+        limit_max_requests=limit_max_requests,
+        timeout_graceful_shutdown=config.graceful_shutdown_timeout or None,
+        access_log=settings.logging.access_log_sample_rate > 0,
     )
 
 
+def main() -> None:
+    configure_logger()
+    logger.info(f"Starting app in {settings.server.mode} mode...")
+
+    if settings.server.mode == "production":
+        run_production(settings.server)
+    else:
+        run_development(settings.server)
+
+
 if __name__ == "__main__":
     main()
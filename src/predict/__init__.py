@@ -0,0 +1,16 @@
+from predict.context import build_context, select_context
+from predict.mock_llm_call import mock_llm_call, mock_llm_stream
+from predict.response_cache import ResponseCache, response_cache
+from predict.scheduler import LLMQueueFull, LLMScheduler, llm_scheduler
+
+__all__ = [
+    "LLMQueueFull",
+    "LLMScheduler",
+    "ResponseCache",
+    "build_context",
+    "llm_scheduler",
+    "mock_llm_call",
+    "mock_llm_stream",
+    "response_cache",
+    "select_context",
+]
@@ -0,0 +1,72 @@
+from beanie import PydanticObjectId
+
+from core.database.models import DialogueMessage, Message, MessageRole
+from core.tracing import traced
+
+
+@traced("build_context")
+async def build_context(
+    dialogue_id: PydanticObjectId,
+    max_messages: int,
+    max_chars: int = 0,
+    max_system_messages: int = 10,
+) -> list[DialogueMessage]:
+    """
+    Контекст диалога для вызова LLM.
+
+    Из базы читаются только нужные срезы: первые max_system_messages
+    SYSTEM-сообщений (закреплены и всегда попадают в контекст) и последние
+    max_messages остальных сообщений. max_chars ограничивает суммарную длину
+    текста, 0 — без ограничения.
+    """
+
+    system_messages = (
+        await Message.find(
+            Message.dialogue_id == dialogue_id,
+            Message.role == MessageRole.SYSTEM,
+        )
+        .sort(+Message.seq)
+        .limit(max_system_messages)
+        .project(DialogueMessage)
+        .to_list()
+    )
+    recent_messages = (
+        await Message.find(
+            Message.dialogue_id == dialogue_id,
+            Message.role != MessageRole.SYSTEM,
+        )
+        .sort(-Message.seq)
+        .limit(max_messages)
+        .project(DialogueMessage)
+        .to_list()
+    )
+    recent_messages.reverse()
+
+    return select_context(system_messages, recent_messages, max_chars)
+
+
+def select_context(
+    system_messages: list[DialogueMessage],
+    recent_messages: list[DialogueMessage],
+    max_chars: int = 0,
+) -> list[DialogueMessage]:
+    """
+    Собрать контекст из закреплённых и последних сообщений в бюджете max_chars.
+
+    Последние сообщения добавляются от новых к старым, пока помещаются
+    в бюджет; самое новое сообщение попадает в контекст всегда.
+    """
+
+    if not max_chars:
+        return system_messages + recent_messages
+
+    budget = max_chars - sum(len(message.text) for message in system_messages)
+    selected: list[DialogueMessage] = []
+    for message in reversed(recent_messages):
+        if selected and len(message.text) > budget:
+            break
+        selected.append(message)
+        budget -= len(message.text)
+    selected.reverse()
+
+    return system_messages + selected
@@ -1,9 +1,27 @@
 from asyncio import sleep
-from random import randint
+from collections.abc import AsyncIterator
+from random import uniform
 
+from core import settings
 from core.database.models import DialogueMessage
 
+MOCK_RESPONSE = "New message from llm"
+
+
+async def mock_llm_stream(chat_history: list[DialogueMessage]) -> AsyncIterator[str]:
+    """
+    Потоковый ответ: фрагменты отдаются по мере генерации, всего за
+    LLM__MOCK_MIN_DELAY - LLM__MOCK_MAX_DELAY сек (по умолчанию 1-5)
+    """
+
+    chunks = [f"{word} " for word in MOCK_RESPONSE.split()]
+    chunks[-1] = chunks[-1].rstrip()
+    delay = uniform(settings.llm.mock_min_delay, settings.llm.mock_max_delay)
+    delay /= len(chunks)
+    for chunk in chunks:
+        await sleep(delay)
+        yield chunk
+
 
 async def mock_llm_call(chat_history: list[DialogueMessage]) -> str:
-    await sleep(randint(1, 5))
-    return "New message from llm"
+    return "".join([chunk async for chunk in mock_llm_stream(chat_history)])
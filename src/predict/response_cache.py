@@ -0,0 +1,104 @@
+import asyncio
+import hashlib
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from core import settings
+from core.cache import TTLCache
+from core.database.models import DialogueMessage
+
+
+@dataclass(slots=True, frozen=True)
+class CachedResponse:
+    text: str
+    # Сколько секунд заняла генерация, столько экономит каждое попадание
+    latency: float
+
+
+def _response_size(response: CachedResponse) -> int:
+    return len(response.text.encode())
+
+
+class ResponseCache:
+    """
+    LRU+TTL кэш ответов LLM по (chat_bot_id, хэш нормализованного контекста).
+
+    Размер ограничен и числом записей, и суммарным объёмом текста ответов.
+    Одновременные запросы с одинаковым ключом объединяются (single-flight):
+    модель вызывается один раз, остальные ждут её ответа.
+    """
+
+    def __init__(self, maxsize: int, max_bytes: int, ttl: float) -> None:
+        self._cache: TTLCache[tuple[str, str], CachedResponse] = TTLCache(
+            maxsize=maxsize, ttl=ttl, weigher=_response_size, max_weight=max_bytes
+        )
+        self._in_flight: dict[tuple[str, str], asyncio.Future[str]] = {}
+        self.coalesced = 0
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def make_key(chat_bot_id: str, context: list[DialogueMessage]) -> tuple[str, str]:
+        """Ключ не зависит от message_id, регистра и лишних пробелов"""
+
+        digest = hashlib.sha256()
+        for message in context:
+            text = " ".join(message.text.lower().split())
+            digest.update(f"{message.role}\x1f{text}\x1e".encode())
+        return chat_bot_id, digest.hexdigest()
+
+    async def get_or_generate(
+        self,
+        chat_bot_id: str,
+        context: list[DialogueMessage],
+        generate: Callable[[], Awaitable[str]],
+    ) -> str:
+        key = self.make_key(chat_bot_id, context)
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.saved_seconds += cached.latency
+            return cached.text
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(in_flight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        started = time.monotonic()
+        try:
+            text = await generate()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Ожидающих может не быть, помечаем исключение как полученное
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+        self._cache.set(key, CachedResponse(text, time.monotonic() - started))
+        future.set_result(text)
+        return text
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            **self._cache.stats(),
+            "in_flight": len(self._in_flight),
+            "coalesced": self.coalesced,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
+
+
+response_cache = ResponseCache(
+    maxsize=settings.response_cache.size,
+    max_bytes=settings.response_cache.max_bytes,
+    ttl=settings.response_cache.ttl,
+)
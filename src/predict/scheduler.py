@@ -0,0 +1,213 @@
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from core import settings
+
+
+class LLMQueueFull(asyncio.QueueFull):
+    """Очередь к LLM переполнена: общая или очередь конкретного чат-бота"""
+
+    def __init__(self, message: str, retry_after: int, per_chatbot: bool) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.per_chatbot = per_chatbot
+
+
+@dataclass(slots=True)
+class _ChatBotQueue:
+    waiters: deque[asyncio.Future[None]] = field(default_factory=deque)
+    weight: float = 1.0
+    # Виртуальное время WFQ: растёт на 1 / weight за каждый вызов модели
+    vtime: float = 0.0
+    running: int = 0
+
+
+@dataclass(slots=True)
+class _ChatBotTotals:
+    """Накопительные счётчики бота, переживают удаление его очереди"""
+
+    weight: float = 1.0
+    served: int = 0
+    rejected: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+
+class LLMScheduler:
+    """
+    Планировщик вызовов LLM.
+
+    Одновременно выполняется не больше max_concurrency вызовов. Остальные
+    ждут в очередях по chat_bot_id, и освободившийся слот получает бот
+    с наименьшим виртуальным временем (weighted fair queuing): бот с весом 2
+    получает вдвое больше вызовов, чем бот с весом 1, и шумный бот не может
+    занять модель целиком.
+
+    Длина очередей ограничивается при приёме сообщения (check_capacity),
+    уже принятые задачи дожидаются своего слота. Очередь бота удаляется,
+    как только у него нет ни ожидающих, ни выполняющихся вызовов, а
+    накопительные счётчики для статистики и /metrics хранятся отдельно.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue_size: int, max_queue_per_chatbot: int) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.max_queue_per_chatbot = max_queue_per_chatbot
+
+        self._queues: dict[str, _ChatBotQueue] = {}
+        self._totals: dict[str, _ChatBotTotals] = {}
+        self._running = 0
+        self._waiting = 0
+        self._vtime = 0.0
+        self._served = 0
+        self._rejected = 0
+        # Скользящее среднее длительности вызова, для оценки Retry-After
+        self._latency = 1.0
+
+    def check_capacity(self, chat_bot_id: str) -> None:
+        """Рейзит LLMQueueFull, если новый запрос бота придётся отклонить"""
+
+        queue = self._queues.get(chat_bot_id)
+        depth = len(queue.waiters) if queue is not None else 0
+        if depth >= self.max_queue_per_chatbot:
+            self._reject(chat_bot_id)
+            raise LLMQueueFull(
+                f"LLM queue for chatbot '{chat_bot_id}' is full",
+                retry_after=self.retry_after(depth),
+                per_chatbot=True,
+            )
+        if self._waiting >= self.max_queue_size:
+            self._reject(chat_bot_id)
+            raise LLMQueueFull(
+                "LLM queue is full",
+                retry_after=self.retry_after(self._waiting),
+                per_chatbot=False,
+            )
+
+    def retry_after(self, depth: int) -> int:
+        """Оценка в секундах, через сколько очередь глубины depth рассосётся"""
+
+        return max(1, math.ceil(self._latency * (depth + 1) / self.max_concurrency))
+
+    @asynccontextmanager
+    async def slot(self, chat_bot_id: str, weight: float = 1.0) -> AsyncIterator[None]:
+        """Дождаться слота для вызова модели от имени бота"""
+
+        queue = self._queues.setdefault(chat_bot_id, _ChatBotQueue())
+        queue.weight = weight
+        totals = self._totals.setdefault(chat_bot_id, _ChatBotTotals())
+        totals.weight = weight
+        enqueued_at = time.monotonic()
+
+        if self._running < self.max_concurrency and not self._waiting:
+            self._start(queue)
+        else:
+            if not queue.waiters:
+                # Простаивавший бот не получает накопленного за простой кредита
+                queue.vtime = max(queue.vtime, self._vtime)
+            future = asyncio.get_running_loop().create_future()
+            queue.waiters.append(future)
+            self._waiting += 1
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    # _release мог уже убрать отменённое ожидание из очереди
+                    if future in queue.waiters:
+                        queue.waiters.remove(future)
+                        self._waiting -= 1
+                else:
+                    # Слот уже выдан, но задачу отменили до начала вызова
+                    self._release(queue)
+                self._discard_idle(chat_bot_id, queue)
+                raise
+
+        wait = time.monotonic() - enqueued_at
+        self._served += 1
+        totals.served += 1
+        totals.wait_seconds += wait
+        totals.max_wait_seconds = max(totals.max_wait_seconds, wait)
+
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self._latency = 0.8 * self._latency + 0.2 * (time.monotonic() - started_at)
+            self._release(queue)
+            self._discard_idle(chat_bot_id, queue)
+
+    def _start(self, queue: _ChatBotQueue) -> None:
+        queue.vtime = max(queue.vtime, self._vtime)
+        self._vtime = queue.vtime
+        queue.vtime += 1 / queue.weight
+        queue.running += 1
+        self._running += 1
+
+    def _release(self, queue: _ChatBotQueue) -> None:
+        queue.running -= 1
+        self._running -= 1
+
+        while self._running < self.max_concurrency and self._waiting:
+            next_queue = min(
+                (candidate for candidate in self._queues.values() if candidate.waiters),
+                key=lambda candidate: candidate.vtime,
+            )
+            future = next_queue.waiters.popleft()
+            self._waiting -= 1
+            # Отменённая задача ещё не успела убрать своё ожидание
+            if future.cancelled():
+                continue
+            self._start(next_queue)
+            future.set_result(None)
+
+    def _reject(self, chat_bot_id: str) -> None:
+        self._rejected += 1
+        self._totals.setdefault(chat_bot_id, _ChatBotTotals()).rejected += 1
+
+    def _discard_idle(self, chat_bot_id: str, queue: _ChatBotQueue) -> None:
+        # Простаивающий бот и так не сохраняет кредит виртуального времени,
+        # поэтому его состояние можно удалить и не копить по всем ботам
+        if queue.waiters or queue.running:
+            return
+        if self._queues.get(chat_bot_id) is queue:
+            del self._queues[chat_bot_id]
+
+    def stats(self) -> dict[str, dict]:
+        return {
+            "total": {
+                "max_concurrency": self.max_concurrency,
+                "running": self._running,
+                "queue_depth": self._waiting,
+                "served": self._served,
+                "rejected": self._rejected,
+                "active_chatbots": len(self._queues),
+                "avg_latency_seconds": round(self._latency, 3),
+            },
+            "chatbots": {
+                chat_bot_id: self._chatbot_stats(chat_bot_id, totals) for chat_bot_id, totals in self._totals.items()
+            },
+        }
+
+    def _chatbot_stats(self, chat_bot_id: str, totals: _ChatBotTotals) -> dict:
+        queue = self._queues.get(chat_bot_id)
+        return {
+            "weight": totals.weight,
+            "queue_depth": len(queue.waiters) if queue is not None else 0,
+            "running": queue.running if queue is not None else 0,
+            "served": totals.served,
+            "rejected": totals.rejected,
+            "wait_seconds_total": round(totals.wait_seconds, 3),
+            "wait_seconds_max": round(totals.max_wait_seconds, 3),
+        }
+
+
+llm_scheduler = LLMScheduler(
+    max_concurrency=settings.llm.max_concurrency,
+    max_queue_size=settings.llm.max_queue_size,
+    max_queue_per_chatbot=settings.llm.max_queue_per_chatbot,
+)